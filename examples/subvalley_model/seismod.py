@@ -22,8 +22,9 @@ from __future__ import print_function
 
 from nessi.swm import modext, modbuo, modlame
 from nessi.swm import acqpos, pmlmod
+from nessi.swm import modcoef, pmlcoef
 from nessi.swm import ricker, srcspread
-from nessi.swm import evolution
+from nessi.swm import evolution_strip
 
 from nessi.io import SUdata
 
@@ -38,6 +39,7 @@ def seismod(runpar, modpar, acqpar, vpmod, vsmod, romod):
     dt = runpar['dt']
     isnap = runpar['snap']
     dtsnap =  runpar['dtsnap']
+    nthreads = runpar.get('nthreads', 0)
 
     # >> Model grid parameters
     n1 = modpar['n1']
@@ -92,6 +94,14 @@ def seismod(runpar, modpar, acqpar, vpmod, vsmod, romod):
     pmlx0,pmlx1,pmlz0,pmlz1 = pmlmod(n1,n2,dh,isurf,npml,apml,ppml)
 
 
+    # ------------------------------------------------------------
+    # >> Calculate marching coefficients
+    # ------------------------------------------------------------
+
+    cbux,cbuz,clb0,clbmu,cmue,lbsurf = modcoef(npml,dh,dt,bux,buz,lbd,lbdmu,mu)
+    ax0,bx0,ax1,bx1,az0,bz0,az1,bz1 = pmlcoef(dt,pmlx0,pmlx1,pmlz0,pmlz1)
+
+
     # ------------------------------------------------------------
     # >> Generate input acquisition
     # ------------------------------------------------------------
@@ -121,20 +131,21 @@ def seismod(runpar, modpar, acqpar, vpmod, vsmod, romod):
     # >> Marching
     # ------------------------------------------------------------
 
-    recx,recz,recp = evolution(n1,n2,dh,npml,
-                               nts,ntsnap,dt,srctype,
-                               tsrc,gsrc,recpos,isurf,isnap,
-                               bux,buz,lbd, lbdmu,mu,
-                               pmlx0,pmlx1,pmlz0,pmlz1)
+    # >> nthreads=0 uses the default number of OpenMP threads
+    recx,recz,recp = evolution_strip(n1,n2,dh,npml,
+                                     nts,ntsnap,dt,srctype,
+                                     tsrc,gsrc,recpos,isurf,isnap,
+                                     cbux,cbuz,clb0,clbmu,cmue,lbsurf,
+                                     ax0,bx0,ax1,bx1,az0,bz0,az1,bz1,
+                                     nthreads=nthreads)
 
     # Minimal SU file
     surecz = SUdata()
     surecz.create(recz.swapaxes(1,0), dts)
 
     # Fill headers
-    for ir in range(0, nrec):
-        surecz.header[ir]['gx'] = acq[ir, 0]*10
-        surecz.header[ir]['gy'] = acq[ir, 1]*10
+    surecz.header['gx'] = acq[:, 0]*10
+    surecz.header['gy'] = acq[:, 1]*10
 
     surecz.header[:]['sx'] = sx*10
     surecz.header[:]['gy'] = sz*10
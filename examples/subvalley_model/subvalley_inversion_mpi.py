@@ -27,8 +27,9 @@ import matplotlib.pyplot as plt
 from mpi4py import MPI
 
 from nessi.io import SUdata
+from nessi.io import MASWPlan
 from nessi.pso import Swarm
-from nessi.grd import sibson2
+from nessi.modbuilder import sibson2
 
 from seismod import seismod
 
@@ -96,7 +97,8 @@ if rank != 0:
     # >> Run parameters
     runpar = {'name': 'subvalley',
               'tmax': tmax, 'dt': 0.0001, # Time marching
-              'snap': 0, 'dtsnap': 0.001}   # Snapshots
+              'snap': 0, 'dtsnap': 0.001,   # Snapshots
+              'nthreads': 1} # OpenMP threads per modeling
 
     # >> Model grid parameters
     modpar = {'n1': 51, 'n2': 301, 'dh': 0.5, # Grid dimensions
@@ -113,8 +115,11 @@ if rank != 0:
 # ------------------------------------------------------------------
 
 # Calculating the reference dispersion diagrams using the MASW method
+# The MASW plan keeps the phase-shift kernels, which are reused for all
+# particles since the acquisition geometry does not change.
 if rank != 0:
-    disp = dobsz.masw(vmin=200., vmax=1200., dv=5., fmin=10., fmax=50.)
+    plan = MASWPlan(vmin=200., vmax=1200., dv=5., fmin=10., fmax=50.)
+    disp = plan.run([dobsz])[0][0]
     disp /= np.amax(disp)
 
 # Block until all processes have reached this point.
@@ -155,15 +160,9 @@ for indv in range(0, nindv):
         npts = swarm.pspace.shape[0]
         xp = swarm.current[indv, :, 0]
         zp = swarm.current[indv, :, 1]
-        # S-wave velocity model
-        val = swarm.current[indv, :, 2]
-        vsmod = sibson2(npts, xp, zp, val, 51, 301, 0.5)
-        # Density model
-        val = swarm.current[indv, :, 3]
-        romod = sibson2(npts, xp, zp, val, 51, 301, 0.5)
-        # Poisson's ratio model
-        val = swarm.current[indv, :, 4]
-        numod = sibson2(npts, xp, zp, val, 51, 301, 0.5)
+        # S-wave velocity, density and Poisson's ratio models
+        val = swarm.current[indv, :, 2:5]
+        vsmod, romod, numod = sibson2(npts, xp, zp, val, 51, 301, 0.5)
         # P-wave velocity model
         vpmod = vsnu2vp(vsmod, numod)
 
@@ -177,7 +176,7 @@ for indv in range(0, nindv):
         # Seismic modeling
         dcalz = seismod(runpar, modpar, acqpar, vpmod, vsmod, romod)
         # Rayleigh dispersion
-        disp1 = dcalz.masw(vmin=200., vmax=1200., dv=5., fmin=10., fmax=50.)
+        disp1 = plan.run([dcalz])[0][0]
         disp1 /= np.amax(disp1)
         # L2-norm
         L2 = 0.
@@ -230,15 +229,9 @@ for igen in range(0, ngen):
             npts = swarm.pspace.shape[0]
             xp = swarm.current[indv, :, 0]
             zp = swarm.current[indv, :, 1]
-            # S-wave velocity model
-            val = swarm.current[indv, :, 2]
-            vsmod = sibson2(npts, xp, zp, val, 51, 301, 0.5)
-            # Density model
-            val = swarm.current[indv, :, 3]
-            romod = sibson2(npts, xp, zp, val, 51, 301, 0.5)
-            # Poisson's ratio model
-            val = swarm.current[indv, :, 4]
-            numod = sibson2(npts, xp, zp, val, 51, 301, 0.5)
+            # S-wave velocity, density and Poisson's ratio models
+            val = swarm.current[indv, :, 2:5]
+            vsmod, romod, numod = sibson2(npts, xp, zp, val, 51, 301, 0.5)
             # P-wave velocity model
             vpmod = vsnu2vp(vsmod, numod)
 
@@ -252,7 +245,7 @@ for igen in range(0, ngen):
             # Seismic modeling
             dcalz = seismod(runpar, modpar, acqpar, vpmod, vsmod, romod)
             # Rayleigh dispersion
-            disp1 = dcalz.masw(vmin=200., vmax=1200., dv=5., fmin=10., fmax=50.)
+            disp1 = plan.run([dcalz])[0][0]
             disp1 /= np.amax(disp1)
             # L2-norm
             L2 = 0.
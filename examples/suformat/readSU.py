@@ -1,6 +1,5 @@
 import numpy as np
 import matplotlib.pyplot as plt
-import copy
 
 from nessi.io import SUdata
 
@@ -11,9 +10,7 @@ musc.read('musc_F50_01.su')
 plt.subplot(121)
 musc.image(clip=0.05, legend=1)
 
-muscw = copy.deepcopy(musc)
-#print(musc.header[0]['ns'].flags)
-muscw.wind(tmin=-0.0, tmax=0.3)
+muscw = musc.wind(tmin=-0.0, tmax=0.3)
 plt.subplot(122)
 muscw.image(clip=0.05, legend=1)
 plt.show()
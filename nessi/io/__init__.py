@@ -22,6 +22,9 @@ from __future__ import print_function
 
 # Import nessi.io classes and functions
 from .su_fmt import SUdata
+from .su_fmt import susort
+from .su_fmt import MASWPlan
+from .batch import batch_process
 
 if __name__ == '__main__':
     import doctest
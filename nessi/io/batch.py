@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -------------------------------------------------------------------
+# Filename: batch.py
+#   Author: Damien Pageot
+#    Email: nessi.develop@protonmail.com
+#
+# Copyright (C) 2018 Damien Pageot
+# ------------------------------------------------------------------
+"""
+Batch processing of SU files with a pool of processes.
+
+:copyright:
+    Damien Pageot (nessi.develop@protonmail.com)
+:license:
+    GNU Lesser General Public License, Version 3
+    (https://www.gnu.org/copyleft/lesser.html)
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from nessi.signal import Pipeline
+from .su_fmt import SUdata
+from .su_fmt import MASWPlan
+
+# Processing steps of the worker processes
+_steps = None
+
+def _process_file(filein, fileout, steps, endian=' '):
+    """
+    Apply processing steps to a SU file.
+
+    :param filein: name of the input SU file
+    :param fileout: name of the output SU file
+    :param steps: list of processing steps
+    :param endian: byte order of the input file (=' ', auto detection)
+    :returns: output file name or result of the last step
+    """
+    # Map the input file in memory
+    dobs = SUdata()
+    dobs.read(filein, endian=endian, mmap=True)
+
+    for istep, step in enumerate(steps):
+        if isinstance(step, Pipeline):
+            dobs = step.run(dobs)
+        elif isinstance(step, MASWPlan):
+            disp, vel, freq = step.run([dobs])
+            dobs = (disp[0], vel, freq)
+        else:
+            method, kwargs = step
+            dobs = getattr(dobs, method)(**kwargs)
+
+        # Steps returning results other than SU data end the processing
+        if not isinstance(dobs, SUdata):
+            if istep != len(steps)-1:
+                raise ValueError('step '+str(istep)+' does not return SU data')
+            return dobs
+
+    # Write the processed data at once
+    dobs.write(fileout)
+
+    return fileout
+
+def _init_worker(steps):
+    """
+    Store the processing steps in the worker process. MASWPlan phase-shift
+    kernels are then cached over all the files processed by the worker.
+    """
+    global _steps
+    _steps = steps
+
+def _worker(args):
+    """
+    Process one SU file in a worker process.
+    """
+    return _process_file(args[0], args[1], _steps, args[2])
+
+def batch_process(files, pipeline, workers=1, fileout=None, suffix='_proc',
+                  endian=' '):
+    """
+    Apply the same processing to many SU files in parallel.
+
+    Each worker process maps its input files in memory and writes each
+    processed file at once. The processing is a list of steps: Pipeline
+    objects from nessi.signal, MASWPlan objects, or (method, kwargs)
+    tuples calling SUdata methods, e.g.
+    [('wind', {'tmin': 0., 'tmax': 0.5}), ('taper', {'tr1': 5, 'tr2': 5})].
+    A step returning other results than SU data, such as 'masw' or a
+    MASWPlan, must be the last one; its results are returned instead of
+    writing an output file.
+
+    :param files: list of input SU file names
+    :param pipeline: Pipeline, MASWPlan or list of processing steps
+    :param workers: number of processes (=1, no pool)
+    :param fileout: list of output SU file names (=None, input names with
+        suffix)
+    :param suffix: suffix of the output file names (='_proc')
+    :param endian: byte order of the input files (=' ', auto detection)
+    :returns: list of output file names or of last step results, in the
+        order of the input files
+    """
+    # Processing steps
+    if isinstance(pipeline, (Pipeline, MASWPlan)):
+        steps = [pipeline]
+    else:
+        steps = list(pipeline)
+
+    # Output file names
+    if fileout is None:
+        fileout = []
+        for filein in files:
+            root, ext = os.path.splitext(filein)
+            fileout.append(root+suffix+ext)
+    if len(fileout) != len(files):
+        raise ValueError('fileout and files must have the same length')
+    for i in range(0, len(files)):
+        if os.path.abspath(fileout[i]) == os.path.abspath(files[i]):
+            raise ValueError('input files are mapped and cannot be overwritten')
+
+    tasks = [(files[i], fileout[i], endian) for i in range(0, len(files))]
+
+    if workers == 1:
+        return [_process_file(task[0], task[1], steps, task[2])
+                for task in tasks]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(steps,)) as executor:
+        results = list(executor.map(_worker, tasks))
+
+    return results
@@ -25,11 +25,66 @@ import os, sys
 import numpy as np
 import matplotlib.pyplot as plt
 import copy
+from concurrent.futures import ThreadPoolExecutor
 
 from nessi.signal import time_window
 from nessi.signal import space_window
 from nessi.signal import taper1d
 from nessi.signal import sin2filter
+from nessi.signal import get_fftplan
+
+def _sortindex(header, keys):
+    """
+    Indices sorting SU headers by keys, the first key being the primary
+    one. Keys prefixed by '-' are sorted in decreasing order.
+
+    :param header: array of SU headers
+    :param keys: list of SU header keys
+    """
+    columns = []
+    for key in reversed(keys):
+        if key[0] == '-':
+            columns.append(-np.asarray(header[key[1:]], dtype=np.int64))
+        else:
+            columns.append(np.asarray(header[key]))
+
+    return np.lexsort(columns)
+
+def susort(filein, fileout, keys, chunk=4096, endian=' '):
+    """
+    Sort the traces of a SU file by header keys (adapted from the susort
+    command - Seismic Unix 44R1) without loading the file in memory.
+
+    Only the sorting keys are loaded; traces are copied from the mapped
+    input file to the output file by blocks of chunk traces.
+
+    :param filein: name of the input SU file
+    :param fileout: name of the output SU file
+    :param keys: list of SU header keys, '-key' for decreasing order
+    :param chunk: number of traces copied at once (=4096)
+    :param endian: byte order: little endian (default) 'l', big endian 'b'.
+    """
+    # Map the input SU file
+    dobs = SUdata()
+    dobs.filename = filein
+    if endian == ' ':
+        dobs._check_endian()
+    else:
+        dobs.endian = endian
+    sudata = dobs._mmap(filein, mode='r')
+
+    # Sort the header keys
+    isort = _sortindex(sudata['header'], keys)
+
+    # Copy traces by blocks, reading each block in file order
+    file = open(fileout, 'wb')
+    for ibeg in range(0, len(isort), chunk):
+        iblock = isort[ibeg:ibeg+chunk]
+        iorder = np.argsort(iblock)
+        block = np.empty(len(iblock), dtype=sudata.dtype)
+        block[iorder] = sudata[iblock[iorder]]
+        block.tofile(file)
+    file.close()
 
 class SUdata():
     """
@@ -102,6 +157,12 @@ class SUdata():
         self.trace = []
         self.endian = 'l'
 
+        # Cached header indices
+        self._hindex = {}
+
+        # Traces shared with the data this object was derived from
+        self._tview = None
+
         # For FFT and MASW
         self.nw = 0.
         self.dw = 0.
@@ -116,72 +177,141 @@ class SUdata():
         """
         Check if little or big endian
         """
+        # Only the first trace header is needed to get ns
         file = open(self.filename, 'rb')
-        btmp = file.read()
+        bhdr = file.read(240)
+        file.close()
         bsize = os.stat(self.filename).st_size
-        nsl = np.frombuffer(btmp, dtype='<h', count=1, offset=114)[0]
-        nsb = np.frombuffer(btmp, dtype='>h', count=1, offset=114)[0]
-        if(bsize%((nsl*4)+240) == 0):
+        nsl = np.frombuffer(bhdr, dtype='<u2', count=1, offset=114)[0]
+        nsb = np.frombuffer(bhdr, dtype='>u2', count=1, offset=114)[0]
+        if(bsize%((int(nsl)*4)+240) == 0):
             self.endian = 'l'
         else:
-            if(bsize%((nsb*4)+240) == 0):
+            if(bsize%((int(nsb)*4)+240) == 0):
                 self.endian = 'b'
             else:
                 sys.exit("Unable to read "+self.filename+"\n")
 
+    def _sudtype(self, ns):
+        """
+        Structured type of a SU record: one 240-byte header followed by
+        ns float32 samples, in the byte order of the file.
+
+        :param ns: number of time samples per trace
+        """
+        if self.endian == 'b':
+            return np.dtype([('header', self.sutype.newbyteorder('>')),
+                             ('trace', '>f4', (ns,))])
+        else:
+            return np.dtype([('header', self.sutype.newbyteorder('<')),
+                             ('trace', '<f4', (ns,))])
+
+    def _mmap(self, filename, mode='c'):
+        """
+        Map a SU file in memory as an array of SU records.
 
-    def read(self, filename, endian=' '):
+        :param filename: name of the SU file
+        :param mode: numpy.memmap mode, copy-on-write by default (='c')
+        """
+        # Get the number of time samples from the first header
+        hdrtype = self._sudtype(0)['header']
+        hdr = np.fromfile(filename, dtype=hdrtype, count=1)[0]
+        sutype = self._sudtype(int(hdr['ns']))
+
+        # Only complete traces are mapped
+        ntrac = os.stat(filename).st_size//sutype.itemsize
+
+        return np.memmap(filename, dtype=sutype, mode=mode, shape=(ntrac,))
+
+    def read(self, filename, endian=' ', mmap=False):
         """Read Seismic Unix file.
 
+        The file is read as a single array of SU records, ``header`` and
+        ``trace`` being views of this array. With ``mmap=True`` the file is
+        mapped in memory (copy-on-write) and traces are only loaded from
+        disk when they are accessed.
+
         :param filename: name of the SU file
         :param endian: byte order: little endian (default) 'l', big endian 'b'.
+        :param mmap: map the file in memory instead of reading it (=False)
         """
         self.filename = filename
         if endian == ' ':
             self._check_endian()
+        else:
+            self.endian = endian
+
+        # Read or map all SU records at once
+        sudata = self._mmap(filename)
+        if not mmap:
+            sudata = np.array(sudata)
+
+        # Header and trace views
+        self.header = sudata['header']
+        self.trace = sudata['trace']
 
-        file = open(filename, 'rb')
-        bhdr = file.read(240)
-        if self.endian == 'b':
-            hdr = np.frombuffer(bhdr, dtype=self.sutype.newbyteorder(), count=1)[0]
-            btrc = file.read(hdr['ns']*4)
-            trc = np.frombuffer(btrc, dtype=('>f4', hdr['ns']), count=1)[0]
-            self.header.append(hdr)
-            self.trace.append(trc)
-            EOF = False
-            while EOF == False:
-                try:
-                    bhdr = file.read(240)
-                    btrc = file.read(hdr['ns']*4)
-                    hdr = np.frombuffer(bhdr, dtype=self.sutype.newbyteorder(), count=1)[0]
-                    trc = np.frombuffer(btrc, dtype=('>f4', hdr['ns']), count=1)[0]
-                    self.header.append(hdr)
-                    self.trace.append(trc)
-                except:
-                    EOF = True
-            self.trace = np.array(self.trace)
-            self.header = np.array(self.header)
-
-        if self.endian == 'l':
-            hdr = np.frombuffer(bhdr, dtype=self.sutype, count=1)[0]
-            btrc = file.read(hdr['ns']*4)
-            trc = np.frombuffer(btrc, dtype=('<f4', hdr['ns']), count=1)[0]
-            self.header.append(hdr)
-            self.trace.append(trc)
-            EOF = False
-            while EOF == False:
-                try:
-                    bhdr = file.read(240)
-                    btrc = file.read(hdr['ns']*4)
-                    hdr = np.frombuffer(bhdr, dtype=self.sutype, count=1)[0]
-                    trc = np.frombuffer(btrc, dtype=('<f4', hdr['ns']), count=1)[0]
-                    self.header.append(hdr)
-                    self.trace.append(trc)
-                except:
-                    EOF = True
-            self.header = np.array(self.header)
-            self.trace = np.array(self.trace)
 
+    def iter_gathers(self, filename, key='fldr', chunk=1, endian=' '):
+        """Iterate over a Seismic Unix file by blocks of gathers.
+
+        The file is mapped in memory and only one block of traces is
+        loaded at a time, so that files larger than the available memory
+        can be processed. A gather is a sequence of consecutive traces
+        sharing the same value of the header key.
+
+        :param filename: name of the SU file
+        :param key: SU header key defining gathers, ' ' for blocks of traces
+        :param chunk: number of gathers per block (number of traces if key=' ')
+        :param endian: byte order: little endian (default) 'l', big endian 'b'.
+        :returns: SUdata objects, one per block of traces
+        """
+        self.filename = filename
+        if endian == ' ':
+            self._check_endian()
+        else:
+            self.endian = endian
+
+        # Map the SU file
+        sudata = self._mmap(filename, mode='r')
+        ntrac = len(sudata)
+
+        # Header key values (view, read from disk on demand) and number of
+        # headers scanned at once to find gather limits
+        if key != ' ':
+            hkey = sudata['header'][key]
+        nscan = 1024
+
+        ibeg = 0
+        while ibeg < ntrac:
+            # Find the last trace of the block
+            if key == ' ':
+                iend = min(ibeg+chunk, ntrac)
+            else:
+                iend = ibeg
+                for igather in range(0, chunk):
+                    if iend == ntrac:
+                        break
+                    value = hkey[iend]
+                    iend += 1
+                    while iend < ntrac:
+                        hscan = hkey[iend:iend+nscan]
+                        inext = np.flatnonzero(hscan != value)
+                        if len(inext) > 0:
+                            iend += inext[0]
+                            break
+                        iend += len(hscan)
+
+            # Load the block in memory
+            block = np.array(sudata[ibeg:iend])
+            gather = SUdata()
+            gather.filename = filename
+            gather.endian = self.endian
+            gather.header = block['header']
+            gather.trace = block['trace']
+
+            yield gather
+
+            ibeg = iend
 
     def image(self, bclip=None, wclip=None, clip=None, legend=0, label1=' ',
               label2=' ', title=' '):
@@ -208,7 +338,100 @@ class SUdata():
         if legend == 1:
             plt.colorbar()
 
-    def kill(self, key=' ', a=1, min=-1, count=1):
+    def index(self, key, update=False):
+        """
+        Index of the traces sorted by header key value.
+
+        The index is built once and cached; it is rebuilt when the header
+        array is replaced. Use update=True after editing header values.
+
+        :param key: SU header key
+        :param update: force the index to be rebuilt (=False)
+        :returns: indices sorting the traces, sorted header key values
+        """
+        if update or key not in self._hindex \
+           or self._hindex[key][0] is not self.header:
+            values = np.array(self.header[key])
+            isort = np.argsort(values, kind='stable')
+            self._hindex[key] = (self.header, isort, values[isort])
+
+        return self._hindex[key][1], self._hindex[key][2]
+
+    def select(self, key, a=None, min=None, max=None):
+        """
+        Select traces by header key value.
+
+        :param key: SU header key
+        :param a: header value identifying traces to select
+        :param min: minimum value of key to select
+        :param max: maximum value of key to select
+        :returns: indices of the selected traces, in increasing order
+        """
+        isort, values = self.index(key)
+
+        if a is not None:
+            min = a
+            max = a
+
+        # Binary search in the sorted header values
+        ibeg = 0
+        iend = len(values)
+        if min is not None:
+            ibeg = np.searchsorted(values, min, side='left')
+        if max is not None:
+            iend = np.searchsorted(values, max, side='right')
+
+        return np.sort(isort[ibeg:iend])
+
+    def sort(self, keys, inplace=False):
+        """
+        Sort traces by header keys (adapted from the susort command -
+        Seismic Unix 44R1).
+
+        :param keys: list of SU header keys, the first key being the primary
+            one. Prefix a key with '-' to sort in decreasing order.
+        :param inplace: sort the input data (=False)
+        """
+        # Get the output SU data
+        dobssort = self._result(inplace)
+
+        # Sort headers and traces
+        isort = _sortindex(self.header, keys)
+        dobssort.header = self.header[isort]
+        dobssort.trace = self.trace[isort, :]
+
+        return dobssort
+
+    def _result(self, inplace=False):
+        """
+        Return the SUdata object receiving the result of a processing.
+
+        If inplace, the object itself is returned. Otherwise a new object
+        sharing the traces of the input data and owning a copy of the
+        headers is returned; processing methods only allocate the trace
+        arrays they modify.
+
+        :param inplace: process the data in place (=False)
+        """
+        if inplace:
+            return self
+        dobs = copy.copy(self)
+        dobs.header = self.header.copy()
+        dobs._hindex = {}
+        dobs._tview = self.trace
+        return dobs
+
+    def _own_trace(self):
+        """
+        Copy the traces before processing them in place if they are shared
+        with the data this object was derived from (e.g. results of wind),
+        so that in place processing never modifies other SUdata objects.
+        """
+        if self._tview is not None and self._tview is self.trace:
+            self.trace = self.trace.copy()
+        self._tview = None
+
+    def kill(self, key=' ', a=1, min=-1, count=1, inplace=False):
         """
         Zero out traces.
         If min= is set it overrides selecting traces by header.
@@ -217,153 +440,211 @@ class SUdata():
         :param a: header value identifying traces to kill
         :param min: first trace to kill
         :param count: number of traces to kill
+        :param inplace: zero out traces of the input data (=False)
         """
 
-        # Create a copy of the input SU data
-        dobskill = copy.deepcopy(self)
-
-        # Get the number of traces
-        ntrac = self.traces.shape[0]
+        # Get the output SU data
+        dobskill = self._result(inplace)
+        if inplace:
+            dobskill._own_trace()
+        else:
+            dobskill.trace = self.trace.copy()
 
         # Kill traces
         if min > 0:
-            for icount in range(0, count):
-                if min+icount < ntrac:
-                    dobskill.trace[min+icount, :] = 0.
+            dobskill.trace[min:min+count, :] = 0.
         else:
             if key != ' ':
-                for itrac in range(0, ntrac):
-                    if dobskill.header[itrac][key] == a:
-                        dobskill.trace[itrac, :] = 0.
+                dobskill.trace[self.select(key, a), :] = 0.
 
         return dobskill
 
-    def wind(self, key=' ', min=0, max=0, tmin=0., tmax=0.):
+    def wind(self, key=' ', min=0, max=0, tmin=0., tmax=0., inplace=False):
         """
         Window SU traces in time or space.
 
+        The windowed traces are a view of the input traces when the
+        selected traces are contiguous; only the headers of the windowed
+        traces are copied to update ns, delrt and cdpt. Data read with
+        mmap=True are windowed without reading the excluded traces.
+        Processing the windowed data in place copies the shared traces
+        first, whereas processing the input data in place also modifies
+        the windowed views.
+
         :param key: SU header key
-        :param imin: minimum value of key to pass (=0)
-        :param imax: maximum value of key to pass (=0)
+        :param min: minimum value of key to pass (=0)
+        :param max: maximum value of key to pass (=0)
         :param tmin: minimum time to pass (=0)
         :param tmax: maximum time to pass (=0)
+        :param inplace: window the input data (=False)
+        :raises ValueError: if no trace passes the key window
         """
-        # Create a copy of the input SU data
-        dobsw = copy.deepcopy(self)
+        # Get the output SU data
+        if inplace:
+            dobsw = self
+        else:
+            dobsw = copy.copy(self)
+
+        # Input traces and headers
+        trace = self.trace
+        header = self.header
+        hcopy = inplace
 
         if key != ' ' and (min != max): # Window traces in space
             # Get traces indices from key
-            imin = np.argmin(np.abs(dobsw.header[:][key]-min))
-            imax = np.argmin(np.abs(dobsw.header[:][key]-max))
-
-            # Call nessi.signal.space_window function
-            dobsw.trace = space_window(dobsw.trace, imin, imax, axis=0)
-
-            # Edit SU header
-            dobsw.header = dobsw.header[imin:imax+1][:]
-            for ir in range(0, len(dobsw.header)):
-                dobsw.header[ir]['cdpt'] = ir+1
+            itrac = self.select(key, min=min, max=max)
+            if len(itrac) == 0:
+                raise ValueError('no trace with %s in [%s, %s]'
+                                 % (key, min, max))
+
+            if itrac[-1]-itrac[0]+1 == len(itrac):
+                # Contiguous traces: call nessi.signal.space_window function
+                imin = itrac[0]
+                imax = itrac[-1]
+                trace = space_window(trace, imin, imax, axis=0)
+                header = header[imin:imax+1]
+            else:
+                trace = trace[itrac, :]
+                header = header[itrac]
+                hcopy = True
 
         if tmax != tmin: # Window traces in time
             # Get parameters from SU header
-            dt = dobsw.header[0]['dt']/1000000.
-            delrt = float(dobsw.header[0]['delrt'])/1000.
+            dt = header[0]['dt']/1000000.
+            delrt = float(header[0]['delrt'])/1000.
 
             # Call nessi.signal.time_window function
-            dobsw.trace = time_window(dobsw.trace, tmin, tmax, dt, delrt, axis=1)
-
-            # Edit SU header
-            dobsw.header[:]['ns'] = np.size(dobsw.trace, axis=1)
-            dobsw.header[:]['delrt'] = int(tmin*1000)
+            trace = time_window(trace, tmin, tmax, dt, delrt, axis=1)
+
+        # Copy the headers of the windowed traces before editing them
+        if not hcopy:
+            header = header.copy()
+
+        # Edit SU header
+        if key != ' ' and (min != max):
+            header['cdpt'] = np.arange(1, len(header)+1)
+        if tmax != tmin:
+            header['ns'] = np.size(trace, axis=1)
+            header['delrt'] = int(tmin*1000)
+
+        dobsw.trace = trace
+        dobsw.header = header
+        dobsw._hindex = {}
+        if np.may_share_memory(trace, self.trace) and \
+           (not inplace or self._tview is not None):
+            dobsw._tview = trace
 
         return dobsw
 
-    def pfilter(self, freq, amps):
+    def pfilter(self, freq, amps, inplace=False):
         """
         Applies a zero-phase, sine-squared tapered filter (adapted from the
         sufilter command - Seismic Unix 44R1).
 
         :param freq: array of filter frequencies (Hz)
         :param amps: array of filter amplitudes
-        :param axis: time axis if dobs is a 2D array
+        :param inplace: filter the input data (=False)
         """
-        # Create a copy of the input SU data
-        dobsfilter = copy.deepcopy(self)
+        # Get the output SU data
+        dobsfilter = self._result(inplace)
 
         # Get values from SU header
         dt = self.header[0]['dt']/1000000.
 
-        # Apply filter
-        dobsfilter.trace = sin2filter(self.trace, freq, amps, dt, axis=1)
+        # Apply filter (written back to the input traces if inplace)
+        if inplace:
+            dobsfilter._own_trace()
+            dobsfilter.trace[...] = sin2filter(self.trace, freq, amps, dt, axis=1)
+        else:
+            dobsfilter.trace = sin2filter(self.trace, freq, amps, dt, axis=1)
 
         return dobsfilter
 
-    def taper(self, tr1=0, tr2=0, min=0., tbeg=0., tend=0., type='linear'):
+    def taper(self, tr1=0, tr2=0, min=0., tbeg=0., tend=0., type='linear',
+              inplace=False):
         """
         Taper the edge traces of a data panel to zero.
 
-        :param dobs: input data to window
         :param tr1: number of traces to be tapered at beginning.
         :param tr2: number of traces to be tapered at end.
         :param min: minimum amplitude to taper (<1., default=0.)
         :param tbeg: length of taper (ms) at trace start (=0.).
         :param tend: length of taper (ms) at trace end (=0).
         :param taper: taper type: 'linear'(default), 'sine', 'cosine'
+        :param inplace: taper the input data (=False)
         """
-        # Create a copy of the input SU data
-        dobstaper = copy.deepcopy(self)
+        # Get the output SU data
+        dobstaper = self._result(inplace)
 
         # Get values from SU header
         ns = self.header[0]['ns']
         dt = self.header[0]['dt']/1000000.
 
+        # Output traces (the input traces are overwritten if inplace)
+        out = None
+        if inplace:
+            dobstaper._own_trace()
+            out = dobstaper.trace
+
         # Taper in space
         if(tr1 !=0 or tr2 !=0):
-            dobstaper.trace = taper1d(dobstaper.trace, tr1, tr2, min, type, axis=0)
+            dobstaper.trace = taper1d(dobstaper.trace, tr1, tr2, min, type,
+                                      axis=0, out=out)
+            out = dobstaper.trace
 
         # Taper in time
         if(tbeg !=0. or tend !=0.):
             ntap1 = int(tbeg/1000./dt)
             ntap2 = int(tend/1000./dt)
-            dobstaper.trace = taper1d(dobstaper.trace, ntap1, ntap2, min, type, axis=1)
+            dobstaper.trace = taper1d(dobstaper.trace, ntap1, ntap2, min, type,
+                                      axis=1, out=out)
 
         return dobstaper
 
     def create(self, data, dt):
         """
         Create a minimal SU file
+
+        :param data: traces, array of size (number of traces, ns)
+        :param dt: time sampling (s)
         """
         # Get size of data
         nr = data.shape[0]
         ns = data.shape[1]
 
         # Create
-        for ir in range(0, nr):
-            self.header.append(np.zeros(1, dtype=self.sutype))
-            self.header[ir]['tracl'] = int(ir+1)
-            self.header[ir]['tracf'] = int(ir+1)
-            self.header[ir]['ns'] = int(ns)
-            self.header[ir]['dt'] = int(dt*1000000.)
-            self.trace.append(data[ir,:])
-        self.header = np.array(self.header)
-        self.trace = np.array(self.trace)
-
-    def write(self, filename):
+        self.header = np.zeros(nr, dtype=self.sutype)
+        self.header['tracl'] = np.arange(1, nr+1)
+        self.header['tracf'] = np.arange(1, nr+1)
+        self.header['ns'] = int(ns)
+        self.header['dt'] = int(dt*1000000.)
+        self.trace = np.array(data, dtype=np.float32)
+
+    def write(self, filename, append=False):
         """
         Write SU file on disk
+
+        :param filename: name of the SU file
+        :param append: append traces at the end of the file (=False)
         """
-        file = open(filename, 'wb')
-        for ir in range(0, len(self.header)):
-            file.write(self.header[ir])
-            file.write(self.trace[ir,:])
+        # Pack headers and traces in a single array of SU records
+        ns = np.size(self.trace, axis=1)
+        sudata = np.empty(len(self.header), dtype=self._sudtype(ns))
+        sudata['header'] = self.header
+        sudata['trace'] = self.trace
+
+        # Write all SU records at once
+        if append:
+            file = open(filename, 'ab')
+        else:
+            file = open(filename, 'wb')
+        sudata.tofile(file)
         file.close()
 
-    def masw(self, vmin=0., vmax=1000., dv=5., fmin=1., fmax=100.):
+    def _offset(self):
         """
-        Calculate the dispersion diagram using MASW method
+        Source-receiver offsets from SU headers (scalco applied).
         """
-
-        # Get offset
         scalco = self.header[0]['scalco']
         if scalco < 0:
             scale = -1./float(scalco)
@@ -374,30 +655,182 @@ class SUdata():
 
         x = self.header[:]['sx']*scale-self.header[:]['gx']*scale
         y = self.header[:]['sy']*scale-self.header[:]['gy']*scale
-        offset = np.sqrt(x**2+y**2)
+
+        return np.sqrt(x**2+y**2)
+
+    def masw(self, vmin=0., vmax=1000., dv=5., fmin=1., fmax=100., vblock=32,
+             workers=1, pad=False):
+        """
+        Calculate the dispersion diagram using MASW method
+
+        The phase-shift stack is computed for blocks of velocities; the
+        memory used is proportional to vblock*ntrac*nw.
+
+        :param vmin: minimum phase velocity (m/s)
+        :param vmax: maximum phase velocity (m/s)
+        :param dv: phase velocity sampling (m/s)
+        :param fmin: minimum frequency (Hz)
+        :param fmax: maximum frequency (Hz)
+        :param vblock: number of velocities processed at once (=32)
+        :param workers: number of threads sharing the velocity blocks (=1)
+        :param pad: zero-pad the traces to a fast FFT length, with a finer
+            frequency sampling if ns is not 5-smooth (=False)
+        """
+        plan = MASWPlan(vmin, vmax, dv, fmin, fmax, vblock=vblock, cache=False,
+                        workers=workers, pad=pad)
+        disp, vel, freq = plan.run([self])
+
+        return disp[0], vel, freq
+
+def _phase_shift(gobs, offset, vel, freq, vblock=32, kernels=None, workers=1):
+    """
+    Phase-shift stack over receivers of the spectra of gathers sharing the
+    same offsets.
+
+    :param gobs: spectra of size (ngather, ntrac, nw)
+    :param offset: source-receiver offsets (ntrac)
+    :param vel: phase velocities (nv)
+    :param freq: frequencies (nw)
+    :param vblock: number of velocities processed at once (=32)
+    :param kernels: list of the phase-shift kernels of each velocity block,
+        filled if empty (=None, no cache)
+    :param workers: number of threads sharing the velocity blocks (=1)
+    :returns: dispersion diagrams of size (ngather, nv, nw)
+    """
+    nv = len(vel)
+    disp = np.zeros((gobs.shape[0], nv, len(freq)), dtype=np.float32)
+    phase = 2.*np.pi*np.outer(offset, freq)
+
+    # Kernels are only kept to fill the cache, otherwise each kernel is
+    # released once its velocity block is stacked
+    fill = kernels is not None and not kernels
+
+    def stack(iblock):
+        iv = iblock*vblock
+        # Phase-shift kernel for a block of velocities
+        if kernels:
+            kernel = kernels[iblock]
+        else:
+            vblk = vel[iv:iv+vblock, np.newaxis, np.newaxis]
+            kernel = np.exp(1j*phase[np.newaxis, :, :]/vblk)
+        # Stack over receivers
+        disp[:, iv:iv+vblock, :] = np.abs(np.einsum('vrw,grw->gvw', kernel, gobs))
+        if fill:
+            return kernel
+        return None
+
+    # NumPy releases the GIL in exp and einsum, so threads run the velocity
+    # blocks concurrently without copying the spectra to other processes
+    nblock = (nv+vblock-1)//vblock
+    if workers > 1:
+        pool = ThreadPoolExecutor(max_workers=workers)
+        blocks = list(pool.map(stack, range(0, nblock)))
+        pool.shutdown()
+    else:
+        blocks = [stack(iblock) for iblock in range(0, nblock)]
+
+    if fill:
+        kernels.extend(blocks)
+
+    return disp
+
+class MASWPlan():
+    """
+    Dispersion diagrams of several gathers using the MASW method with a
+    shared velocity grid and frequency band.
+
+    Gathers sharing the same offsets are stacked together and the
+    phase-shift kernels exp(i*2*pi*f*x/v) are computed once per offset
+    geometry. If cache is True, kernels are kept between calls to run,
+    which avoids recomputing them when the geometry does not change (e.g.
+    inversion loops); each cached geometry uses nv*ntrac*nw complex values.
+    """
+
+    def __init__(self, vmin=0., vmax=1000., dv=5., fmin=1., fmax=100.,
+                 vblock=32, cache=True, workers=1, pad=False):
+        """
+        Define the MASW plan.
+
+        :param vmin: minimum phase velocity (m/s)
+        :param vmax: maximum phase velocity (m/s)
+        :param dv: phase velocity sampling (m/s)
+        :param fmin: minimum frequency (Hz)
+        :param fmax: maximum frequency (Hz)
+        :param vblock: number of velocities processed at once (=32)
+        :param cache: keep phase-shift kernels between calls (=True)
+        :param workers: number of threads sharing the velocity blocks (=1)
+        :param pad: zero-pad the traces to a fast FFT length, with a finer
+            frequency sampling if ns is not 5-smooth (=False)
+        """
         # Velocity vector
-        nv = int((vmax-vmin)/dv)+1
-        vel = np.linspace(vmin, vmax, nv, dtype=np.float32)
+        self.nv = int((vmax-vmin)/dv)+1
+        self.vel = np.linspace(vmin, vmax, self.nv, dtype=np.float32)
 
-        # FFT
-        ns = int(self.header[0]['ns'])
-        dt = self.header[0]['dt']/1000000.
-        gobs = np.fft.rfft(self.trace, axis=1)
-        freq = np.fft.rfftfreq(ns, d=dt)
+        # Frequency band
+        self.fmin = fmin
+        self.fmax = fmax
+
+        self.vblock = vblock
+        self.cache = cache
+        self.workers = workers
+        self.pad = pad
+        self._kernels = {}
+
+    def run(self, gathers):
+        """
+        Calculate the dispersion diagrams of a list of gathers.
+
+        All gathers must have the same number of time samples and time
+        sampling.
+
+        :param gathers: list of SUdata objects
+        :returns: dispersion diagrams of size (ngather, nv, nw), velocities
+            and frequencies
+        """
+        # Time sampling
+        ns = int(gathers[0].header[0]['ns'])
+        dt = gathers[0].header[0]['dt']/1000000.
+        for gather in gathers:
+            if gather.trace.shape[1] != ns or \
+               gather.header[0]['dt']/1000000. != dt:
+                raise ValueError('gathers must share ns and dt')
+
+        # Frequency band (of the padded traces if pad is True)
+        if self.pad:
+            plan = get_fftplan(ns)
+        else:
+            plan = get_fftplan(ns, nfft=ns)
+        freq = plan.rfftfreq(dt)
         dw = freq[1]
-        iwmin = int(fmin/dw)
-        nw = int((fmax-fmin)/dw)+1
+        iwmin = int(self.fmin/dw)
+        nw = int((self.fmax-self.fmin)/dw)+1
+        freq = freq[iwmin:iwmin+nw]
+        nw = len(freq)
+
+        # Group gathers by offset geometry
+        groups = {}
+        offsets = {}
+        for igather, gather in enumerate(gathers):
+            offset = gather._offset()
+            geometry = (offset.tobytes(), ns, dt)
+            groups.setdefault(geometry, []).append(igather)
+            offsets[geometry] = offset
 
-        #disp = cy.cmasw(gobs, iwmin, nw, offset, vel, freq)
         # MASW
-        tmp = np.zeros(nw, dtype=np.complex64)
-        disp = np.zeros((nv, nw), dtype=np.float32)
-        for iv in range(0, nv):
-            tmp[:] = complex(0., 0.)
-            for ir in range(0, len(offset)):
-                for iw in range(0, nw):
-                    phase = complex(0., 1.)*2.*np.pi*offset[ir]*freq[iw+iwmin]/vel[iv]
-                    tmp[iw] += gobs[ir, iw+iwmin]*np.exp(phase)
-            disp[iv,:] += np.abs(tmp[:])
-
-        return disp, vel, freq[iwmin:iwmin+nw]
+        disp = np.zeros((len(gathers), self.nv, nw), dtype=np.float32)
+        for geometry in groups:
+            igathers = groups[geometry]
+            gobs = np.zeros((len(igathers), len(offsets[geometry]), nw),
+                            dtype=plan.ctype)
+            for i, igather in enumerate(igathers):
+                gobs[i] = plan.rfft(gathers[igather].trace,
+                                    axis=1)[:, iwmin:iwmin+nw]
+            if self.cache:
+                kernels = self._kernels.setdefault(geometry, [])
+            else:
+                kernels = None
+            disp[igathers] = _phase_shift(gobs, offsets[geometry], self.vel,
+                                          freq, self.vblock, kernels,
+                                          self.workers)
+
+        return disp, self.vel, freq
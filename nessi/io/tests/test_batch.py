@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -------------------------------------------------------------------
+# Filename: test_batch.py
+#   Author: Damien Pageot
+#    Email: nessi.develop@protonmail.com
+#
+# Copyright (C) 2018 Damien Pageot
+# ------------------------------------------------------------------
+"""
+Test suite for the batch processing of SU files (nessi.io.batch)
+
+:copyright:
+    Damien Pageot (nessi.develop@protonmail.com)
+:license:
+    GNU Lesser General Public License, Version 3
+    (https://www.gnu.org/copyleft/lesser.html)
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import tempfile
+import numpy as np
+from nessi.io import SUdata
+from nessi.io import MASWPlan
+from nessi.io import batch_process
+from nessi.signal import Pipeline
+from nessi.signal import Wind
+from nessi.signal import PFilter
+
+def _sufiles(nfile=3, nr=12, ns=128, dt=0.001):
+    """
+    Write small SU files and return their names.
+    """
+    path = tempfile.mkdtemp()
+    files = []
+    for ifile in range(0, nfile):
+        data = np.random.RandomState(ifile).randn(nr, ns).astype(np.float32)
+        dobs = SUdata()
+        dobs.create(data, dt)
+        dobs.header['gx'] = np.arange(0, nr)*100
+        files.append(os.path.join(path, 'shot'+str(ifile)+'.su'))
+        dobs.write(files[-1])
+    return files
+
+def test_batch_process():
+    """
+    io.batch_process with a pool of processes against serial processing.
+    """
+    files = _sufiles()
+    steps = [('wind', {'tmin': 0., 'tmax': 0.1}),
+             Pipeline([PFilter([5., 10., 80., 100.], [0., 1., 1., 0.])]),
+             ('taper', {'tr1': 2, 'tr2': 2, 'type': 'sine'})]
+
+    output = batch_process(files, steps, workers=2)
+
+    for ifile in range(0, len(files)):
+        np.testing.assert_equal(output[ifile], files[ifile][:-3]+'_proc.su')
+        dobs = SUdata()
+        dobs.read(files[ifile])
+        expected = dobs.wind(tmin=0., tmax=0.1)
+        expected = expected.pfilter([5., 10., 80., 100.], [0., 1., 1., 0.])
+        expected = expected.taper(tr1=2, tr2=2, type='sine')
+        dproc = SUdata()
+        dproc.read(output[ifile])
+        np.testing.assert_equal(dproc.header, expected.header)
+        np.testing.assert_allclose(dproc.trace, expected.trace, atol=1.e-6)
+
+def test_batch_process_masw():
+    """
+    io.batch_process returning MASW results.
+    """
+    files = _sufiles()
+    plan = MASWPlan(100., 500., 10., fmin=10., fmax=100.)
+
+    output = batch_process(files, [('taper', {'tr1': 2, 'tr2': 2}), plan],
+                           workers=2)
+    for ifile in range(0, len(files)):
+        dobs = SUdata()
+        dobs.read(files[ifile])
+        disp, vel, freq = dobs.taper(tr1=2, tr2=2).masw(100., 500., 10.,
+                                                        fmin=10., fmax=100.)
+        np.testing.assert_allclose(output[ifile][0], disp, rtol=1.e-5)
+        np.testing.assert_equal(output[ifile][2], freq)
+
+    # SUdata.masw as a processing step, serial processing
+    output = batch_process(files, [('masw', {'vmin': 100., 'vmax': 500.,
+                                             'dv': 10., 'fmin': 10.,
+                                             'fmax': 100.})])
+    disp, vel, freq = dobs.masw(100., 500., 10., fmin=10., fmax=100.)
+    np.testing.assert_allclose(output[-1][0], disp, rtol=1.e-5)
+
+if __name__ == "__main__" :
+    np.testing.run_module_suite()
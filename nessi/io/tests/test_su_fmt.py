@@ -0,0 +1,467 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -------------------------------------------------------------------
+# Filename: test_su_fmt.py
+#   Author: Damien Pageot
+#    Email: nessi.develop@protonmail.com
+#
+# Copyright (C) 2018 Damien Pageot
+# ------------------------------------------------------------------
+"""
+Test suite for the Seismic Unix format support (nessi.io.su_fmt)
+
+:copyright:
+    Damien Pageot (nessi.develop@protonmail.com)
+:license:
+    GNU Lesser General Public License, Version 3
+    (https://www.gnu.org/copyleft/lesser.html)
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import tempfile
+import tracemalloc
+import numpy as np
+from nessi.io import SUdata
+from nessi.io import susort
+from nessi.io import MASWPlan
+
+def _sufile(nr=24, ns=256, dt=0.0001, endian='l'):
+    """
+    Write a small SU file and return its name, headers and traces.
+    """
+    sutype = SUdata().sutype
+    if endian == 'b':
+        sutype = sutype.newbyteorder('>')
+        ftype = '>f4'
+    else:
+        sutype = sutype.newbyteorder('<')
+        ftype = '<f4'
+
+    header = np.zeros(nr, dtype=sutype)
+    header['tracl'] = np.arange(1, nr+1)
+    header['fldr'] = np.repeat(np.arange(1, nr//4+1), 4)
+    header['gx'] = np.arange(0, nr)*10
+    header['ns'] = ns
+    header['dt'] = int(dt*1000000.)
+    trace = np.random.RandomState(0).randn(nr, ns).astype(ftype)
+
+    filename = os.path.join(tempfile.mkdtemp(), 'test.su')
+    file = open(filename, 'wb')
+    for ir in range(0, nr):
+        file.write(header[ir].tobytes())
+        file.write(trace[ir, :].tobytes())
+    file.close()
+
+    return filename, header, trace
+
+def test_read_little_endian():
+    """
+    io.SUdata.read for a little endian SU file.
+    """
+    filename, header, trace = _sufile(endian='l')
+
+    dobs = SUdata()
+    dobs.read(filename)
+
+    np.testing.assert_equal(dobs.endian, 'l')
+    np.testing.assert_equal(dobs.header['tracl'], header['tracl'])
+    np.testing.assert_equal(dobs.header['gx'], header['gx'])
+    np.testing.assert_equal(dobs.trace, trace)
+
+def test_read_big_endian():
+    """
+    io.SUdata.read for a big endian SU file.
+    """
+    filename, header, trace = _sufile(endian='b')
+
+    dobs = SUdata()
+    dobs.read(filename)
+
+    np.testing.assert_equal(dobs.endian, 'b')
+    np.testing.assert_equal(dobs.header[0]['ns'], 256)
+    np.testing.assert_equal(dobs.header['fldr'], header['fldr'])
+    np.testing.assert_equal(dobs.trace, trace)
+
+def test_read_mmap():
+    """
+    io.SUdata.read with memory mapping.
+    """
+    filename, header, trace = _sufile()
+
+    dobs = SUdata()
+    dobs.read(filename, mmap=True)
+
+    # Traces are views of the mapped file
+    np.testing.assert_(isinstance(dobs.trace.base, np.memmap))
+    np.testing.assert_equal(dobs.trace, trace)
+
+    # Copy-on-write: the file is left untouched
+    dobs.trace[0, :] = 0.
+    dcheck = SUdata()
+    dcheck.read(filename)
+    np.testing.assert_equal(dcheck.trace, trace)
+
+def test_create():
+    """
+    io.SUdata.create minimal headers.
+    """
+    nr = 48
+    ns = 2501
+    dt = 0.0001
+    data = np.random.RandomState(0).randn(nr, ns)
+
+    dobs = SUdata()
+    dobs.create(data, dt)
+
+    np.testing.assert_equal(dobs.header.shape, (nr,))
+    np.testing.assert_equal(dobs.header['tracl'], np.arange(1, nr+1))
+    np.testing.assert_equal(dobs.header['tracf'], np.arange(1, nr+1))
+    np.testing.assert_equal(dobs.header['ns'], ns)
+    np.testing.assert_equal(dobs.header['dt'], 100)
+    np.testing.assert_equal(dobs.trace, data.astype(np.float32))
+
+def test_write():
+    """
+    io.SUdata.write in little and big endian byte orders.
+    """
+    for endian in ['l', 'b']:
+        filename, header, trace = _sufile(endian=endian)
+
+        dobs = SUdata()
+        dobs.read(filename)
+        fileout = filename+'.out'
+        dobs.write(fileout)
+
+        # Written file must be identical to the input file
+        bin = open(filename, 'rb').read()
+        bout = open(fileout, 'rb').read()
+        np.testing.assert_equal(bout, bin)
+
+def test_select():
+    """
+    io.SUdata.select for sorted and unsorted header keys.
+    """
+    filename, header, trace = _sufile()
+    dobs = SUdata()
+    dobs.read(filename)
+    dobs.header['offset'] = np.arange(24, 0, -1)*5
+
+    np.testing.assert_equal(dobs.select('fldr', 3), [8, 9, 10, 11])
+    np.testing.assert_equal(dobs.select('fldr', min=2, max=3), np.arange(4, 12))
+    np.testing.assert_equal(dobs.select('offset', min=10, max=25), [19, 20, 21, 22])
+    np.testing.assert_equal(dobs.select('offset', min=200), [])
+
+    # Index must be updated when headers are edited
+    dobs.header['fldr'] = 1
+    dobs.index('fldr', update=True)
+    np.testing.assert_equal(dobs.select('fldr', 1), np.arange(0, 24))
+
+    # Unsorted key in wind
+    dobsw = dobs.wind(key='offset', min=10, max=25)
+    np.testing.assert_equal(dobsw.trace, trace[19:23, :])
+    np.testing.assert_equal(dobsw.header['cdpt'], [1, 2, 3, 4])
+
+def test_kill():
+    """
+    io.SUdata.kill with and without in place processing.
+    """
+    filename, header, trace = _sufile()
+    dobs = SUdata()
+    dobs.read(filename)
+
+    # New object, input data untouched
+    dobsk = dobs.kill(key='fldr', a=2)
+    np.testing.assert_equal(dobsk.trace[4:8, :], 0.)
+    np.testing.assert_equal(dobsk.trace[8:, :], trace[8:, :])
+    np.testing.assert_equal(dobs.trace, trace)
+
+    # In place
+    dobsk = dobs.kill(min=1, count=2, inplace=True)
+    np.testing.assert_(dobsk is dobs)
+    np.testing.assert_equal(dobs.trace[1:3, :], 0.)
+    np.testing.assert_equal(dobs.trace[3:, :], trace[3:, :])
+
+def test_taper():
+    """
+    io.SUdata.taper with and without in place processing.
+    """
+    filename, header, trace = _sufile()
+    dobs = SUdata()
+    dobs.read(filename)
+
+    # New object, input data untouched
+    dobst = dobs.taper(tr1=4, tr2=4, tbeg=1., tend=1., type='sine')
+    np.testing.assert_equal(dobst.trace[0, :], 0.)
+    np.testing.assert_equal(dobs.trace, trace)
+
+    # In place, traces stay in the SU records
+    records = dobs.trace
+    dobst2 = dobs.taper(tr1=4, tr2=4, tbeg=1., tend=1., type='sine',
+                        inplace=True)
+    np.testing.assert_(dobst2 is dobs)
+    np.testing.assert_(dobs.trace is records)
+    np.testing.assert_equal(dobs.trace, dobst.trace)
+
+def test_wind_view():
+    """
+    io.SUdata.wind returns views of the input traces.
+    """
+    filename, header, trace = _sufile()
+    dobs = SUdata()
+    dobs.read(filename)
+
+    dobsw = dobs.wind(key='tracl', min=5, max=12, tmin=0., tmax=0.01)
+    np.testing.assert_(np.shares_memory(dobsw.trace, dobs.trace))
+    np.testing.assert_equal(dobsw.trace, trace[4:12, :101])
+    np.testing.assert_equal(dobsw.header['ns'], 101)
+    np.testing.assert_equal(dobsw.header['cdpt'], np.arange(1, 9))
+
+    # Input headers untouched
+    np.testing.assert_equal(dobs.header['ns'], 256)
+    np.testing.assert_equal(dobs.header['cdpt'], 0)
+
+def test_wind_empty():
+    """
+    io.SUdata.wind raises ValueError when no trace passes the key window.
+    """
+    filename, header, trace = _sufile()
+    dobs = SUdata()
+    dobs.read(filename)
+
+    np.testing.assert_raises(ValueError, dobs.wind, key='tracl', min=100,
+                             max=200, tmin=0., tmax=0.01)
+    np.testing.assert_raises(ValueError, dobs.wind, key='tracl', min=100,
+                             max=200, inplace=True)
+    np.testing.assert_equal(dobs.trace, trace)
+    np.testing.assert_equal(len(dobs.header), 24)
+
+def test_wind_inplace():
+    """
+    io.SUdata in place processing of windowed data leaves the input data
+    untouched.
+    """
+    filename, header, trace = _sufile()
+    dobs = SUdata()
+    dobs.read(filename)
+
+    # Kill and taper the views
+    dobsw = dobs.wind(key='tracl', min=5, max=12, tmin=0., tmax=0.01)
+    dobsw.kill(key='tracl', a=6, inplace=True)
+    np.testing.assert_equal(dobsw.trace[1, :], 0.)
+    dobsw = dobs.wind(key='tracl', min=5, max=12)
+    dobsw.taper(tr1=2, tr2=2, tbeg=1., tend=1., inplace=True)
+    np.testing.assert_equal(dobsw.trace[0, :], 0.)
+    dobsw = dobs.wind(key='tracl', min=5, max=12)
+    dobsw.wind(tmin=0., tmax=0.01, inplace=True)
+    dobsw.pfilter([5., 10., 100., 150.], [0., 1., 1., 0.], inplace=True)
+    np.testing.assert_equal(dobs.trace, trace)
+
+    # Filter in place into the input traces
+    records = dobs.trace
+    dobsf = dobs.pfilter([5., 10., 100., 150.], [0., 1., 1., 0.])
+    dobs.pfilter([5., 10., 100., 150.], [0., 1., 1., 0.], inplace=True)
+    np.testing.assert_(dobs.trace is records)
+    np.testing.assert_allclose(dobs.trace, dobsf.trace)
+
+def test_wind_mmap():
+    """
+    io.SUdata.wind of a memory-mapped file.
+    """
+    filename, header, trace = _sufile()
+    dobs = SUdata()
+    dobs.read(filename, mmap=True)
+
+    # Contiguous windows are views of the mapped file
+    dobsw = dobs.wind(key='fldr', min=2, max=3, tmin=0.001, tmax=0.002)
+    np.testing.assert_(isinstance(dobsw.trace.base, np.memmap))
+    np.testing.assert_equal(dobsw.trace, trace[4:12, 10:21])
+    np.testing.assert_equal(dobsw.header['delrt'], 1)
+    np.testing.assert_equal(dobsw.header['cdpt'], np.arange(1, 9))
+
+    # Non-contiguous windows copy the selected traces only
+    dobs.header['gx'][::2] = 1000
+    dobsw = dobs.wind(key='gx', min=1000, max=1001, inplace=True)
+    np.testing.assert_(dobsw is dobs)
+    np.testing.assert_equal(dobsw.trace, trace[::2, :])
+    np.testing.assert_equal(dobsw.header['cdpt'], np.arange(1, 13))
+
+def test_masw():
+    """
+    io.SUdata.masw against the phase-shift stack computed trace by trace.
+    """
+    filename, header, trace = _sufile(nr=12, ns=128, dt=0.001)
+    dobs = SUdata()
+    dobs.read(filename)
+    dobs.header['sx'] = -10
+    dobs.header['scalco'] = -10
+
+    vmin = 100.
+    vmax = 500.
+    dv = 10.
+    disp, vel, freq = dobs.masw(vmin, vmax, dv, fmin=10., fmax=100., vblock=7)
+
+    # Reference phase-shift stack
+    offset = np.abs(dobs.header['gx']-dobs.header['sx'])/10.
+    gobs = np.fft.rfft(dobs.trace, axis=1)
+    iwmin = int(round(freq[0]/(freq[1]-freq[0])))
+    gobs = gobs[:, iwmin:iwmin+len(freq)]
+    output = np.zeros((len(vel), len(freq)), dtype=np.float32)
+    for iv in range(0, len(vel)):
+        tmp = np.zeros(len(freq), dtype=np.complex128)
+        for ir in range(0, len(offset)):
+            tmp += gobs[ir, :]*np.exp(1j*2.*np.pi*offset[ir]*freq/vel[iv])
+        output[iv, :] = np.abs(tmp)
+
+    np.testing.assert_equal(disp.shape, (41, len(freq)))
+    np.testing.assert_allclose(disp, output, rtol=1.e-4, atol=1.e-4)
+
+def test_masw_frequencies():
+    """
+    io.SUdata.masw frequencies for a number of time samples which is not
+    5-smooth, with and without zero-padding.
+    """
+    filename, header, trace = _sufile(nr=12, ns=127, dt=0.001)
+    dobs = SUdata()
+    dobs.read(filename)
+
+    # Frequencies of the input traces
+    disp, vel, freq = dobs.masw(100., 500., 10., fmin=10., fmax=100.)
+    expected = np.fft.rfftfreq(127, d=0.001)
+    iwmin = int(10./expected[1])
+    nw = int(90./expected[1])+1
+    np.testing.assert_equal(freq, expected[iwmin:iwmin+nw])
+    np.testing.assert_equal(disp.shape, (41, nw))
+
+    # Frequencies of the traces padded to 128 samples
+    disp, vel, freq = dobs.masw(100., 500., 10., fmin=10., fmax=100.,
+                                pad=True)
+    np.testing.assert_allclose(freq[1]-freq[0], 1./(128*0.001))
+
+def test_masw_memory():
+    """
+    io.SUdata.masw only keeps the phase-shift kernel of the velocity blocks
+    being stacked.
+    """
+    filename, header, trace = _sufile(nr=48, ns=1000, dt=0.001)
+    dobs = SUdata()
+    dobs.read(filename)
+
+    # 50 blocks of 8 velocities, kernels of 8*48*400 complex values
+    tracemalloc.start()
+    disp, vel, freq = dobs.masw(100., 499., 1., fmin=1., fmax=400., vblock=8)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    kernel = 8*48*len(freq)*16
+    np.testing.assert_equal(disp.shape, (400, len(freq)))
+    np.testing.assert_(peak < 10*kernel)
+
+def test_sort():
+    """
+    io.SUdata.sort and io.susort with several keys.
+    """
+    filename, header, trace = _sufile()
+    dobs = SUdata()
+    dobs.read(filename)
+
+    # Decreasing fldr, then increasing gx
+    isort = np.lexsort((header['gx'], -header['fldr']))
+    dobss = dobs.sort(['-fldr', 'gx'])
+    np.testing.assert_equal(dobss.header['fldr'], header['fldr'][isort])
+    np.testing.assert_equal(dobss.trace, trace[isort, :])
+
+    # File to file
+    fileout = filename+'.sort'
+    susort(filename, fileout, ['-fldr', 'gx'], chunk=5)
+    dcheck = SUdata()
+    dcheck.read(fileout)
+    np.testing.assert_equal(dcheck.header['tracl'], header['tracl'][isort])
+    np.testing.assert_equal(dcheck.trace, trace[isort, :])
+
+def test_masw_plan():
+    """
+    io.MASWPlan for several gathers against io.SUdata.masw.
+    """
+    gathers = []
+    for igather in range(0, 3):
+        filename, header, trace = _sufile(nr=12, ns=128, dt=0.001)
+        dobs = SUdata()
+        dobs.read(filename)
+        dobs.trace *= float(igather+1)
+        dobs.header['sx'] = -10*(igather//2)
+        gathers.append(dobs)
+
+    plan = MASWPlan(100., 500., 10., fmin=10., fmax=100., vblock=7)
+    disp, vel, freq = plan.run(gathers)
+    np.testing.assert_equal(len(plan._kernels), 2)
+
+    for igather in range(0, 3):
+        output = gathers[igather].masw(100., 500., 10., fmin=10., fmax=100.)
+        np.testing.assert_allclose(disp[igather], output[0], rtol=1.e-5)
+
+    # Cached kernels
+    disp2 = plan.run(gathers)[0]
+    np.testing.assert_equal(len(plan._kernels), 2)
+    np.testing.assert_equal(disp2, disp)
+
+    # Velocity blocks shared between threads
+    plan = MASWPlan(100., 500., 10., fmin=10., fmax=100., vblock=7, workers=3)
+    disp3 = plan.run(gathers)[0]
+    np.testing.assert_equal(disp3, disp)
+
+def test_iter_gathers_key():
+    """
+    io.SUdata.iter_gathers for gathers defined by a header key.
+    """
+    filename, header, trace = _sufile()
+
+    # One gather per block
+    gathers = list(SUdata().iter_gathers(filename, key='fldr'))
+    np.testing.assert_equal(len(gathers), 6)
+    for igather in range(0, 6):
+        np.testing.assert_equal(gathers[igather].header['fldr'], igather+1)
+        np.testing.assert_equal(gathers[igather].trace,
+                                trace[igather*4:(igather+1)*4, :])
+
+    # Two gathers per block
+    gathers = list(SUdata().iter_gathers(filename, key='fldr', chunk=2))
+    np.testing.assert_equal([len(g.header) for g in gathers], [8, 8, 8])
+
+def test_iter_gathers_traces():
+    """
+    io.SUdata.iter_gathers for blocks of traces.
+    """
+    filename, header, trace = _sufile()
+
+    gathers = list(SUdata().iter_gathers(filename, key=' ', chunk=10))
+    np.testing.assert_equal([len(g.header) for g in gathers], [10, 10, 4])
+    np.testing.assert_equal(np.concatenate([g.trace for g in gathers]), trace)
+
+def test_iter_gathers_pipeline():
+    """
+    io.SUdata.iter_gathers read-taper-write pipeline.
+    """
+    filename, header, trace = _sufile()
+
+    # Taper the whole file
+    dobs = SUdata()
+    dobs.read(filename)
+    dobsf = dobs.taper(tbeg=2., tend=2., type='cosine')
+
+    # Taper the file gather by gather
+    fileout = filename+'.out'
+    iterator = SUdata().iter_gathers(filename, key='fldr')
+    for igather, gather in enumerate(iterator):
+        gather = gather.taper(tbeg=2., tend=2., type='cosine')
+        gather.write(fileout, append=(igather > 0))
+    dcheck = SUdata()
+    dcheck.read(fileout)
+
+    np.testing.assert_equal(dcheck.header['tracl'], header['tracl'])
+    np.testing.assert_allclose(dcheck.trace, dobsf.trace, atol=1.e-6)
+
+if __name__ == "__main__" :
+    np.testing.run_module_suite()
@@ -21,132 +21,178 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
-from numpy import loadtxt, zeros, float32, ascontiguousarray
-from ctypes import CDLL, c_int, c_float
+import os
+from numpy import zeros, float32, ascontiguousarray, ndim
+from ctypes import c_int, c_float
 from numpy.ctypeslib import ndpointer, load_library
 
-
-def voronoi(npts, xp, zp, val, n1, n2, dh):
+def _load_libgrd():
     """
-    voronoi
-    Coarse inversion gird to fine modelling grid using
-    Voronoi tesselation.
+    Load libgrd from the package directory (see src/Makefile install) and
+    set the prototypes of its functions. Returns None if the library is
+    not available.
     """
-
-    # GRD library
-    clibgrd = load_library('libgrd', '/home/pageotd/Work/nessi/nessi/grd/')
-
-    # nessi_grd_vrn
-    clibgrd.nessi_grd_vrn.argtypes = [c_int,
+    try:
+        clibgrd = load_library('libgrd', os.path.dirname(os.path.abspath(__file__)))
+    except OSError:
+        return None
+
+    # nessi_grd_vrn, nessi_grd_ds1 and nessi_grd_ds2
+    for function in [clibgrd.nessi_grd_vrn, clibgrd.nessi_grd_ds1,
+                     clibgrd.nessi_grd_ds2]:
+        function.argtypes = [c_int,
+                             ndpointer(dtype=float32, ndim=1, flags='C_CONTIGUOUS'),
+                             ndpointer(dtype=float32, ndim=1, flags='C_CONTIGUOUS'),
+                             ndpointer(dtype=float32, ndim=1, flags='C_CONTIGUOUS'),
+                             c_int, c_int, c_float,
+                             ndpointer(dtype=float32, ndim=2, flags='C_CONTIGUOUS')]
+        function.restype = None
+
+    # nessi_grd_idw
+    clibgrd.nessi_grd_idw.argtypes = [c_int,
                                       ndpointer(dtype=float32, ndim=1, flags='C_CONTIGUOUS'),
                                       ndpointer(dtype=float32, ndim=1, flags='C_CONTIGUOUS'),
                                       ndpointer(dtype=float32, ndim=1, flags='C_CONTIGUOUS'),
-                                      c_int, c_int, c_float,
+                                      c_int, c_int, c_float, c_int,
                                       ndpointer(dtype=float32, ndim=2, flags='C_CONTIGUOUS')]
+    clibgrd.nessi_grd_idw.restype = None
+
+    # nessi_grd_nearest
+    clibgrd.nessi_grd_nearest.argtypes = [c_int,
+                                          ndpointer(dtype=float32, ndim=1, flags='C_CONTIGUOUS'),
+                                          ndpointer(dtype=float32, ndim=1, flags='C_CONTIGUOUS'),
+                                          c_int, c_int, c_float,
+                                          ndpointer(dtype=c_int, ndim=2, flags='C_CONTIGUOUS'),
+                                          ndpointer(dtype=float32, ndim=2, flags='C_CONTIGUOUS')]
+    clibgrd.nessi_grd_nearest.restype = None
+
+    # nessi_grd_sibson
+    clibgrd.nessi_grd_sibson.argtypes = [c_int,
+                                         ndpointer(dtype=float32, ndim=1, flags='C_CONTIGUOUS'),
+                                         ndpointer(dtype=float32, ndim=1, flags='C_CONTIGUOUS'),
+                                         c_int,
+                                         ndpointer(dtype=float32, ndim=2, flags='C_CONTIGUOUS'),
+                                         c_int, c_int, c_float, c_int,
+                                         ndpointer(dtype=float32, ndim=3, flags='C_CONTIGUOUS')]
+    clibgrd.nessi_grd_sibson.restype = None
+
+    return clibgrd
+
+# libgrd is loaded once at import
+clibgrd = _load_libgrd()
+
+def _libgrd():
+    """
+    Return libgrd or raise an error if it is not built.
+    """
+    if clibgrd is None:
+        raise OSError('libgrd not found, build it with make install in '
+                      'nessi/modbuilder/interp2d/src')
+    return clibgrd
 
-    # initalize models array
-    model = zeros((n1, n2), dtype=float32, order='C')
-
+def _sibson(npts, xp, zp, val, n1, n2, dh, weighted):
+    """
+    Call nessi_grd_sibson for one or several properties.
+    """
     # convert to C order
     xp = ascontiguousarray(xp, dtype=float32)
     zp = ascontiguousarray(zp, dtype=float32)
-    val = ascontiguousarray(val, dtype=float32)
+    vals = ascontiguousarray(val, dtype=float32).reshape(npts, -1)
+    nprop = vals.shape[1]
 
-    # call nessi_grd_vrn
-    clibgrd.nessi_grd_vrn(npts, xp, zp, val, n1, n2, dh, model)
+    # initalize models array
+    model = zeros((nprop, n1, n2), dtype=float32, order='C')
 
-    return model
+    # call nessi_grd_sibson
+    _libgrd().nessi_grd_sibson(npts, xp, zp, nprop, vals, n1, n2, dh,
+                               weighted, model)
 
+    if ndim(val) == 1:
+        return model[0]
+    return model
 
-def idweight(npts, xp, zp, val, pw, n1, n2, dh):
+def voronoi(npts, xp, zp, val, n1, n2, dh):
     """
     voronoi
     Coarse inversion gird to fine modelling grid using
     Voronoi tesselation.
-    """
-
-    # GRD library
-    clibgrd = load_library('libgrd', '/home/pageotd/Work/nessi/nessi/grd/')
-
-    # nessi_grd_vrn
-    clibgrd.nessi_grd_idw.argtypes = [c_int,
-                                      ndpointer(dtype=float32, ndim=1, flags='C_CONTIGUOUS'),
-                                      ndpointer(dtype=float32, ndim=1, flags='C_CONTIGUOUS'),
-                                      ndpointer(dtype=float32, ndim=1, flags='C_CONTIGUOUS'),
-                                      c_int, c_int, c_float, c_int,
-                                      ndpointer(dtype=float32, ndim=2, flags='C_CONTIGUOUS')]
-
-    # initalize models array
-    model = zeros((n1, n2), dtype=float32, order='C')
 
+    :param val: values of the control points (npts) or (npts, nprop) for
+        several properties
+    :returns: model (n1, n2) or models (nprop, n1, n2)
+    """
     # convert to C order
     xp = ascontiguousarray(xp, dtype=float32)
     zp = ascontiguousarray(zp, dtype=float32)
     val = ascontiguousarray(val, dtype=float32)
 
+    if val.ndim == 2:
+        # Nearest control points, shared by all properties
+        inear = zeros((n1, n2), dtype=c_int, order='C')
+        dnear = zeros((n1, n2), dtype=float32, order='C')
+        _libgrd().nessi_grd_nearest(npts, xp, zp, n1, n2, dh, inear, dnear)
+        return ascontiguousarray(val[inear].transpose(2, 0, 1))
+
+    # initalize models array
+    model = zeros((n1, n2), dtype=float32, order='C')
+
     # call nessi_grd_vrn
-    clibgrd.nessi_grd_idw(npts, xp, zp, val, n1, n2, dh, pw, model)
+    _libgrd().nessi_grd_vrn(npts, xp, zp, val, n1, n2, dh, model)
 
     return model
 
-def sibson1(npts, xp, zp, val, n1, n2, dh):
+
+def idweight(npts, xp, zp, val, pw, n1, n2, dh):
     """
     voronoi
     Coarse inversion gird to fine modelling grid using
     Voronoi tesselation.
-    """
-
-    # GRD library
-    clibgrd = load_library('libgrd', '/home/pageotd/Work/nessi/nessi/grd/')
-
-    # nessi_grd_vrn
-    clibgrd.nessi_grd_ds1.argtypes = [c_int,
-                                      ndpointer(dtype=float32, ndim=1, flags='C_CONTIGUOUS'),
-                                      ndpointer(dtype=float32, ndim=1, flags='C_CONTIGUOUS'),
-                                      ndpointer(dtype=float32, ndim=1, flags='C_CONTIGUOUS'),
-                                      c_int, c_int, c_float,
-                                      ndpointer(dtype=float32, ndim=2, flags='C_CONTIGUOUS')]
-
-    # initalize models array
-    model = zeros((n1, n2), dtype=float32, order='C')
 
+    :param val: values of the control points (npts) or (npts, nprop) for
+        several properties
+    :returns: model (n1, n2) or models (nprop, n1, n2)
+    """
     # convert to C order
     xp = ascontiguousarray(xp, dtype=float32)
     zp = ascontiguousarray(zp, dtype=float32)
     val = ascontiguousarray(val, dtype=float32)
 
-    # call nessi_grd_vrn
-    clibgrd.nessi_grd_ds1(npts, xp, zp, val, n1, n2, dh, model)
+    if val.ndim == 2:
+        # Inverse distance weights depend on all points: one call per
+        # property
+        model = zeros((val.shape[1], n1, n2), dtype=float32, order='C')
+        for iprop in range(0, val.shape[1]):
+            model[iprop] = idweight(npts, xp, zp, val[:, iprop], pw, n1, n2, dh)
+        return model
+
+    # initalize models array
+    model = zeros((n1, n2), dtype=float32, order='C')
+
+    # call nessi_grd_idw
+    _libgrd().nessi_grd_idw(npts, xp, zp, val, n1, n2, dh, pw, model)
 
     return model
 
-def sibson2(npts, xp, zp, val, n1, n2, dh):
+def sibson1(npts, xp, zp, val, n1, n2, dh):
     """
     voronoi
     Coarse inversion gird to fine modelling grid using
     Voronoi tesselation.
-    """
-
-    # GRD library
-    clibgrd = load_library('libgrd', '/home/pageotd/Work/nessi/nessi/grd/')
 
-    # nessi_grd_vrn
-    clibgrd.nessi_grd_ds2.argtypes = [c_int,
-                                      ndpointer(dtype=float32, ndim=1, flags='C_CONTIGUOUS'),
-                                      ndpointer(dtype=float32, ndim=1, flags='C_CONTIGUOUS'),
-                                      ndpointer(dtype=float32, ndim=1, flags='C_CONTIGUOUS'),
-                                      c_int, c_int, c_float,
-                                      ndpointer(dtype=float32, ndim=2, flags='C_CONTIGUOUS')]
-
-    # initalize models array
-    model = zeros((n1, n2), dtype=float32, order='C')
-
-    # convert to C order
-    xp = ascontiguousarray(xp, dtype=float32)
-    zp = ascontiguousarray(zp, dtype=float32)
-    val = ascontiguousarray(val, dtype=float32)
+    :param val: values of the control points (npts) or (npts, nprop) for
+        several properties interpolated in one pass
+    :returns: model (n1, n2) or models (nprop, n1, n2)
+    """
+    return _sibson(npts, xp, zp, val, n1, n2, dh, 0)
 
-    # call nessi_grd_vrn
-    clibgrd.nessi_grd_ds2(npts, xp, zp, val, n1, n2, dh, model)
+def sibson2(npts, xp, zp, val, n1, n2, dh):
+    """
+    voronoi
+    Coarse inversion gird to fine modelling grid using
+    Voronoi tesselation.
 
-    return model
+    :param val: values of the control points (npts) or (npts, nprop) for
+        several properties interpolated in one pass
+    :returns: model (n1, n2) or models (nprop, n1, n2)
+    """
+    return _sibson(npts, xp, zp, val, n1, n2, dh, 1)
@@ -0,0 +1,132 @@
+/* pso/nessi_grd_nn.c
+ * 
+ * Copyright (C) 2017, 2018 Damien Pageot
+ * 
+ * This program is free software: you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation, either version 3 of the License, or
+ * (at your option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ * GNU General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program.  If not, see <http://www.gnu.org/licenses/>.
+ */
+
+#include <nessi_grd.h>
+
+// * Nearest control point of each grid node.
+// * Control points are sorted in a uniform grid of buckets (about one
+// * point per bucket). For each node, buckets are visited by rings of
+// * increasing size around the bucket of the node until the ring cannot
+// * contain a closer point. Ties are resolved to the lowest point index,
+// * as for a brute force search over the points.
+void
+nessi_grd_nearest(const int npts,
+		  const float xp[npts], const float zp[npts],
+		  const int n1, const int n2, const float dh,
+		  int inear[n1][n2], float dnear[n1][n2])
+{
+  int i1, i2, ipts, ib, ibx, ibz, jbx, jbz, nbx, nbz, r, rmax, k, imin;
+  int *head, *list;
+  float x, z, d, dmin, lb, e;
+  float xmin, xmax, zmin, zmax, hb;
+
+  // Bounding box of the control points
+  xmin = xp[0]; xmax = xp[0];
+  zmin = zp[0]; zmax = zp[0];
+  for(ipts=1; ipts<npts; ipts++){
+    if(xp[ipts] < xmin){xmin = xp[ipts];}
+    if(xp[ipts] > xmax){xmax = xp[ipts];}
+    if(zp[ipts] < zmin){zmin = zp[ipts];}
+    if(zp[ipts] > zmax){zmax = zp[ipts];}
+  }
+
+  // Bucket size and number of buckets
+  hb = sqrt((xmax-xmin+dh)*(zmax-zmin+dh)/(float)npts);
+  nbx = (int)((xmax-xmin)/hb)+1;
+  nbz = (int)((zmax-zmin)/hb)+1;
+  rmax = nbx;
+  if(nbz > rmax){rmax = nbz;}
+
+  // Sort the control points by bucket (counting sort keeps the points of
+  // a bucket in increasing index order)
+  head = malloc((nbx*nbz+1)*sizeof(int));
+  list = malloc(npts*sizeof(int));
+  for(ib=0; ib<=nbx*nbz; ib++){head[ib] = 0;}
+  for(ipts=0; ipts<npts; ipts++){
+    ibx = (int)((xp[ipts]-xmin)/hb);
+    ibz = (int)((zp[ipts]-zmin)/hb);
+    if(ibx > nbx-1){ibx = nbx-1;}
+    if(ibz > nbz-1){ibz = nbz-1;}
+    head[ibz*nbx+ibx+1] += 1;
+  }
+  for(ib=0; ib<nbx*nbz; ib++){head[ib+1] += head[ib];}
+  for(ipts=0; ipts<npts; ipts++){
+    ibx = (int)((xp[ipts]-xmin)/hb);
+    ibz = (int)((zp[ipts]-zmin)/hb);
+    if(ibx > nbx-1){ibx = nbx-1;}
+    if(ibz > nbz-1){ibz = nbz-1;}
+    ib = ibz*nbx+ibx;
+    list[head[ib]] = ipts;
+    head[ib] += 1;
+  }
+  for(ib=nbx*nbz; ib>0; ib--){head[ib] = head[ib-1];}
+  head[0] = 0;
+
+  for(i2=0; i2<n2; i2++){
+    x = (float)(i2)*dh;
+    ibx = (int)floor((x-xmin)/hb);
+    if(ibx < 0){ibx = 0;}
+    if(ibx > nbx-1){ibx = nbx-1;}
+    for(i1=0; i1<n1; i1++){
+      z = (float)(i1)*dh;
+      ibz = (int)floor((z-zmin)/hb);
+      if(ibz < 0){ibz = 0;}
+      if(ibz > nbz-1){ibz = nbz-1;}
+      dmin = 0.;
+      imin = -1;
+      for(r=0; r<=rmax; r++){
+	// Buckets of the ring r
+	for(jbz=ibz-r; jbz<=ibz+r; jbz++){
+	  if(jbz < 0 || jbz > nbz-1){continue;}
+	  for(jbx=ibx-r; jbx<=ibx+r; jbx++){
+	    if(jbx < 0 || jbx > nbx-1){continue;}
+	    if(abs(jbx-ibx) != r && abs(jbz-ibz) != r){continue;}
+	    ib = jbz*nbx+jbx;
+	    for(k=head[ib]; k<head[ib+1]; k++){
+	      ipts = list[k];
+	      d = sqrt((x-xp[ipts])*(x-xp[ipts])			\
+		       +(z-zp[ipts])*(z-zp[ipts]));
+	      if(imin < 0 || d < dmin || (d == dmin && ipts < imin)){
+		dmin = d;
+		imin = ipts;
+	      }
+	    }
+	  }
+	}
+	// Lower bound of the distance to the points outside the ring
+	if(imin >= 0){
+	  if(ibx-r <= 0 && ibx+r >= nbx-1 && ibz-r <= 0 && ibz+r >= nbz-1){break;}
+	  lb = dmin+1.;
+	  if(ibx-r > 0){e = x-(xmin+(float)(ibx-r)*hb); if(e < lb){lb = e;}}
+	  if(ibx+r < nbx-1){e = (xmin+(float)(ibx+r+1)*hb)-x; if(e < lb){lb = e;}}
+	  if(ibz-r > 0){e = z-(zmin+(float)(ibz-r)*hb); if(e < lb){lb = e;}}
+	  if(ibz+r < nbz-1){e = (zmin+(float)(ibz+r+1)*hb)-z; if(e < lb){lb = e;}}
+	  if(lb*(1.-1.e-5) > dmin){break;}
+	}
+      }
+      inear[i1][i2] = imin;
+      dnear[i1][i2] = dmin;
+    }
+  }
+
+  free(head);
+  free(list);
+
+  return;
+  
+}
@@ -0,0 +1,188 @@
+/* pso/nessi_grd_sibson.c
+ * 
+ * Copyright (C) 2017, 2018 Damien Pageot
+ * 
+ * This program is free software: you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation, either version 3 of the License, or
+ * (at your option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ * GNU General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program.  If not, see <http://www.gnu.org/licenses/>.
+ */
+
+#include <nessi_grd.h>
+
+// * Minimum and maximum between two integers
+static int
+imin(const int a, const int b){if(a>b){return b;}else{return a;}}
+
+static int
+imax(const int a, const int b){if(a<b){return b;}else{return a;}}
+
+// * Largest integer k such as k*k <= n
+static int
+grd_isqrt(const long n)
+{
+  int k;
+  k = (int)sqrt((double)n);
+  while((long)k*k > n){k--;}
+  while((long)(k+1)*(k+1) <= n){k++;}
+  return k;
+}
+
+// * Discrete Sibson (natural neighbour) interpolation.
+// * Each node a spreads the value of its nearest control point to the
+// * nodes b of the disk |a-b| <= dmin(a), dmin(a) being the distance of
+// * a to its nearest control point. The disks are described by squared
+// * distances in grid units, so no square root is computed per pair.
+// * weighted == 0: the values are averaged (row spans of the disks are
+// * accumulated in difference arrays).
+// * weighted == 1: the values are weighted by the inverse distance |a-b|
+// * (taken from a table indexed by the offsets between a and b).
+// * The nprop properties of the control points are interpolated with the
+// * same disks and weights. All work arrays are allocated on the heap.
+void
+nessi_grd_sibson(const int npts,
+		 const float xp[npts], const float zp[npts],
+		 const int nprop, const float val[npts][nprop],
+		 const int n1, const int n2, const float dh,
+		 const int weighted, float model[nprop][n1][n2])
+{
+  int i1a, i2a, i1b, i2b, di1, di2, h, hl, hr, m, ma, i2min, i2max, ip;
+  long ib;
+  long k, kmax, r2;
+  int (*inear)[n2];
+  float (*dnear)[n2];
+  long (*kdisk)[n2];
+  double t;
+  double *dcp, *dnp;
+  float vf;
+  float *cp, *np, *cpr, *npr, *wtab, *wrow;
+
+  // Nearest control point and squared disk radius (grid units) of each
+  // node
+  inear = malloc(sizeof(int[n1][n2]));
+  dnear = malloc(sizeof(float[n1][n2]));
+  kdisk = malloc(sizeof(long[n1][n2]));
+  nessi_grd_nearest(npts, xp, zp, n1, n2, dh, inear, dnear);
+  kmax = 0;
+  for(i1a=0; i1a<n1; i1a++){
+    for(i2a=0; i2a<n2; i2a++){
+      // Same single precision test as |a-b| <= dmin
+      t = (double)dnear[i1a][i2a]/(double)dh;
+      k = (long)floor(t*t);
+      while(sqrtf((float)(k+1)*dh*dh) <= dnear[i1a][i2a]){k++;}
+      while(k > 0 && sqrtf((float)k*dh*dh) > dnear[i1a][i2a]){k--;}
+      kdisk[i1a][i2a] = k;
+      if(k > kmax){kmax = k;}
+    }
+  }
+
+  if(weighted == 0){
+    // Row spans of the disks in difference arrays
+    dcp = calloc((long)nprop*n1*(n2+1), sizeof(double));
+    dnp = calloc((long)n1*(n2+1), sizeof(double));
+    for(i1a=0; i1a<n1; i1a++){
+      for(i2a=0; i2a<n2; i2a++){
+	k = kdisk[i1a][i2a];
+	// Half widths of the disk rows, from the center row outwards
+	ma = grd_isqrt(k);
+	h = ma;
+	for(di1=0; di1<=ma; di1++){
+	  while((long)h*h > k-(long)di1*di1){h--;}
+	  i2min = i2a-h;
+	  if(i2min < 0){i2min = 0;}
+	  i2max = i2a+h+1;
+	  if(i2max > n2){i2max = n2;}
+	  for(i1b=i1a-di1; i1b<=i1a+di1; i1b+=imax(2*di1, 1)){
+	    if(i1b < 0 || i1b > n1-1){continue;}
+	    for(ip=0; ip<nprop; ip++){
+	      ib = ((long)ip*n1+i1b)*(n2+1);
+	      dcp[ib+i2min] += val[inear[i1a][i2a]][ip];
+	      dcp[ib+i2max] -= val[inear[i1a][i2a]][ip];
+	    }
+	    dnp[(long)i1b*(n2+1)+i2min] += 1.;
+	    dnp[(long)i1b*(n2+1)+i2max] -= 1.;
+	  }
+	}
+      }
+    }
+    for(i1b=0; i1b<n1; i1b++){
+      for(i2b=1; i2b<n2; i2b++){
+	dnp[(long)i1b*(n2+1)+i2b] += dnp[(long)i1b*(n2+1)+i2b-1];
+      }
+      for(ip=0; ip<nprop; ip++){
+	ib = ((long)ip*n1+i1b)*(n2+1);
+	for(i2b=1; i2b<n2; i2b++){dcp[ib+i2b] += dcp[ib+i2b-1];}
+	for(i2b=0; i2b<n2; i2b++){
+	  model[ip][i1b][i2b] = dcp[ib+i2b]/dnp[(long)i1b*(n2+1)+i2b];
+	}
+      }
+    }
+    free(dcp);
+    free(dnp);
+  }
+  else{
+    // Inverse distance weights of the offsets (di1, di2), di1, di2 >= 0
+    m = grd_isqrt(kmax);
+    wtab = malloc((long)(m+1)*(m+1)*sizeof(float));
+    for(di1=0; di1<=m; di1++){
+      for(di2=0; di2<=m; di2++){
+	r2 = (long)di1*di1+(long)di2*di2;
+	if(r2 == 0){wtab[0] = 1.;}
+	else{wtab[(long)di1*(m+1)+di2] = 1./(dh*sqrt((double)r2));}
+      }
+    }
+
+    cp = calloc((long)nprop*n1*n2, sizeof(float));
+    np = calloc((long)n1*n2, sizeof(float));
+    for(i1a=0; i1a<n1; i1a++){
+      for(i2a=0; i2a<n2; i2a++){
+	k = kdisk[i1a][i2a];
+	ma = grd_isqrt(k);
+	h = ma;
+	for(di1=0; di1<=ma; di1++){
+	  while((long)h*h > k-(long)di1*di1){h--;}
+	  wrow = &wtab[(long)di1*(m+1)];
+	  // Number of nodes at the left and right of a in the disk row
+	  hl = imin(h, i2a);
+	  hr = imin(h, n2-1-i2a);
+	  for(i1b=i1a-di1; i1b<=i1a+di1; i1b+=imax(2*di1, 1)){
+	    if(i1b < 0 || i1b > n1-1){continue;}
+	    npr = &np[(long)i1b*n2+i2a];
+	    for(di2=-hl; di2<=hr; di2++){npr[di2] += wrow[abs(di2)];}
+	    for(ip=0; ip<nprop; ip++){
+	      cpr = &cp[((long)ip*n1+i1b)*n2+i2a];
+	      vf = val[inear[i1a][i2a]][ip];
+	      for(di2=0; di2<=hr; di2++){cpr[di2] += vf*wrow[di2];}
+	      for(di2=1; di2<=hl; di2++){cpr[-di2] += vf*wrow[di2];}
+	    }
+	  }
+	}
+      }
+    }
+    for(ip=0; ip<nprop; ip++){
+      for(i1b=0; i1b<n1; i1b++){
+	for(i2b=0; i2b<n2; i2b++){
+	  model[ip][i1b][i2b] = cp[((long)ip*n1+i1b)*n2+i2b]/np[(long)i1b*n2+i2b];
+	}
+      }
+    }
+    free(wtab);
+    free(cp);
+    free(np);
+  }
+
+  free(inear);
+  free(dnear);
+  free(kdisk);
+
+  return;
+  
+}
@@ -25,24 +25,23 @@ nessi_grd_vrn(const int npts,
 	      const int n1, const int n2, const float dh,
 	      float model[n1][n2])
 {
-  int i1, i2, ipts, imin;
-  float x, z;
-  float d, dmin;
-    
+  int i1, i2;
+  int (*inear)[n2];
+  float (*dnear)[n2];
+
+  // Nearest control point of each node
+  inear = malloc(sizeof(int[n1][n2]));
+  dnear = malloc(sizeof(float[n1][n2]));
+  nessi_grd_nearest(npts, xp, zp, n1, n2, dh, inear, dnear);
+
   for(i2=0; i2<n2; i2++){
     for(i1=0; i1<n1; i1++){
-      x = (float)(i2)*dh;
-      z = (float)(i1)*dh;
-      dmin = 0.;
-      for(ipts=0; ipts<npts; ipts++){
-	d = sqrt((x-xp[ipts])*(x-xp[ipts])			\
-		 +(z-zp[ipts])*(z-zp[ipts]));
-	if(ipts == 0){dmin = d; imin = ipts;}
-	else{if(d < dmin){dmin = d; imin=ipts;}}
-      }
-      model[i1][i2] = val[imin];
+      model[i1][i2] = val[inear[i1][i2]];
     }
   }
+
+  free(inear);
+  free(dnear);
     
   return;
   
@@ -29,8 +29,23 @@
    - nessi_grd_idw()
    - nessi_grd_ds1()
    - nessi_grd_ds2()
+   - nessi_grd_nearest()
+   - nessi_grd_sibson()
  */
 
+void
+nessi_grd_nearest(const int npts,
+		  const float xp[npts], const float zp[npts],
+		  const int n1, const int n2, const float dh,
+		  int inear[n1][n2], float dnear[n1][n2]);
+
+void
+nessi_grd_sibson(const int npts,
+		 const float xp[npts], const float zp[npts],
+		 const int nprop, const float val[npts][nprop],
+		 const int n1, const int n2, const float dh,
+		 const int weighted, float model[nprop][n1][n2]);
+
 void
 nessi_grd_vrn(const int npts,
 	      const float xp[npts], const float zp[npts],
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -------------------------------------------------------------------
+# Filename: test_interp2d.py
+#   Author: Damien Pageot
+#    Email: nessi.develop@protonmail.com
+#
+# Copyright (C) 2018 Damien Pageot
+# ------------------------------------------------------------------
+"""
+Test suite for the coarse to fine grid interpolation
+(nessi.modbuilder.interp2d)
+
+:copyright:
+    Damien Pageot (nessi.develop@protonmail.com)
+:license:
+    GNU Lesser General Public License, Version 3
+    (https://www.gnu.org/copyleft/lesser.html)
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+from nessi.modbuilder.interp2d import voronoi
+from nessi.modbuilder.interp2d import sibson1
+from nessi.modbuilder.interp2d import sibson2
+
+def _points(npts=25):
+    """
+    Random control points with three properties.
+    """
+    rand = np.random.RandomState(0)
+    xp = rand.rand(npts)*35.
+    zp = rand.rand(npts)*15.
+    val = rand.rand(npts, 3)
+    return xp, zp, val
+
+def test_voronoi():
+    """
+    modbuilder.interp2d.voronoi against a brute force nearest point search.
+    """
+    xp, zp, val = _points()
+    n1 = 30
+    n2 = 70
+    dh = 0.5
+
+    model = voronoi(len(xp), xp, zp, val[:, 0], n1, n2, dh)
+
+    x = np.arange(0, n2)*dh
+    z = np.arange(0, n1)*dh
+    d = (x[np.newaxis, :, np.newaxis]-xp)**2+(z[:, np.newaxis, np.newaxis]-zp)**2
+    output = val[np.argmin(d, axis=2), 0].astype(np.float32)
+
+    np.testing.assert_equal(model, output)
+
+def test_sibson():
+    """
+    modbuilder.interp2d.sibson1 and sibson2 against a brute force discrete
+    natural neighbour interpolation.
+    """
+    xp, zp, val = _points(10)
+    n1 = 12
+    n2 = 24
+    dh = 1.25
+
+    # Nearest control point of each node a and distances between nodes a, b
+    x = np.tile(np.arange(0, n2)*dh, n1).astype(np.float32)
+    z = np.repeat(np.arange(0, n1)*dh, n2).astype(np.float32)
+    dp = np.sqrt((x[:, np.newaxis]-xp.astype(np.float32))**2
+                 +(z[:, np.newaxis]-zp.astype(np.float32))**2)
+    inear = np.argmin(dp, axis=1)
+    dmin = dp[np.arange(0, n1*n2), inear]
+    d = np.sqrt((x[:, np.newaxis]-x)**2+(z[:, np.newaxis]-z)**2)
+
+    # Each node a spreads its Voronoi value to the nodes b of its disk
+    disk = d <= dmin[:, np.newaxis]
+    for interp, weight in [(sibson1, np.ones(d.shape)),
+                           (sibson2, 1./np.where(d > 0., d, 1.))]:
+        w = np.where(disk, weight, 0.)
+        output = np.sum(w*val[inear, 0][:, np.newaxis], axis=0)/np.sum(w, axis=0)
+        model = interp(len(xp), xp, zp, val[:, 0], n1, n2, dh)
+        np.testing.assert_allclose(model, output.reshape(n1, n2), rtol=1.e-5)
+
+def test_multi_property():
+    """
+    modbuilder.interp2d functions for several properties in one pass.
+    """
+    xp, zp, val = _points()
+    n1 = 30
+    n2 = 70
+    dh = 0.5
+
+    for interp in [voronoi, sibson1, sibson2]:
+        models = interp(len(xp), xp, zp, val, n1, n2, dh)
+        np.testing.assert_equal(models.shape, (3, n1, n2))
+        for iprop in range(0, 3):
+            model = interp(len(xp), xp, zp, val[:, iprop], n1, n2, dh)
+            np.testing.assert_allclose(models[iprop], model, rtol=1.e-6)
+
+if __name__ == "__main__" :
+    np.testing.run_module_suite()
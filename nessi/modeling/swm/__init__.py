@@ -11,11 +11,21 @@ from __future__ import (absolute_import,
 from .swmwrap import modext
 from .swmwrap import modbuo
 from .swmwrap import modlame
+from .swmwrap import modcoef
 from .swmwrap import acqpos
 from .swmwrap import pmlmod
+from .swmwrap import pmlcoef
 from .swmwrap import ricker
 from .swmwrap import srcspread
 from .swmwrap import evolution
+from .swmwrap import evolution_fused
+from .swmwrap import evolution_strip
+
+# swmmpi is only built with an MPI compiler (make swmmpi)
+try:
+    from .swmmpi import evolution_mpi
+except ImportError:
+    pass
 
 if __name__ == '__main__':
     import doctest
@@ -0,0 +1,300 @@
+! -------------------------------------------------------------------
+! Filename: swm_mpi.f90
+!   Author: Damien Pageot
+!    Email: nessi.develop@protonmail.com
+!
+! Copyright (C) 2018 Damien Pageot
+! ------------------------------------------------------------------
+! subroutines evolution_mpi, mpi_halo
+! :copyright:
+!     Damien Pageot (nessi.develop@protonmail.com)
+! :license:
+!     GNU Lesser General Public License, Version 3
+!     (https://www.gnu.org/copyleft/lesser.html)
+! ------------------------------------------------------------------
+
+subroutine evolution_mpi(n1, n2, h, npml, nt, nts, dt, nrec, srctype, &
+     tsrc, gsrc, recx, recz, recp, recpos, isurf, cbux, cbuz, clb0, clbmu, &
+     cmue, lbsurf, ax0, bx0, ax1, bx1, az0, bz0, az1, bz1, comm, nthreads)
+  !> @brief Marching of evolution_strip with the columns of the extended
+  !> grid split between the processes of the MPI communicator comm (Fortran
+  !> handle, e.g. comm.py2f() with mpi4py). Each process updates the tiles
+  !> of a slab of at least two columns, with two halo columns on each side
+  !> for the 4th order stencils. The halos of the velocities are exchanged
+  !> after the velocity update, the halos of the stresses after the stress
+  !> update. The seismograms are summed over the processes and returned by
+  !> all of them. Snapshots are not written.
+  !> nthreads sets the number of OpenMP threads of each process (default
+  !> number of threads if nthreads <= 0) and leaves the default number of
+  !> threads unchanged.
+
+  use mpi
+  !$ use omp_lib
+
+  implicit none
+
+  integer, intent(in) :: n1, n2, npml
+  integer, intent(in) :: nt, nts, nrec, srctype
+  integer, intent(in) :: isurf, comm, nthreads
+  real(4), intent(in) :: dt, h
+
+  real(4), dimension(nt), intent(in) :: tsrc
+  real(4), dimension(n1+2*npml,n2+2*npml), intent(in) :: gsrc
+
+  integer, dimension(nrec,2), intent(in) :: recpos
+
+  real(4), dimension(nts, nrec), intent(out) :: recx, recz, recp
+  real(4), dimension(n1+2*npml, n2+2*npml), intent(in) :: cbux, cbuz, clb0, clbmu, cmue
+  real(4), dimension(n2+2*npml), intent(in) :: lbsurf, ax0, bx0, ax1, bx1
+  real(4), dimension(n1+2*npml), intent(in) :: az0, bz0, az1, bz1
+
+  ! >> Tile size
+  integer, parameter :: nb1=1024, nb2=8
+
+  integer :: it, its, ets, n1e, n2e
+  integer :: ix, iz, irec, itt
+  integer :: itile, ntile, narea, i1b, i1e, i2b, i2e, ia, i2, nthr
+  integer :: rank, nproc, left, right, ierr
+  integer :: j1, j2, l1, l2
+  real(4) :: srcv, srcs
+
+  real, allocatable :: ux(:, :), uz(:, :), txx(:, :), tzz(:, :), txz(:, :)
+  real, allocatable :: press(:, :)
+
+  ! >> Split velocities and stresses of the strip tiles
+  real, allocatable :: vsplit(:), ssplit(:)
+
+  ! >> Vertical velocity above the free surface before its update
+  real, allocatable :: uzs(:)
+
+  integer, allocatable :: tiles(:, :)
+
+  n1e = n1+2*npml
+  n2e = n2+2*npml
+
+  ! >> Slab of columns j1 to j2 and its halos (columns l1 to l2)
+  call MPI_Comm_rank(comm, rank, ierr)
+  call MPI_Comm_size(comm, nproc, ierr)
+  if(n2e < 2*nproc)then
+     write(*, *) 'evolution_mpi: less than two columns per process'
+     call MPI_Abort(comm, 1, ierr)
+  end if
+  j1 = 1+(rank*n2e)/nproc
+  j2 = ((rank+1)*n2e)/nproc
+  l1 = max(j1-2, 1)
+  l2 = min(j2+2, n2e)
+  left = rank-1
+  right = rank+1
+  if(rank == 0) left = MPI_PROC_NULL
+  if(rank == nproc-1) right = MPI_PROC_NULL
+
+  ! >> Cut the slab in tiles
+  call strip_tiles(n1e, n2e, npml, isurf, j1, j2, nb1, nb2, 0, ntile, narea, tiles)
+  allocate (tiles(5, ntile))
+  call strip_tiles(n1e, n2e, npml, isurf, j1, j2, nb1, nb2, 1, ntile, narea, tiles)
+
+  ! >> Allocate and initialize fields
+  allocate (ux(n1e, l1:l2), uz(n1e, l1:l2))
+  allocate (txx(n1e, l1:l2), tzz(n1e, l1:l2), txz(n1e, l1:l2))
+  allocate (press(n1e, l1:l2))
+  ! Interior tiles are given unused split arrays of at least one tile
+  allocate (vsplit(4*max(narea, nb1*nb2)), ssplit(6*max(narea, nb1*nb2)))
+  allocate (uzs(l1:l2))
+
+  ! >> Number of threads of the parallel regions (the default number of
+  ! threads of the program is left unchanged)
+  nthr = nthreads
+  !$ if(nthreads <= 0) nthr = omp_get_max_threads()
+
+  ! >> First touch of the fields by the threads updating each tile
+  !$OMP PARALLEL DO SCHEDULE(STATIC) DEFAULT(SHARED) NUM_THREADS(nthr) &
+  !$OMP PRIVATE(itile, i1b, i1e, i2b, i2e, ia)
+  do itile=1,ntile
+     i1b = tiles(1, itile)
+     i1e = tiles(2, itile)
+     i2b = tiles(3, itile)
+     i2e = tiles(4, itile)
+     ia = tiles(5, itile)
+     ux(i1b:i1e, i2b:i2e) = 0.
+     uz(i1b:i1e, i2b:i2e) = 0.
+     txx(i1b:i1e, i2b:i2e) = 0.
+     tzz(i1b:i1e, i2b:i2e) = 0.
+     txz(i1b:i1e, i2b:i2e) = 0.
+     press(i1b:i1e, i2b:i2e) = 0.
+     if(ia >= 0)then
+        vsplit(4*ia+1:4*(ia+(i1e-i1b+1)*(i2e-i2b+1))) = 0.
+        ssplit(6*ia+1:6*(ia+(i1e-i1b+1)*(i2e-i2b+1))) = 0.
+     end if
+  end do
+  !$OMP END PARALLEL DO
+  ux(:, l1:j1-1) = 0.
+  ux(:, j2+1:l2) = 0.
+  uz(:, l1:j1-1) = 0.
+  uz(:, j2+1:l2) = 0.
+  txx(:, l1:j1-1) = 0.
+  txx(:, j2+1:l2) = 0.
+  tzz(:, l1:j1-1) = 0.
+  tzz(:, j2+1:l2) = 0.
+  txz(:, l1:j1-1) = 0.
+  txz(:, j2+1:l2) = 0.
+  press(:, l1:j1-1) = 0.
+  press(:, j2+1:l2) = 0.
+  uzs(:) = 0.
+
+  recx(:, :) = 0.
+  recz(:, :) = 0.
+  recp(:, :) = 0.
+
+  ! >> Initialize sampling parameters
+  its = 1
+  itt = 1
+  ets = (nt-1)/(nts-1)
+
+  ! >> Start marching
+  do it=1,nt
+
+     ! >> Source terms of the vertical force (times cbuz) and explosion
+     srcv = 0.
+     srcs = 0.
+     if(srctype == 2) srcv = tsrc(it)/h
+     if(srctype == 1) srcs = tsrc(it)/(h*h)*dt
+
+     !$OMP PARALLEL DEFAULT(SHARED) NUM_THREADS(nthr) &
+     !$OMP PRIVATE(itile, i1b, i1e, i2b, i2e, ia, i2)
+
+     ! The free surface condition only holds for the stress update
+     if(isurf == 1)then
+        !$OMP DO SCHEDULE(STATIC)
+        do i2=j1,j2
+           uz(npml, i2) = uzs(i2)
+        end do
+        !$OMP END DO
+     end if
+
+     !# >> Velocities
+     !$OMP DO SCHEDULE(STATIC)
+     do itile=1,ntile
+        i1b = tiles(1, itile)
+        i1e = tiles(2, itile)
+        i2b = tiles(3, itile)
+        i2e = tiles(4, itile)
+        ia = tiles(5, itile)
+        call strip_velocity(n1e, n2e, npml, isurf, srcv, l1, l2, &
+             i1b, i1e, i2b, i2e, ia, vsplit(4*max(ia, 0)+1), gsrc(1, l1), &
+             cbux(1, l1), cbuz(1, l1), ax0(l1), bx0(l1), ax1(l1), bx1(l1), &
+             az0, bz0, az1, bz1, txx, tzz, txz, ux, uz)
+     end do
+     !$OMP END DO
+
+     !$OMP MASTER
+     call mpi_halo(n1e, l1, l2, j1, j2, left, right, comm, ux, uz)
+     !$OMP END MASTER
+     !$OMP BARRIER
+
+     !# >> Free surface (halo columns included for the stress update)
+     if(isurf == 1)then
+        !$OMP DO SCHEDULE(STATIC)
+        do i2=l1,l2
+           uzs(i2) = uz(npml, i2)
+           if(i2 > l1) uz(npml, i2) = uz(npml+1, i2)+&
+                lbsurf(i2)*(ux(npml+1, i2)-ux(npml+1, i2-1))
+        end do
+        !$OMP END DO
+     endif
+
+     !# >> Pressure and stresses
+     !$OMP DO SCHEDULE(STATIC)
+     do itile=1,ntile
+        i1b = tiles(1, itile)
+        i1e = tiles(2, itile)
+        i2b = tiles(3, itile)
+        i2e = tiles(4, itile)
+        ia = tiles(5, itile)
+        call strip_pressure(n1e, n2e, npml, isurf, dt, l1, l2, &
+             i1b, i1e, i2b, i2e, clbmu(1, l1), ux, uz, uzs, press)
+        call strip_stress(n1e, n2e, npml, isurf, srcs, l1, l2, &
+             i1b, i1e, i2b, i2e, ia, ssplit(6*max(ia, 0)+1), gsrc(1, l1), &
+             clb0(1, l1), clbmu(1, l1), cmue(1, l1), lbsurf(l1), &
+             ax0(l1), bx0(l1), ax1(l1), bx1(l1), az0, bz0, az1, bz1, ux, uz, &
+             txx, tzz, txz)
+     end do
+     !$OMP END DO
+
+     if(isurf == 1)then
+        !$OMP DO SCHEDULE(STATIC)
+        do i2=j1,j2
+           tzz(npml+1, i2) = 0.
+           tzz(npml, i2) = -tzz(npml+2, i2)
+           txz(npml, i2) = -txz(npml+1, i2)
+           txz(npml-1, i2) = -txz(npml+2, i2)
+        end do
+        !$OMP END DO
+     end if
+
+     !$OMP MASTER
+     call mpi_halo(n1e, l1, l2, j1, j2, left, right, comm, txx, txz)
+     !$OMP END MASTER
+
+     !$OMP END PARALLEL
+
+     if(its == ets .or. it == 1)then
+        its = 1
+        do irec=1,nrec
+           ix = recpos(irec, 1)
+           iz = recpos(irec, 2)
+           if(ix >= j1 .and. ix <= j2)then
+              recx(itt, irec) = ux(iz,ix)
+              recz(itt, irec) = uz(iz,ix)
+              recp(itt, irec) = press(iz, ix)
+           end if
+        end do
+        itt = itt + 1
+     else
+        its = its + 1
+     end if
+
+  end do
+
+  ! >> Each receiver is recorded by one process
+  call MPI_Allreduce(MPI_IN_PLACE, recx, nts*nrec, MPI_REAL, MPI_SUM, comm, ierr)
+  call MPI_Allreduce(MPI_IN_PLACE, recz, nts*nrec, MPI_REAL, MPI_SUM, comm, ierr)
+  call MPI_Allreduce(MPI_IN_PLACE, recp, nts*nrec, MPI_REAL, MPI_SUM, comm, ierr)
+
+  deallocate (ux, uz, txx, tzz, txz, press)
+  deallocate (vsplit, ssplit, uzs, tiles)
+
+end subroutine evolution_mpi
+
+subroutine mpi_halo(n1e, l1, l2, j1, j2, left, right, comm, f, g)
+  !> @brief Exchange the two halo columns of the fields f and g, which
+  !> hold the columns l1 to l2 of the slab of columns j1 to j2, with the
+  !> left and right processes (MPI_PROC_NULL at the edges of the grid).
+
+  use mpi
+
+  implicit none
+
+  integer, intent(in) :: n1e, l1, l2, j1, j2, left, right, comm
+  real(4), dimension(n1e, l1:l2), intent(inout) :: f, g
+
+  integer :: nreq, ierr
+  integer, dimension(8) :: req
+
+  nreq = 0
+  if(left /= MPI_PROC_NULL)then
+     call MPI_Irecv(f(1, j1-2), 2*n1e, MPI_REAL, left, 1, comm, req(nreq+1), ierr)
+     call MPI_Irecv(g(1, j1-2), 2*n1e, MPI_REAL, left, 2, comm, req(nreq+2), ierr)
+     call MPI_Isend(f(1, j1), 2*n1e, MPI_REAL, left, 3, comm, req(nreq+3), ierr)
+     call MPI_Isend(g(1, j1), 2*n1e, MPI_REAL, left, 4, comm, req(nreq+4), ierr)
+     nreq = nreq+4
+  end if
+  if(right /= MPI_PROC_NULL)then
+     call MPI_Irecv(f(1, j2+1), 2*n1e, MPI_REAL, right, 3, comm, req(nreq+1), ierr)
+     call MPI_Irecv(g(1, j2+1), 2*n1e, MPI_REAL, right, 4, comm, req(nreq+2), ierr)
+     call MPI_Isend(f(1, j2-1), 2*n1e, MPI_REAL, right, 1, comm, req(nreq+3), ierr)
+     call MPI_Isend(g(1, j2-1), 2*n1e, MPI_REAL, right, 2, comm, req(nreq+4), ierr)
+     nreq = nreq+4
+  end if
+  call MPI_Waitall(nreq, req, MPI_STATUSES_IGNORE, ierr)
+
+end subroutine mpi_halo
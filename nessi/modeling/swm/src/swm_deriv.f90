@@ -5,7 +5,8 @@
 !
 ! Copyright (C) 2018 Damien Pageot
 ! ------------------------------------------------------------------
-! subroutines dxforward, dxbackward, dzforward, dzbackward
+! subroutines dxforward, dxbackward, dzforward, dzbackward and their
+! tile versions
 ! :copyright:
 !     Damien Pageot (nessi.develop@protonmail.com)
 ! :license:
@@ -151,3 +152,145 @@ subroutine dzbackward(f, n1, n2, nsp, d, isurf)
   d(n1,:) = f(n1,:)-f(n1-1,:)
 
 end subroutine dzbackward
+
+subroutine dxforward_tile(f, n1, n2, j1, j2, i1b, i1e, i2b, i2e, d)
+  !> @brief dxforward on the tile [i1b:i1e, i2b:i2e] of a grid of n2
+  !> columns. f holds the columns j1 to j2 of the grid.
+  !> @param[out] d  derivative on the tile
+  !> @param[in]  f  array of size n1*(j2-j1+1) to derive
+  !> @param[in]  n1 The number of grid points in the first direction (z)
+  !> @param[in]  n2 The number of grid points in the second direction (x)
+  integer :: i1, i2
+
+  real, parameter :: c1=(9./8.), c2=(-1./24.)
+  integer, intent(in) :: n1, n2, j1, j2, i1b, i1e, i2b, i2e
+  real(4), dimension(n1,j1:j2), intent(in) :: f
+  real(4), dimension(i1b:i1e,i2b:i2e), intent(out) :: d
+
+  do i2=i2b,i2e
+     if(i2 >= 2 .and. i2 <= n2-2)then
+        !! >> 4th order derivative
+        do i1=i1b,i1e
+           d(i1,i2) = c1*(f(i1,i2+1)-f(i1,i2))+c2*(f(i1,i2+2)-f(i1,i2-1))
+        end do
+     else if(i2 == 1 .or. i2 == n2-1)then
+        !! >> 2nd order derivative
+        do i1=i1b,i1e
+           d(i1,i2) = f(i1,i2+1)-f(i1,i2)
+        end do
+     else
+        d(:,i2) = 0.
+     end if
+  end do
+
+end subroutine dxforward_tile
+
+subroutine dxbackward_tile(f, n1, n2, j1, j2, i1b, i1e, i2b, i2e, d)
+  !> @brief dxbackward on the tile [i1b:i1e, i2b:i2e] of a grid of n2
+  !> columns. f holds the columns j1 to j2 of the grid.
+  !> @param[out] d  derivative on the tile
+  !> @param[in]  f  array of size n1*(j2-j1+1) to derive
+  !> @param[in]  n1 The number of grid points in the first direction (z)
+  !> @param[in]  n2 The number of grid points in the second direction (x)
+  integer :: i1, i2
+
+  real, parameter :: c1=(9./8.), c2=(-1./24.)
+  integer, intent(in) :: n1, n2, j1, j2, i1b, i1e, i2b, i2e
+  real(4), dimension(n1,j1:j2), intent(in) :: f
+  real(4), dimension(i1b:i1e,i2b:i2e), intent(out) :: d
+
+  do i2=i2b,i2e
+     if(i2 >= 3 .and. i2 <= n2-1)then
+        !! >> 4th order derivative
+        do i1=i1b,i1e
+           d(i1,i2) = c1*(f(i1,i2)-f(i1,i2-1))+c2*(f(i1,i2+1)-f(i1,i2-2))
+        end do
+     else if(i2 == 2 .or. i2 == n2)then
+        !! >> 2nd order derivative
+        do i1=i1b,i1e
+           d(i1,i2) = f(i1,i2)-f(i1,i2-1)
+        end do
+     else
+        d(:,i2) = 0.
+     end if
+  end do
+
+end subroutine dxbackward_tile
+
+subroutine dzforward_tile(f, n1, j1, j2, nsp, isurf, i1b, i1e, i2b, i2e, d)
+  !> @brief dzforward on the tile [i1b:i1e, i2b:i2e] of a grid of n1
+  !> rows. f holds the columns j1 to j2 of the grid.
+  !> @param[out] d  derivative on the tile
+  !> @param[in]  f  array of size n1*(j2-j1+1) to derive
+  !> @param[in]  n1 The number of grid points in the first direction (z)
+  integer :: i1, i2, i1beg, i2nd
+
+  real, parameter :: c1=(9./8.), c2=(-1./24.)
+  integer, intent(in) :: n1, j1, j2, nsp, isurf, i1b, i1e, i2b, i2e
+  real(4), dimension(n1,j1:j2), intent(in) :: f
+  real(4), dimension(i1b:i1e,i2b:i2e), intent(out) :: d
+
+  if(isurf == 1)then
+     i1beg = nsp+2
+     i2nd = nsp+1
+  else
+     i1beg = 2
+     i2nd = 1
+  endif
+
+  d(:, :) = 0.
+
+  do i2=i2b,i2e
+     !! >> 4th order derivative
+     do i1=max(i1b,i1beg),min(i1e,n1-2)
+        d(i1,i2) = c1*(f(i1+1,i2)-f(i1,i2))+c2*(f(i1+2,i2)-f(i1-1,i2))
+     end do
+     !! >> 2nd order derivative
+     if(i2nd >= i1b .and. i2nd <= i1e)then
+        d(i2nd,i2) = f(i2nd+1,i2)-f(i2nd,i2)
+     end if
+     if(n1-1 >= i1b .and. n1-1 <= i1e)then
+        d(n1-1,i2) = f(n1,i2)-f(n1-1,i2)
+     end if
+  end do
+
+end subroutine dzforward_tile
+
+subroutine dzbackward_tile(f, n1, j1, j2, nsp, isurf, i1b, i1e, i2b, i2e, d)
+  !> @brief dzbackward on the tile [i1b:i1e, i2b:i2e] of a grid of n1
+  !> rows. f holds the columns j1 to j2 of the grid.
+  !> @param[out] d  derivative on the tile
+  !> @param[in]  f  array of size n1*(j2-j1+1) to derive
+  !> @param[in]  n1 The number of grid points in the first direction (z)
+  integer :: i1, i2, i1beg, i2nd
+
+  real, parameter :: c1=(9./8.), c2=(-1./24.)
+  integer, intent(in) :: n1, j1, j2, nsp, isurf, i1b, i1e, i2b, i2e
+  real(4), dimension(n1,j1:j2), intent(in) :: f
+  real(4), dimension(i1b:i1e,i2b:i2e), intent(out) :: d
+
+  if(isurf == 1)then
+     i1beg = nsp+2
+     i2nd = nsp+1
+  else
+     i1beg = 3
+     i2nd = 2
+  endif
+
+  d(:, :) = 0.
+
+  do i2=i2b,i2e
+     !! >> 4th order derivative
+     do i1=max(i1b,i1beg),min(i1e,n1-1)
+        d(i1,i2) = c1*(f(i1,i2)-f(i1-1,i2))+c2*(f(i1+1,i2)-f(i1-2,i2))
+     end do
+     !! >> 2nd order derivative
+     if(i2nd >= i1b .and. i2nd <= i1e)then
+        d(i2nd,i2) = f(i2nd,i2)-f(i2nd-1,i2)
+     end if
+     if(n1 >= i1b .and. n1 <= i1e)then
+        d(n1,i2) = f(n1,i2)-f(n1-1,i2)
+     end if
+  end do
+
+end subroutine dzbackward_tile
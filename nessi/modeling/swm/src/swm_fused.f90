@@ -0,0 +1,392 @@
+! -------------------------------------------------------------------
+! Filename: swm_fused.f90
+!   Author: Damien Pageot
+!    Email: nessi.develop@protonmail.com
+!
+! Copyright (C) 2018 Damien Pageot
+! ------------------------------------------------------------------
+! subroutines evolution_fused, velocity_tile, stress_tile, snapshot
+! :copyright:
+!     Damien Pageot (nessi.develop@protonmail.com)
+! :license:
+!     GNU Lesser General Public License, Version 3
+!     (https://www.gnu.org/copyleft/lesser.html)
+! ------------------------------------------------------------------
+
+subroutine evolution_fused(n1, n2, h, npml, nt, nts, ntsnap, dt, nrec, srctype, &
+     tsrc, gsrc, recx, recz, recp, recpos, isurf, isnap, bux, buz, lb0, lbmu, mue, &
+     pmlx0, pmlx1, pmlz0, pmlz1)
+  !> @brief Same marching as evolution, by tiles of nb1*nb2 grid points.
+  !> Each time step is made of two sweeps over the tiles, one for the
+  !> velocities and one for the pressure and stresses. The derivatives
+  !> of a tile are computed in tile arrays which stay in cache with the
+  !> fields they update. Both subroutines give the same seismograms.
+
+  implicit none
+
+  integer, intent(in) :: n1, n2, npml
+  integer, intent(in) :: nt, nts, ntsnap, nrec, srctype
+  integer, intent(in) :: isurf, isnap
+  real(4), intent(in) :: dt, h
+
+  real(4), dimension(nt), intent(in) :: tsrc
+  real(4), dimension(n1+2*npml,n2+2*npml), intent(in) :: gsrc
+  real(4), dimension(n1+2*npml, n2+2*npml), intent(in) :: pmlx0, pmlx1, pmlz0, pmlz1
+
+  integer, dimension(nrec,2), intent(in) :: recpos
+
+  real(4), dimension(nts, nrec), intent(out) :: recx, recz, recp
+  real(4), dimension(n1+2*npml, n2+2*npml), intent(in) :: bux, buz, lb0, lbmu, mue
+
+  ! >> Tile size
+  integer, parameter :: nb1=1024, nb2=8
+
+  integer :: i1, i2, it, its, ets, itsnap, n1e, n2e
+  integer :: etsnap, ix, iz, irec, itt
+
+  real, allocatable :: ux(:, :), uz(:, :), txx(:, :), tzz(:, :), txz(:, :)
+  real, allocatable :: uxx(:, :), uxz(:, :)
+  real, allocatable :: uzx(:, :), uzz(:, :)
+  real, allocatable :: txxx(:, :), txxz(:, :)
+  real, allocatable :: tzzx(:, :), tzzz(:, :)
+  real, allocatable :: txzx(:, :), txzz(:, :)
+
+  real, allocatable :: press(:, :)
+
+  ! >> Vertical velocity above the free surface before its update
+  real, allocatable :: uzs(:)
+
+  n1e = n1+2*npml
+  n2e = n2+2*npml
+
+  ! >> Allocate and initialize fields
+  allocate (ux(n1e, n2e), uz(n1e, n2e))
+  allocate (txx(n1e, n2e), tzz(n1e, n2e), txz(n1e, n2e))
+  allocate (uxx(n1e, n2e), uxz(n1e, n2e), uzx(n1e, n2e), uzz(n1e, n2e))
+  allocate (txxx(n1e, n2e), txxz(n1e, n2e))
+  allocate (tzzx(n1e, n2e), tzzz(n1e, n2e))
+  allocate (txzx(n1e, n2e), txzz(n1e, n2e))
+  allocate (press(n1e, n2e))
+  allocate (uzs(n2e))
+
+  ux(:, :) = 0.
+  uz(:, :) = 0.
+  uxx(:, :) = 0.
+  uxz(:, :) = 0.
+  uzx(:, :) = 0.
+  uzz(:, :) = 0.
+  txx(:, :) = 0.
+  tzz(:, :) = 0.
+  txz(:, :) = 0.
+  txxx(:, :) = 0.
+  txxz(:, :) = 0.
+  tzzx(:, :) = 0.
+  tzzz(:, :) = 0.
+  txzx(:, :) = 0.
+  txzz(:, :) = 0.
+  press(:, :) = 0.
+  uzs(:) = 0.
+
+  ! >> Initialize marching and sampling parameters
+  its = 1
+  itsnap = 1
+  itt = 1
+  ets = (nt-1)/(nts-1)
+  etsnap = (nt-1)/(ntsnap-1)
+
+  ! >> Start marching
+  do it=1,nt
+
+     !# >> Velocities
+     do i2=1,n2e,nb2
+        do i1=1,n1e,nb1
+           call velocity_tile(n1e, n2e, npml, isurf, srctype, dt, h, tsrc(it), &
+                i1, min(i1+nb1-1, n1e), i2, min(i2+nb2-1, n2e), gsrc, bux, buz, &
+                pmlx0, pmlx1, pmlz0, pmlz1, txx, tzz, txz, uxx, uxz, uzx, uzz, ux, uz)
+        end do
+     end do
+
+     !# >> Free surface
+     if(isurf == 1)then
+        uzs(:) = uz(npml, :)
+        do i2=2,n2e
+           uz(npml, i2) = uz(npml+1, i2)+&
+                lb0(npml+1, i2)/lbmu(npml+1,i2)*&
+                (ux(npml+1,i2)-ux(npml+1,i2-1))
+        enddo
+     endif
+
+     !# >> Pressure and stresses
+     do i2=1,n2e,nb2
+        do i1=1,n1e,nb1
+           call stress_tile(n1e, n2e, npml, isurf, srctype, dt, h, tsrc(it), &
+                i1, min(i1+nb1-1, n1e), i2, min(i2+nb2-1, n2e), gsrc, lb0, lbmu, &
+                mue, pmlx0, pmlx1, pmlz0, pmlz1, ux, uz, uzs, txxx, txxz, tzzx, &
+                tzzz, txzx, txzz, txx, tzz, txz, press)
+        end do
+     end do
+
+     if(isurf == 1)then
+        tzz(npml+1,:) = 0.
+        tzz(npml,:) = -tzz(npml+2,:)
+        txz(npml,:) = -txz(npml+1,:)
+        txz(npml-1,:) = -txz(npml+2,:)
+     end if
+
+     if((itsnap == etsnap .or. it == 1) .and. isnap == 1)then
+        itsnap = 1
+        call snapshot(n1e, n2e, it, ux, uz, press)
+     else
+        itsnap = itsnap+1
+     endif
+
+     if(its == ets .or. it == 1)then
+        its = 1
+        do irec=1,nrec
+           ix = recpos(irec, 1)
+           iz = recpos(irec, 2)
+           recx(itt, irec) = ux(iz,ix)
+           recz(itt, irec) = uz(iz,ix)
+           recp(itt, irec) = press(iz, ix)
+        end do
+        itt = itt + 1
+     else
+        its = its + 1
+     end if
+
+  end do
+
+  deallocate (ux, uz, txx, tzz, txz)
+  deallocate (uxx, uxz, uzx, uzz)
+  deallocate (txxx, txxz, tzzx, tzzz, txzx, txzz)
+  deallocate (press, uzs)
+
+end subroutine evolution_fused
+
+subroutine velocity_tile(n1e, n2e, npml, isurf, srctype, dt, h, src, &
+     i1b, i1e, i2b, i2e, gsrc, bux, buz, pmlx0, pmlx1, pmlz0, pmlz1, &
+     txx, tzz, txz, uxx, uxz, uzx, uzz, ux, uz)
+  !> @brief Update the velocities of the tile [i1b:i1e, i2b:i2e] (see
+  !> evolution_fused). src is the source amplitude of the time step.
+
+  implicit none
+
+  integer, intent(in) :: n1e, n2e, npml, isurf, srctype
+  integer, intent(in) :: i1b, i1e, i2b, i2e
+  real(4), intent(in) :: dt, h, src
+  real(4), dimension(n1e, n2e), intent(in) :: gsrc, bux, buz
+  real(4), dimension(n1e, n2e), intent(in) :: pmlx0, pmlx1, pmlz0, pmlz1
+  real(4), dimension(n1e, n2e), intent(in) :: txx, tzz, txz
+  real(4), dimension(n1e, n2e), intent(inout) :: uxx, uxz, uzx, uzz
+  real(4), dimension(n1e, n2e), intent(inout) :: ux, uz
+
+  real(4), dimension(i1b:i1e, i2b:i2e) :: d1, d2
+  integer :: j1, j2
+
+  !# >> Ux
+  call dxforward_tile(txx, n1e, n2e, 1, n2e, i1b, i1e, i2b, i2e, d2)
+  call dzbackward_tile(txz, n1e, 1, n2e, npml, isurf, i1b, i1e, i2b, i2e, d1)
+
+  do j2=i2b,i2e
+     do j1=i1b,i1e
+        uxx(j1, j2) = (((1./dt-pmlx1(j1,j2))*uxx(j1, j2) &
+             +(1./h)*bux(j1, j2)*d2(j1, j2))/(1./dt+pmlx1(j1, j2)))
+        uxz(j1, j2) = (((1./dt-pmlz0(j1,j2))*uxz(j1, j2) &
+             +(1./h)*bux(j1, j2)*d1(j1, j2))/(1./dt+pmlz0(j1, j2)))
+     end do
+  end do
+
+  !# >> Uz
+  call dxbackward_tile(txz, n1e, n2e, 1, n2e, i1b, i1e, i2b, i2e, d2)
+  call dzforward_tile(tzz, n1e, 1, n2e, npml, isurf, i1b, i1e, i2b, i2e, d1)
+
+  do j2=i2b,i2e
+     if (srctype == 2) then
+        !# Vertical body force source
+        do j1=i1b,i1e
+           uzx(j1, j2) = (((1./dt-pmlx0(j1,j2))*uzx(j1, j2) &
+                +(1./h)*buz(j1, j2)*d2(j1, j2))/(1./dt+pmlx0(j1, j2))) &
+                +buz(j1, j2)*(src*gsrc(j1, j2)*dt/(h*h))
+        end do
+     else
+        do j1=i1b,i1e
+           uzx(j1, j2) = (((1./dt-pmlx0(j1,j2))*uzx(j1, j2) &
+                +(1./h)*buz(j1, j2)*d2(j1, j2))/(1./dt+pmlx0(j1, j2)))
+        end do
+     end if
+     do j1=i1b,i1e
+        uzz(j1, j2) = (((1./dt-pmlz1(j1,j2))*uzz(j1, j2) &
+             +(1./h)*buz(j1, j2)*d1(j1, j2))/(1./dt+pmlz1(j1, j2)))
+     end do
+  end do
+
+  !# >> Dirichlet boundary conditions on the four edges of the grid
+  if(i1b == 1)then
+     uxx(1, i2b:i2e) = 0.
+     uxz(1, i2b:i2e) = 0.
+     uzx(1, i2b:i2e) = 0.
+     uzz(1, i2b:i2e) = 0.
+  end if
+  if(i1e == n1e)then
+     uxx(n1e, i2b:i2e) = 0.
+     uxz(n1e, i2b:i2e) = 0.
+     uzx(n1e, i2b:i2e) = 0.
+     uzz(n1e, i2b:i2e) = 0.
+  end if
+  if(i2b == 1)then
+     uxx(i1b:i1e, 1) = 0.
+     uxz(i1b:i1e, 1) = 0.
+     uzx(i1b:i1e, 1) = 0.
+     uzz(i1b:i1e, 1) = 0.
+  end if
+  if(i2e == n2e)then
+     uxx(i1b:i1e, n2e) = 0.
+     uxz(i1b:i1e, n2e) = 0.
+     uzx(i1b:i1e, n2e) = 0.
+     uzz(i1b:i1e, n2e) = 0.
+  end if
+
+  do j2=i2b,i2e
+     do j1=i1b,i1e
+        ux(j1, j2) = uxx(j1, j2)+uxz(j1, j2)
+        uz(j1, j2) = uzx(j1, j2)+uzz(j1, j2)
+     end do
+  end do
+
+end subroutine velocity_tile
+
+subroutine stress_tile(n1e, n2e, npml, isurf, srctype, dt, h, src, &
+     i1b, i1e, i2b, i2e, gsrc, lb0, lbmu, mue, pmlx0, pmlx1, pmlz0, pmlz1, &
+     ux, uz, uzs, txxx, txxz, tzzx, tzzz, txzx, txzz, txx, tzz, txz, press)
+  !> @brief Update the pressure and stresses of the tile [i1b:i1e, i2b:i2e]
+  !> (see evolution_fused). src is the source amplitude of the time step
+  !> and uzs the vertical velocity above the free surface before its
+  !> update.
+
+  implicit none
+
+  integer, intent(in) :: n1e, n2e, npml, isurf, srctype
+  integer, intent(in) :: i1b, i1e, i2b, i2e
+  real(4), intent(in) :: dt, h, src
+  real(4), dimension(n1e, n2e), intent(in) :: gsrc, lb0, lbmu, mue
+  real(4), dimension(n1e, n2e), intent(in) :: pmlx0, pmlx1, pmlz0, pmlz1
+  real(4), dimension(n1e, n2e), intent(in) :: ux, uz
+  real(4), dimension(n2e), intent(in) :: uzs
+  real(4), dimension(n1e, n2e), intent(inout) :: txxx, txxz, tzzx, tzzz
+  real(4), dimension(n1e, n2e), intent(inout) :: txzx, txzz
+  real(4), dimension(n1e, n2e), intent(inout) :: txx, tzz, txz, press
+
+  real(4), dimension(i1b:i1e, i2b:i2e) :: d1, d2
+  real(4), dimension(i2b:i2e) :: tmp
+  integer :: j1, j2
+
+  !# PRESSURE
+  do j2=max(i2b,2),min(i2e,n2e-1)
+     do j1=max(i1b,2),min(i1e,n1e-1)
+        press(j1, j2) = (-lbmu(j1, j2)/h)*(ux(j1,j2)-ux(j1,j2-1) &
+             +uz(j1,j2)-uz(j1-1,j2))
+     enddo
+     ! Pressure is computed before the free surface condition
+     if(isurf == 1 .and. npml >= max(i1b,2) .and. npml <= i1e)then
+        j1 = npml
+        press(j1, j2) = (-lbmu(j1, j2)/h)*(ux(j1,j2)-ux(j1,j2-1) &
+             +uzs(j2)-uz(j1-1,j2))
+     end if
+     if(isurf == 1 .and. npml+1 >= i1b .and. npml+1 <= i1e)then
+        j1 = npml+1
+        press(j1, j2) = (-lbmu(j1, j2)/h)*(ux(j1,j2)-ux(j1,j2-1) &
+             +uz(j1,j2)-uzs(j2))
+     end if
+  enddo
+
+  !# TXX -- TZZ
+  call dxbackward_tile(ux, n1e, n2e, 1, n2e, i1b, i1e, i2b, i2e, d2)
+  call dzbackward_tile(uz, n1e, 1, n2e, npml, isurf, i1b, i1e, i2b, i2e, d1)
+
+  if(isurf == 1 .and. npml+1 >= i1b .and. npml+1 <= i1e)then
+     tmp(:) = txxz(npml+1, i2b:i2e)
+  end if
+
+  do j2=i2b,i2e
+     if(srctype == 1)then
+        !# Explosive source
+        do j1=i1b,i1e
+           txxx(j1, j2) = (((1./dt-pmlx0(j1,j2))*txxx(j1, j2) &
+                +(1./h)*lbmu(j1, j2)*d2(j1, j2))/(1./dt+pmlx0(j1, j2))) &
+                +(src*gsrc(j1,j2))/(h*h)*dt
+           tzzx(j1, j2) = (((1./dt-pmlx0(j1,j2))*tzzx(j1, j2) &
+                +(1./h)*lb0(j1, j2)*d2(j1, j2))/(1./dt+pmlx0(j1, j2))) &
+                +(src*gsrc(j1,j2))/(h*h)*dt
+        end do
+     else
+        do j1=i1b,i1e
+           txxx(j1, j2) = (((1./dt-pmlx0(j1,j2))*txxx(j1, j2) &
+                +(1./h)*lbmu(j1, j2)*d2(j1, j2))/(1./dt+pmlx0(j1, j2)))
+           tzzx(j1, j2) = (((1./dt-pmlx0(j1,j2))*tzzx(j1, j2) &
+                +(1./h)*lb0(j1, j2)*d2(j1, j2))/(1./dt+pmlx0(j1, j2)))
+        end do
+     end if
+     do j1=i1b,i1e
+        txxz(j1, j2) = (((1./dt-pmlz0(j1,j2))*txxz(j1, j2) &
+             +(1./h)*lb0(j1, j2)*d1(j1, j2))/(1./dt+pmlz0(j1, j2)))
+        tzzz(j1, j2) = (((1./dt-pmlz0(j1,j2))*tzzz(j1, j2) &
+             +(1./h)*lbmu(j1, j2)*d1(j1, j2))/(1./dt+pmlz0(j1, j2)))
+     end do
+  end do
+
+  if(isurf == 1 .and. npml+1 >= i1b .and. npml+1 <= i1e)then
+     j1 = npml+1
+     do j2=i2b,i2e
+        txxz(j1 ,j2) = (((1./dt-pmlx0(j1,j2))*tmp(j2) &
+             -(1./h)*lb0(j1, j2)*lb0(j1, j2)/lbmu(j1,j2)&
+             *(uz(j1,j2)-uz(j1-1,j2)))/(1./dt+pmlx0(j1, j2)))
+     end do
+  end if
+
+  do j2=i2b,i2e
+     do j1=i1b,i1e
+        txx(j1, j2) = txxx(j1, j2) + txxz(j1, j2)
+        tzz(j1, j2) = tzzx(j1, j2) + tzzz(j1, j2)
+     end do
+  end do
+
+  !# TXZ
+  call dxforward_tile(uz, n1e, n2e, 1, n2e, i1b, i1e, i2b, i2e, d2)
+  call dzforward_tile(ux, n1e, 1, n2e, npml, isurf, i1b, i1e, i2b, i2e, d1)
+
+  do j2=i2b,i2e
+     do j1=i1b,i1e
+        txzx(j1, j2) = (((1./dt-pmlx1(j1,j2))*txzx(j1, j2) &
+             +(1./h)*mue(j1, j2)*d2(j1, j2))/(1./dt+pmlx1(j1, j2)))
+        txzz(j1, j2) = (((1./dt-pmlz1(j1,j2))*txzz(j1, j2) &
+             +(1./h)*mue(j1, j2)*d1(j1, j2))/(1./dt+pmlz1(j1, j2)))
+        txz(j1, j2) = txzx(j1, j2)+txzz(j1, j2)
+     end do
+  end do
+
+end subroutine stress_tile
+
+subroutine snapshot(n1e, n2e, it, ux, uz, press)
+  !> @brief Write the velocity and pressure fields of time step it in the
+  !> snapx, snapz and snapp files (e.g. snapz00012).
+  integer, intent(in) :: n1e, n2e, it
+  real(4), dimension(n1e, n2e), intent(in) :: ux, uz, press
+
+  character(len=80) :: snapfile
+
+  if(it >= 100000) return
+
+  write (snapfile, "(A5,I5.5)") "snapz", it
+  open(31, file=snapfile, access='direct', recl=n1e*n2e*4)
+  write(31, rec=1) uz
+  close(31)
+  write (snapfile, "(A5,I5.5)") "snapx", it
+  open(32, file=snapfile, access='direct', recl=n1e*n2e*4)
+  write(32, rec=1) ux
+  close(32)
+  write (snapfile, "(A5,I5.5)") "snapp", it
+  open(33, file=snapfile, access='direct', recl=n1e*n2e*4)
+  write(33, rec=1) press
+  close(33)
+
+end subroutine snapshot
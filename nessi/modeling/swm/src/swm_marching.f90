@@ -170,12 +170,14 @@ subroutine evolution(n1, n2, h, npml, nt, nts, ntsnap, dt, nrec, srctype, &
      ! implement Dirichlet boundary conditions on the four edges of the grid
 
      !# PRESSURE
+     !$OMP PARALLEL DO SHARED(n1e, n2e, h, lbmu, ux, uz, press) PRIVATE(i1)
      do i2=1,n2e-1
         do i1=2,n1e-1
            press(i1, i2) = (-lbmu(i1, i2)/h)*(ux(i1,i2)-ux(i1,i2-1) &
                 +uz(i1,i2)-uz(i1-1,i2))
         enddo
      enddo
+     !$OMP END PARALLEL DO
 
      !# TXX -- TZZ
      if(isurf == 1)then
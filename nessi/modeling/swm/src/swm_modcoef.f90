@@ -0,0 +1,49 @@
+! -------------------------------------------------------------------
+! Filename: swm_modcoef.f90
+!   Author: Damien Pageot
+!    Email: nessi.develop@protonmail.com
+!
+! Copyright (C) 2018 Damien Pageot
+! ------------------------------------------------------------------
+! subroutine modcoef
+! :copyright:
+!     Damien Pageot (nessi.develop@protonmail.com)
+! :license:
+!     GNU Lesser General Public License, Version 3
+!     (https://www.gnu.org/copyleft/lesser.html)
+! ------------------------------------------------------------------
+
+subroutine modcoef (n1e, n2e, npml, h, dt, bux, buz, lb0, lbmu, mue, &
+     cbux, cbuz, clb0, clbmu, cmue, lbsurf)
+    !! subroutine: modcoef
+    !> \brief calculate the update coefficients of the marching from the
+    !> buoyancy and Lame models, once per model and time step.
+    !> \param[in] n1e The number of grid points in the first direction (z)
+    !> \param[in] n2e The number of grid points in the second direction (x)
+    !> \param[in] npml Number of grid points of the absorbing strips
+    !> \param[in] h Grid spacing
+    !> \param[in] dt Time step
+    !> \param[in] bux, buz Extended buoyancy models of size (n1e, n2e)
+    !> \param[in] lb0, lbmu, mue Extended Lame models of size (n1e, n2e)
+    !> \param[out] cbux, cbuz, clb0, clbmu, cmue Models multiplied by dt/h
+    !> \param[out] lbsurf lb0/lbmu below the free surface of size n2e
+
+    integer, intent(in) :: n1e, n2e, npml
+    real(4), intent(in) :: h, dt
+    real(4), dimension(n1e, n2e), intent(in) :: bux, buz, lb0, lbmu, mue
+    real(4), dimension(n1e, n2e), intent(out) :: cbux, cbuz, clb0, clbmu, cmue
+    real(4), dimension(n2e), intent(out) :: lbsurf
+
+    real(4) :: dth
+
+    dth = dt/h
+
+    cbux(:, :) = dth*bux(:, :)
+    cbuz(:, :) = dth*buz(:, :)
+    clb0(:, :) = dth*lb0(:, :)
+    clbmu(:, :) = dth*lbmu(:, :)
+    cmue(:, :) = dth*mue(:, :)
+
+    lbsurf(:) = lb0(npml+1, :)/lbmu(npml+1, :)
+
+end subroutine modcoef
@@ -5,7 +5,7 @@
 !
 ! Copyright (C) 2018 Damien Pageot
 ! ------------------------------------------------------------------
-! subroutines pmlmod, dirichlet
+! subroutines pmlmod, pmlcoef, dirichlet
 ! :copyright:
 !     Damien Pageot (nessi.develop@protonmail.com)
 ! :license:
@@ -69,6 +69,32 @@ subroutine pmlmod (n1, n2, h, isurf, npml, apml, ppml, pmlx0, pmlx1, pmlz0, pmlz
 
 end subroutine pmlmod
 
+subroutine pmlcoef (n1e, n2e, dt, pmlx0, pmlx1, pmlz0, pmlz1, &
+     ax0, bx0, ax1, bx1, az0, bz0, az1, bz1)
+
+  ! Damping coefficients of the split fields along x and z. A field f
+  ! damped by pml is updated as f = a*f+b*df, with a = (1-dt*pml)/(1+dt*pml)
+  ! and b = 1/(1+dt*pml), instead of f = ((1/dt-pml)*f+df/dt)/(1/dt+pml).
+  ! The pml arrays of pmlmod only vary along x (pmlx0, pmlx1) or z (pmlz0,
+  ! pmlz1).
+
+  integer, intent(in) :: n1e, n2e
+  real(4), intent(in) :: dt
+  real(4), dimension(n1e, n2e), intent(in) :: pmlx0, pmlx1, pmlz0, pmlz1
+  real(4), dimension(n2e), intent(out) :: ax0, bx0, ax1, bx1
+  real(4), dimension(n1e), intent(out) :: az0, bz0, az1, bz1
+
+  bx0(:) = 1./(1.+dt*pmlx0(1, :))
+  ax0(:) = (1.-dt*pmlx0(1, :))*bx0(:)
+  bx1(:) = 1./(1.+dt*pmlx1(1, :))
+  ax1(:) = (1.-dt*pmlx1(1, :))*bx1(:)
+  bz0(:) = 1./(1.+dt*pmlz0(:, 1))
+  az0(:) = (1.-dt*pmlz0(:, 1))*bz0(:)
+  bz1(:) = 1./(1.+dt*pmlz1(:, 1))
+  az1(:) = (1.-dt*pmlz1(:, 1))*bz1(:)
+
+end subroutine pmlcoef
+
 
 subroutine dirichlet(n1e, n2e, uxx, uxz, uzx, uzz)
   ! implement Dirichlet boundary conditions on the four edges of the grid
@@ -0,0 +1,549 @@
+! -------------------------------------------------------------------
+! Filename: swm_strip.f90
+!   Author: Damien Pageot
+!    Email: nessi.develop@protonmail.com
+!
+! Copyright (C) 2018 Damien Pageot
+! ------------------------------------------------------------------
+! subroutines evolution_strip, strip_tiles, strip_velocity, strip_stress,
+! strip_pressure
+! :copyright:
+!     Damien Pageot (nessi.develop@protonmail.com)
+! :license:
+!     GNU Lesser General Public License, Version 3
+!     (https://www.gnu.org/copyleft/lesser.html)
+! ------------------------------------------------------------------
+
+subroutine evolution_strip(n1, n2, h, npml, nt, nts, ntsnap, dt, nrec, srctype, &
+     tsrc, gsrc, recx, recz, recp, recpos, isurf, isnap, cbux, cbuz, clb0, clbmu, &
+     cmue, lbsurf, ax0, bx0, ax1, bx1, az0, bz0, az1, bz1, nthreads)
+  !> @brief Marching with split fields in the absorbing strips only.
+  !> The pml arrays built by pmlmod are zero out of the npml+1 grid
+  !> points wide strips along the edges of the extended grid (except the
+  !> top strip with a free surface). The grid is cut in tiles lying either
+  !> in the strips or in the interior. Interior tiles are updated with
+  !> unsplit and undamped fields, strip tiles with split and damped fields
+  !> stored for the strip tiles only, as in evolution_fused.
+  !> The update coefficients are computed once per model by modcoef
+  !> (cbux, cbuz, clb0, clbmu, cmue, lbsurf) and pmlcoef (ax0, bx0, ax1,
+  !> bx1, az0, bz0, az1, bz1), so that the time steps only use products
+  !> and sums.
+  !> Each time step runs in one OpenMP parallel region where the threads
+  !> share the tiles with a static schedule. The fields are initialized
+  !> with the same schedule, so that the pages of each tile are allocated
+  !> close to the thread updating it. nthreads sets the number of threads
+  !> of the parallel regions (default number of threads if nthreads <= 0)
+  !> and leaves the default number of threads unchanged.
+
+  !$ use omp_lib
+
+  implicit none
+
+  integer, intent(in) :: n1, n2, npml
+  integer, intent(in) :: nt, nts, ntsnap, nrec, srctype
+  integer, intent(in) :: isurf, isnap, nthreads
+  real(4), intent(in) :: dt, h
+
+  real(4), dimension(nt), intent(in) :: tsrc
+  real(4), dimension(n1+2*npml,n2+2*npml), intent(in) :: gsrc
+
+  integer, dimension(nrec,2), intent(in) :: recpos
+
+  real(4), dimension(nts, nrec), intent(out) :: recx, recz, recp
+  real(4), dimension(n1+2*npml, n2+2*npml), intent(in) :: cbux, cbuz, clb0, clbmu, cmue
+  real(4), dimension(n2+2*npml), intent(in) :: lbsurf, ax0, bx0, ax1, bx1
+  real(4), dimension(n1+2*npml), intent(in) :: az0, bz0, az1, bz1
+
+  ! >> Tile size
+  integer, parameter :: nb1=1024, nb2=8
+
+  integer :: it, its, ets, itsnap, n1e, n2e
+  integer :: etsnap, ix, iz, irec, itt
+  integer :: itile, ntile, narea, i1b, i1e, i2b, i2e, ia, i2, nthr
+  real(4) :: srcv, srcs
+
+  real, allocatable :: ux(:, :), uz(:, :), txx(:, :), tzz(:, :), txz(:, :)
+  real, allocatable :: press(:, :)
+
+  ! >> Split velocities and stresses of the strip tiles
+  real, allocatable :: vsplit(:), ssplit(:)
+
+  ! >> Vertical velocity above the free surface before its update
+  real, allocatable :: uzs(:)
+
+  integer, allocatable :: tiles(:, :)
+
+  n1e = n1+2*npml
+  n2e = n2+2*npml
+
+  ! >> Cut the grid in tiles
+  call strip_tiles(n1e, n2e, npml, isurf, 1, n2e, nb1, nb2, 0, ntile, narea, tiles)
+  allocate (tiles(5, ntile))
+  call strip_tiles(n1e, n2e, npml, isurf, 1, n2e, nb1, nb2, 1, ntile, narea, tiles)
+
+  ! >> Allocate and initialize fields
+  allocate (ux(n1e, n2e), uz(n1e, n2e))
+  allocate (txx(n1e, n2e), tzz(n1e, n2e), txz(n1e, n2e))
+  allocate (press(n1e, n2e))
+  ! Interior tiles are given unused split arrays of at least one tile
+  allocate (vsplit(4*max(narea, nb1*nb2)), ssplit(6*max(narea, nb1*nb2)))
+  allocate (uzs(n2e))
+
+  ! >> Number of threads of the parallel regions (the default number of
+  ! threads of the program is left unchanged)
+  nthr = nthreads
+  !$ if(nthreads <= 0) nthr = omp_get_max_threads()
+
+  ! >> First touch of the fields by the threads updating each tile
+  !$OMP PARALLEL DO SCHEDULE(STATIC) DEFAULT(SHARED) NUM_THREADS(nthr) &
+  !$OMP PRIVATE(itile, i1b, i1e, i2b, i2e, ia)
+  do itile=1,ntile
+     i1b = tiles(1, itile)
+     i1e = tiles(2, itile)
+     i2b = tiles(3, itile)
+     i2e = tiles(4, itile)
+     ia = tiles(5, itile)
+     ux(i1b:i1e, i2b:i2e) = 0.
+     uz(i1b:i1e, i2b:i2e) = 0.
+     txx(i1b:i1e, i2b:i2e) = 0.
+     tzz(i1b:i1e, i2b:i2e) = 0.
+     txz(i1b:i1e, i2b:i2e) = 0.
+     press(i1b:i1e, i2b:i2e) = 0.
+     if(ia >= 0)then
+        vsplit(4*ia+1:4*(ia+(i1e-i1b+1)*(i2e-i2b+1))) = 0.
+        ssplit(6*ia+1:6*(ia+(i1e-i1b+1)*(i2e-i2b+1))) = 0.
+     end if
+  end do
+  !$OMP END PARALLEL DO
+  uzs(:) = 0.
+
+  ! >> Initialize marching and sampling parameters
+  its = 1
+  itsnap = 1
+  itt = 1
+  ets = (nt-1)/(nts-1)
+  etsnap = (nt-1)/(ntsnap-1)
+
+  ! >> Start marching
+  do it=1,nt
+
+     ! >> Source terms of the vertical force (times cbuz) and explosion
+     srcv = 0.
+     srcs = 0.
+     if(srctype == 2) srcv = tsrc(it)/h
+     if(srctype == 1) srcs = tsrc(it)/(h*h)*dt
+
+     !$OMP PARALLEL DEFAULT(SHARED) NUM_THREADS(nthr) &
+     !$OMP PRIVATE(itile, i1b, i1e, i2b, i2e, ia, i2)
+
+     ! The free surface condition only holds for the stress update
+     if(isurf == 1)then
+        !$OMP DO SCHEDULE(STATIC)
+        do i2=1,n2e
+           uz(npml, i2) = uzs(i2)
+        end do
+        !$OMP END DO
+     end if
+
+     !# >> Velocities
+     !$OMP DO SCHEDULE(STATIC)
+     do itile=1,ntile
+        i1b = tiles(1, itile)
+        i1e = tiles(2, itile)
+        i2b = tiles(3, itile)
+        i2e = tiles(4, itile)
+        ia = tiles(5, itile)
+        call strip_velocity(n1e, n2e, npml, isurf, srcv, 1, n2e, &
+             i1b, i1e, i2b, i2e, ia, vsplit(4*max(ia, 0)+1), gsrc, cbux, cbuz, &
+             ax0, bx0, ax1, bx1, az0, bz0, az1, bz1, txx, tzz, txz, ux, uz)
+     end do
+     !$OMP END DO
+
+     !# >> Free surface
+     if(isurf == 1)then
+        !$OMP DO SCHEDULE(STATIC)
+        do i2=1,n2e
+           uzs(i2) = uz(npml, i2)
+           if(i2 > 1) uz(npml, i2) = uz(npml+1, i2)+&
+                lbsurf(i2)*(ux(npml+1, i2)-ux(npml+1, i2-1))
+        end do
+        !$OMP END DO
+     endif
+
+     !# >> Pressure and stresses
+     !$OMP DO SCHEDULE(STATIC)
+     do itile=1,ntile
+        i1b = tiles(1, itile)
+        i1e = tiles(2, itile)
+        i2b = tiles(3, itile)
+        i2e = tiles(4, itile)
+        ia = tiles(5, itile)
+        call strip_pressure(n1e, n2e, npml, isurf, dt, 1, n2e, &
+             i1b, i1e, i2b, i2e, clbmu, ux, uz, uzs, press)
+        call strip_stress(n1e, n2e, npml, isurf, srcs, 1, n2e, &
+             i1b, i1e, i2b, i2e, ia, ssplit(6*max(ia, 0)+1), gsrc, clb0, clbmu, &
+             cmue, lbsurf, ax0, bx0, ax1, bx1, az0, bz0, az1, bz1, ux, uz, &
+             txx, tzz, txz)
+     end do
+     !$OMP END DO
+
+     if(isurf == 1)then
+        !$OMP DO SCHEDULE(STATIC)
+        do i2=1,n2e
+           tzz(npml+1, i2) = 0.
+           tzz(npml, i2) = -tzz(npml+2, i2)
+           txz(npml, i2) = -txz(npml+1, i2)
+           txz(npml-1, i2) = -txz(npml+2, i2)
+        end do
+        !$OMP END DO
+     end if
+
+     !$OMP END PARALLEL
+
+     if((itsnap == etsnap .or. it == 1) .and. isnap == 1)then
+        itsnap = 1
+        call snapshot(n1e, n2e, it, ux, uz, press)
+     else
+        itsnap = itsnap+1
+     endif
+
+     if(its == ets .or. it == 1)then
+        its = 1
+        do irec=1,nrec
+           ix = recpos(irec, 1)
+           iz = recpos(irec, 2)
+           recx(itt, irec) = ux(iz,ix)
+           recz(itt, irec) = uz(iz,ix)
+           recp(itt, irec) = press(iz, ix)
+        end do
+        itt = itt + 1
+     else
+        its = its + 1
+     end if
+
+  end do
+
+  deallocate (ux, uz, txx, tzz, txz, press)
+  deallocate (vsplit, ssplit, uzs, tiles)
+
+end subroutine evolution_strip
+
+subroutine strip_tiles(n1e, n2e, npml, isurf, j1, j2, nb1, nb2, ifill, &
+     ntile, narea, tiles)
+  !> @brief Cut the columns j1 to j2 of the extended grid in tiles of at
+  !> most nb1*nb2 grid points lying either in the absorbing strips or in
+  !> the interior. Call with ifill=0 to get ntile and narea, then with
+  !> ifill=1 to fill tiles.
+  !> @param[out] ntile number of tiles
+  !> @param[out] narea number of grid points in the strip tiles
+  !> @param[out] tiles i1b, i1e, i2b, i2e and first grid point of each
+  !> tile in the strip tile arrays (-1 for interior tiles)
+
+  implicit none
+
+  integer, intent(in) :: n1e, n2e, npml, isurf, j1, j2, nb1, nb2, ifill
+  integer, intent(out) :: ntile, narea
+  integer, dimension(5, *), intent(inout) :: tiles
+
+  integer :: nw, ib, ic, i1, i2, i2e, ir, nrow
+  integer, dimension(2, 3) :: rows
+  logical, dimension(3) :: strip
+  logical :: xstrip
+
+  nw = npml+1
+  ntile = 0
+  narea = 0
+
+  ! >> Column blocks do not cross the left and right strip limits
+  i2 = j1
+  do while(i2 <= j2)
+     if(i2 <= nw)then
+        i2e = min(i2+nb2-1, nw, j2)
+     else if(i2 <= n2e-nw)then
+        i2e = min(i2+nb2-1, n2e-nw, j2)
+     else
+        i2e = min(i2+nb2-1, j2)
+     end if
+     xstrip = (i2 <= nw .or. i2 > n2e-nw)
+
+     ! >> Row blocks of the top strip, interior and bottom strip
+     if(xstrip)then
+        nrow = 1
+        rows(:, 1) = (/ 1, n1e /)
+        strip(1) = .true.
+     else
+        nrow = 0
+        if(isurf /= 1)then
+           nrow = nrow+1
+           rows(:, nrow) = (/ 1, nw /)
+           strip(nrow) = .true.
+           ib = nw+1
+        else
+           ib = 1
+        end if
+        nrow = nrow+1
+        rows(:, nrow) = (/ ib, n1e-nw /)
+        strip(nrow) = .false.
+        nrow = nrow+1
+        rows(:, nrow) = (/ n1e-nw+1, n1e /)
+        strip(nrow) = .true.
+     end if
+
+     do ir=1,nrow
+        do i1=rows(1, ir),rows(2, ir),nb1
+           ntile = ntile+1
+           ic = min(i1+nb1-1, rows(2, ir))
+           if(ifill == 1)then
+              tiles(1, ntile) = i1
+              tiles(2, ntile) = ic
+              tiles(3, ntile) = i2
+              tiles(4, ntile) = i2e
+              tiles(5, ntile) = -1
+              if(strip(ir)) tiles(5, ntile) = narea
+           end if
+           if(strip(ir)) narea = narea+(ic-i1+1)*(i2e-i2+1)
+        end do
+     end do
+
+     i2 = i2e+1
+  end do
+
+end subroutine strip_tiles
+
+subroutine strip_velocity(n1e, n2e, npml, isurf, srcv, j1, j2, &
+     i1b, i1e, i2b, i2e, ia, vsplit, gsrc, cbux, cbuz, &
+     ax0, bx0, ax1, bx1, az0, bz0, az1, bz1, txx, tzz, txz, ux, uz)
+  !> @brief Update the velocities of the tile [i1b:i1e, i2b:i2e] (see
+  !> evolution_strip). The arrays hold the columns j1 to j2 of the grid.
+  !> Strip tiles (ia >= 0) also update their split velocities uxx, uxz,
+  !> uzx and uzz stored in vsplit. srcv is the vertical force of the
+  !> time step divided by h.
+
+  implicit none
+
+  integer, intent(in) :: n1e, n2e, npml, isurf
+  integer, intent(in) :: j1, j2, i1b, i1e, i2b, i2e, ia
+  real(4), intent(in) :: srcv
+  real(4), dimension(i1b:i1e, i2b:i2e, 4), intent(inout) :: vsplit
+  real(4), dimension(n1e, j1:j2), intent(in) :: gsrc, cbux, cbuz
+  real(4), dimension(j1:j2), intent(in) :: ax0, bx0, ax1, bx1
+  real(4), dimension(n1e), intent(in) :: az0, bz0, az1, bz1
+  real(4), dimension(n1e, j1:j2), intent(in) :: txx, tzz, txz
+  real(4), dimension(n1e, j1:j2), intent(inout) :: ux, uz
+
+  real(4), dimension(i1b:i1e, i2b:i2e) :: d1, d2
+  integer :: k1, k2
+
+  !# >> Ux
+  call dxforward_tile(txx, n1e, n2e, j1, j2, i1b, i1e, i2b, i2e, d2)
+  call dzbackward_tile(txz, n1e, j1, j2, npml, isurf, i1b, i1e, i2b, i2e, d1)
+
+  if(ia < 0)then
+     do k2=i2b,i2e
+        do k1=i1b,i1e
+           ux(k1, k2) = ux(k1, k2)+cbux(k1, k2)*(d2(k1, k2)+d1(k1, k2))
+        end do
+     end do
+  else
+     do k2=i2b,i2e
+        do k1=i1b,i1e
+           vsplit(k1, k2, 1) = ax1(k2)*vsplit(k1, k2, 1) &
+                +bx1(k2)*(cbux(k1, k2)*d2(k1, k2))
+           vsplit(k1, k2, 2) = az0(k1)*vsplit(k1, k2, 2) &
+                +bz0(k1)*(cbux(k1, k2)*d1(k1, k2))
+        end do
+     end do
+  end if
+
+  !# >> Uz
+  call dxbackward_tile(txz, n1e, n2e, j1, j2, i1b, i1e, i2b, i2e, d2)
+  call dzforward_tile(tzz, n1e, j1, j2, npml, isurf, i1b, i1e, i2b, i2e, d1)
+
+  if(ia < 0)then
+     do k2=i2b,i2e
+        do k1=i1b,i1e
+           uz(k1, k2) = uz(k1, k2)+cbuz(k1, k2)*(d2(k1, k2)+d1(k1, k2) &
+                +srcv*gsrc(k1, k2))
+        end do
+     end do
+  else
+     do k2=i2b,i2e
+        do k1=i1b,i1e
+           vsplit(k1, k2, 3) = ax0(k2)*vsplit(k1, k2, 3) &
+                +bx0(k2)*(cbuz(k1, k2)*d2(k1, k2)) &
+                +cbuz(k1, k2)*(srcv*gsrc(k1, k2))
+           vsplit(k1, k2, 4) = az1(k1)*vsplit(k1, k2, 4) &
+                +bz1(k1)*(cbuz(k1, k2)*d1(k1, k2))
+        end do
+     end do
+  end if
+
+  !# >> Dirichlet boundary conditions on the four edges of the grid
+  if(ia >= 0)then
+     if(i1b == 1) vsplit(1, :, :) = 0.
+     if(i1e == n1e) vsplit(n1e, :, :) = 0.
+     if(i2b == 1) vsplit(:, 1, :) = 0.
+     if(i2e == n2e) vsplit(:, n2e, :) = 0.
+     do k2=i2b,i2e
+        do k1=i1b,i1e
+           ux(k1, k2) = vsplit(k1, k2, 1)+vsplit(k1, k2, 2)
+           uz(k1, k2) = vsplit(k1, k2, 3)+vsplit(k1, k2, 4)
+        end do
+     end do
+  else
+     if(i1b == 1)then
+        ux(1, i2b:i2e) = 0.
+        uz(1, i2b:i2e) = 0.
+     end if
+     if(i1e == n1e)then
+        ux(n1e, i2b:i2e) = 0.
+        uz(n1e, i2b:i2e) = 0.
+     end if
+  end if
+
+end subroutine strip_velocity
+
+subroutine strip_pressure(n1e, n2e, npml, isurf, dt, j1, j2, &
+     i1b, i1e, i2b, i2e, clbmu, ux, uz, uzs, press)
+  !> @brief Pressure of the tile [i1b:i1e, i2b:i2e] (see
+  !> evolution_strip). uzs is the vertical velocity above the free surface
+  !> before its update.
+
+  implicit none
+
+  integer, intent(in) :: n1e, n2e, npml, isurf
+  integer, intent(in) :: j1, j2, i1b, i1e, i2b, i2e
+  real(4), intent(in) :: dt
+  real(4), dimension(n1e, j1:j2), intent(in) :: clbmu, ux, uz
+  real(4), dimension(j1:j2), intent(in) :: uzs
+  real(4), dimension(n1e, j1:j2), intent(inout) :: press
+
+  integer :: k1, k2
+  real(4) :: cp
+
+  ! clbmu is lbmu*dt/h
+  cp = -1./dt
+
+  do k2=max(i2b,2),min(i2e,n2e-1)
+     do k1=max(i1b,2),min(i1e,n1e-1)
+        press(k1, k2) = cp*clbmu(k1, k2)*(ux(k1,k2)-ux(k1,k2-1) &
+             +uz(k1,k2)-uz(k1-1,k2))
+     enddo
+     ! Pressure is computed before the free surface condition
+     if(isurf == 1 .and. npml >= max(i1b,2) .and. npml <= i1e)then
+        k1 = npml
+        press(k1, k2) = cp*clbmu(k1, k2)*(ux(k1,k2)-ux(k1,k2-1) &
+             +uzs(k2)-uz(k1-1,k2))
+     end if
+     if(isurf == 1 .and. npml+1 >= i1b .and. npml+1 <= i1e)then
+        k1 = npml+1
+        press(k1, k2) = cp*clbmu(k1, k2)*(ux(k1,k2)-ux(k1,k2-1) &
+             +uz(k1,k2)-uzs(k2))
+     end if
+  enddo
+
+end subroutine strip_pressure
+
+subroutine strip_stress(n1e, n2e, npml, isurf, srcs, j1, j2, &
+     i1b, i1e, i2b, i2e, ia, ssplit, gsrc, clb0, clbmu, cmue, lbsurf, &
+     ax0, bx0, ax1, bx1, az0, bz0, az1, bz1, ux, uz, txx, tzz, txz)
+  !> @brief Update the stresses of the tile [i1b:i1e, i2b:i2e] (see
+  !> evolution_strip). The arrays hold the columns j1 to j2 of the grid.
+  !> Strip tiles (ia >= 0) also update their split stresses txxx, txxz,
+  !> tzzx, tzzz, txzx and txzz stored in ssplit. srcs is the explosive
+  !> source of the time step times dt/h**2.
+
+  implicit none
+
+  integer, intent(in) :: n1e, n2e, npml, isurf
+  integer, intent(in) :: j1, j2, i1b, i1e, i2b, i2e, ia
+  real(4), intent(in) :: srcs
+  real(4), dimension(i1b:i1e, i2b:i2e, 6), intent(inout) :: ssplit
+  real(4), dimension(n1e, j1:j2), intent(in) :: gsrc, clb0, clbmu, cmue
+  real(4), dimension(j1:j2), intent(in) :: lbsurf, ax0, bx0, ax1, bx1
+  real(4), dimension(n1e), intent(in) :: az0, bz0, az1, bz1
+  real(4), dimension(n1e, j1:j2), intent(in) :: ux, uz
+  real(4), dimension(n1e, j1:j2), intent(inout) :: txx, tzz, txz
+
+  real(4), dimension(i1b:i1e, i2b:i2e) :: d1, d2
+  real(4), dimension(i2b:i2e) :: tmp
+  integer :: k1, k2
+  logical :: surface
+
+  surface = (isurf == 1 .and. npml+1 >= i1b .and. npml+1 <= i1e)
+
+  !# TXX -- TZZ
+  call dxbackward_tile(ux, n1e, n2e, j1, j2, i1b, i1e, i2b, i2e, d2)
+  call dzbackward_tile(uz, n1e, j1, j2, npml, isurf, i1b, i1e, i2b, i2e, d1)
+
+  if(ia < 0)then
+     if(surface) tmp(:) = txx(npml+1, i2b:i2e)
+     do k2=i2b,i2e
+        do k1=i1b,i1e
+           txx(k1, k2) = txx(k1, k2)+clbmu(k1, k2)*d2(k1, k2) &
+                +clb0(k1, k2)*d1(k1, k2)+srcs*gsrc(k1, k2)
+           tzz(k1, k2) = tzz(k1, k2)+clb0(k1, k2)*d2(k1, k2) &
+                +clbmu(k1, k2)*d1(k1, k2)+srcs*gsrc(k1, k2)
+        end do
+     end do
+     if(surface)then
+        k1 = npml+1
+        do k2=i2b,i2e
+           txx(k1, k2) = tmp(k2)+clbmu(k1, k2)*d2(k1, k2) &
+                -clb0(k1, k2)*lbsurf(k2)*(uz(k1,k2)-uz(k1-1,k2)) &
+                +srcs*gsrc(k1, k2)
+        end do
+     end if
+  else
+     if(surface) tmp(:) = ssplit(npml+1, :, 2)
+     do k2=i2b,i2e
+        do k1=i1b,i1e
+           ssplit(k1, k2, 1) = ax0(k2)*ssplit(k1, k2, 1) &
+                +bx0(k2)*(clbmu(k1, k2)*d2(k1, k2))+srcs*gsrc(k1, k2)
+           ssplit(k1, k2, 2) = az0(k1)*ssplit(k1, k2, 2) &
+                +bz0(k1)*(clb0(k1, k2)*d1(k1, k2))
+           ssplit(k1, k2, 3) = ax0(k2)*ssplit(k1, k2, 3) &
+                +bx0(k2)*(clb0(k1, k2)*d2(k1, k2))+srcs*gsrc(k1, k2)
+           ssplit(k1, k2, 4) = az0(k1)*ssplit(k1, k2, 4) &
+                +bz0(k1)*(clbmu(k1, k2)*d1(k1, k2))
+        end do
+     end do
+     if(surface)then
+        ! The free surface row is damped along x
+        k1 = npml+1
+        do k2=i2b,i2e
+           ssplit(k1, k2, 2) = ax0(k2)*tmp(k2) &
+                -bx0(k2)*(clb0(k1, k2)*lbsurf(k2)*(uz(k1,k2)-uz(k1-1,k2)))
+        end do
+     end if
+     do k2=i2b,i2e
+        do k1=i1b,i1e
+           txx(k1, k2) = ssplit(k1, k2, 1)+ssplit(k1, k2, 2)
+           tzz(k1, k2) = ssplit(k1, k2, 3)+ssplit(k1, k2, 4)
+        end do
+     end do
+  end if
+
+  !# TXZ
+  call dxforward_tile(uz, n1e, n2e, j1, j2, i1b, i1e, i2b, i2e, d2)
+  call dzforward_tile(ux, n1e, j1, j2, npml, isurf, i1b, i1e, i2b, i2e, d1)
+
+  if(ia < 0)then
+     do k2=i2b,i2e
+        do k1=i1b,i1e
+           txz(k1, k2) = txz(k1, k2)+cmue(k1, k2)*(d2(k1, k2)+d1(k1, k2))
+        end do
+     end do
+  else
+     do k2=i2b,i2e
+        do k1=i1b,i1e
+           ssplit(k1, k2, 5) = ax1(k2)*ssplit(k1, k2, 5) &
+                +bx1(k2)*(cmue(k1, k2)*d2(k1, k2))
+           ssplit(k1, k2, 6) = az1(k1)*ssplit(k1, k2, 6) &
+                +bz1(k1)*(cmue(k1, k2)*d1(k1, k2))
+           txz(k1, k2) = ssplit(k1, k2, 5)+ssplit(k1, k2, 6)
+        end do
+     end do
+  end if
+
+end subroutine strip_stress
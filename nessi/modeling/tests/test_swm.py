@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -------------------------------------------------------------------
+# Filename: test_swm.py
+#   Author: Damien Pageot
+#    Email: nessi.develop@protonmail.com
+#
+# Copyright (C) 2018 Damien Pageot
+# ------------------------------------------------------------------
+"""
+Test suite for the seismic wave modeling engine (nessi.modeling.swm)
+
+:copyright:
+    Damien Pageot (nessi.develop@protonmail.com)
+:license:
+    GNU Lesser General Public License, Version 3
+    (https://www.gnu.org/copyleft/lesser.html)
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import ctypes
+import tempfile
+import numpy as np
+from nessi.modeling.swm import modext, modbuo, modlame
+from nessi.modeling.swm import acqpos, pmlmod, modcoef, pmlcoef
+from nessi.modeling.swm import ricker, srcspread
+from nessi.modeling.swm import evolution, evolution_fused, evolution_strip
+
+# Modeling parameters
+n1 = 21
+n2 = 61
+dh = 0.5
+npml = 10
+nt = 401
+dt = 0.0001
+nts = 101
+
+def _modeling(isurf):
+    """
+    Two-layer model, source and receivers of the modeling tests.
+    """
+    vp = np.full((n1, n2), 600., dtype=np.float32)
+    vs = np.full((n1, n2), 200., dtype=np.float32)
+    ro = np.full((n1, n2), 1800., dtype=np.float32)
+    vp[n1//2:, :] = 1000.
+    vs[n1//2:, :] = 350.
+
+    vpe = modext(npml, vp)
+    vse = modext(npml, vs)
+    roe = modext(npml, ro)
+    bux, buz = modbuo(roe)
+    mu, lbd, lbdmu = modlame(vpe, vse, roe)
+    pmlx0, pmlx1, pmlz0, pmlz1 = pmlmod(n1, n2, dh, isurf, npml, 600., 2)
+
+    acq = np.zeros((24, 2), dtype=np.float32)
+    acq[:, 0] = np.linspace(2., 28., 24)
+    recpos = acqpos(n1, n2, npml, dh, acq)
+
+    gsrc = srcspread(n1, n2, npml, 5., 1., dh, -1.)
+    tsrc = ricker(nt, dt, 50., 0.02)
+
+    return (n1, n2, dh, npml, nts, 2, dt, tsrc, gsrc, recpos, isurf, 0,
+            bux, buz, lbd, lbdmu, mu, pmlx0, pmlx1, pmlz0, pmlz1)
+
+def _evolution(function, srctype, args, **kwargs):
+    """
+    Call a marching subroutine with the modeling test arguments.
+    """
+    return function(*(args[:7]+(srctype,)+args[7:]), **kwargs)
+
+def _snapshot(function, srctype, args):
+    """
+    Pressure snapshot of the last time step of a marching subroutine, out of
+    the edges of the extended grid (not computed by evolution).
+    """
+    args = args[:11]+(1,)+args[12:]
+    cwd = os.getcwd()
+    tmpdir = tempfile.mkdtemp()
+    try:
+        os.chdir(tmpdir)
+        _evolution(function, srctype, args)
+        press = np.fromfile('snapp%05d' % nt, dtype=np.float32)
+        for snapfile in os.listdir(tmpdir):
+            os.remove(snapfile)
+    finally:
+        os.chdir(cwd)
+        os.rmdir(tmpdir)
+    return press.reshape(n2+2*npml, n1+2*npml).T[1:-1, 1:-1]
+
+def _coefficients(args):
+    """
+    Replace the models of the modeling test arguments by the update
+    coefficients of evolution_strip.
+    """
+    dh, npml, dt = args[2], args[3], args[6]
+    coef = modcoef(npml, dh, dt, *args[12:17])
+    pml = pmlcoef(dt, *args[17:21])
+    return args[:12]+coef+pml
+
+def test_coefficients():
+    """
+    modcoef and pmlcoef give the coefficients of the marching updates.
+    """
+    args = _modeling(1)
+    dh, npml, dt = args[2], args[3], args[6]
+    bux, buz, lbd, lbdmu, mu, pmlx0, pmlx1, pmlz0, pmlz1 = args[12:21]
+    cbux, cbuz, clb0, clbmu, cmue, lbsurf = modcoef(npml, dh, dt, bux, buz,
+                                                    lbd, lbdmu, mu)
+    np.testing.assert_allclose(cbux, bux*dt/dh, rtol=1.e-6)
+    np.testing.assert_allclose(clbmu, lbdmu*dt/dh, rtol=1.e-6)
+    np.testing.assert_allclose(lbsurf, lbd[npml, :]/lbdmu[npml, :], rtol=1.e-6)
+    ax0, bx0, ax1, bx1, az0, bz0, az1, bz1 = pmlcoef(dt, pmlx0, pmlx1,
+                                                     pmlz0, pmlz1)
+    np.testing.assert_allclose(bx0, 1./(1.+dt*pmlx0[0, :]), rtol=1.e-6)
+    np.testing.assert_allclose(az1, (1.-dt*pmlz1[:, 0])/(1.+dt*pmlz1[:, 0]),
+                               rtol=1.e-6)
+    # No damping out of the strips
+    assert ax0[npml+5] == 1. and bz0[npml+5] == 1.
+
+def test_evolution_fused():
+    """
+    evolution_fused gives the same seismograms as evolution.
+    """
+    for isurf in [0, 1]:
+        args = _modeling(isurf)
+        for srctype in [1, 2]:
+            recx, recz, recp = _evolution(evolution, srctype, args)
+            recxf, reczf, recpf = _evolution(evolution_fused, srctype, args)
+            np.testing.assert_equal(recxf, recx)
+            np.testing.assert_equal(reczf, recz)
+            np.testing.assert_equal(recpf, recp)
+            assert np.amax(np.abs(recz)) > 0.
+
+def test_evolution_fused_snapshot():
+    """
+    evolution_fused gives the same pressure snapshots as evolution.
+    """
+    for isurf in [0, 1]:
+        args = _modeling(isurf)
+        for srctype in [1, 2]:
+            press = _snapshot(evolution, srctype, args)
+            pressf = _snapshot(evolution_fused, srctype, args)
+            np.testing.assert_equal(pressf, press)
+
+def test_evolution_strip():
+    """
+    evolution_strip gives the seismograms of evolution up to rounding
+    errors.
+    """
+    for isurf in [0, 1]:
+        args = _modeling(isurf)
+        for srctype in [1, 2]:
+            recx, recz, recp = _evolution(evolution, srctype, args)
+            recxs, reczs, recps = _evolution(evolution_strip, srctype,
+                                             _coefficients(args))
+            for rec, recs in zip([recx, recz, recp], [recxs, reczs, recps]):
+                np.testing.assert_allclose(recs, rec, rtol=0.,
+                                           atol=5.e-4*np.amax(np.abs(rec)))
+
+def test_evolution_strip_snapshot():
+    """
+    evolution_strip gives the pressure snapshots of evolution up to
+    rounding errors.
+    """
+    for isurf in [0, 1]:
+        args = _modeling(isurf)
+        for srctype in [1, 2]:
+            press = _snapshot(evolution, srctype, args)
+            presss = _snapshot(evolution_strip, srctype, _coefficients(args))
+            np.testing.assert_allclose(presss, press, rtol=0.,
+                                       atol=5.e-4*np.amax(np.abs(press)))
+
+def test_evolution_strip_threads():
+    """
+    evolution_strip gives the same seismograms with any number of threads.
+    """
+    args = _coefficients(_modeling(1))
+    for srctype in [1, 2]:
+        recx, recz, recp = _evolution(evolution_strip, srctype, args,
+                                      nthreads=1)
+        assert np.amax(np.abs(recz)) > 0.
+        for nthreads in [2, 3]:
+            recxt, reczt, recpt = _evolution(evolution_strip, srctype, args,
+                                             nthreads=nthreads)
+            np.testing.assert_equal(recxt, recx)
+            np.testing.assert_equal(reczt, recz)
+            np.testing.assert_equal(recpt, recp)
+
+def test_evolution_strip_default_threads():
+    """
+    evolution_strip leaves the default number of OpenMP threads unchanged.
+    """
+    gomp = ctypes.CDLL('libgomp.so.1')
+    nthreads = gomp.omp_get_max_threads()
+    args = _coefficients(_modeling(1))
+    for nthr in [1, nthreads+2]:
+        _evolution(evolution_strip, 1, args, nthreads=nthr)
+        assert gomp.omp_get_max_threads() == nthreads
+
+if __name__ == "__main__" :
+    np.testing.run_module_suite()
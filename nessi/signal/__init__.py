@@ -24,7 +24,15 @@ from __future__ import print_function
 from .windowing import time_window
 from .windowing import space_window
 from .tapering import taper1d
+from .tapering import taper_window
 from .filtering import sin2filter
+from .fftplan import fast_length
+from .fftplan import FFTPlan
+from .fftplan import get_fftplan
+from .pipeline import Pipeline
+from .pipeline import Wind
+from .pipeline import Taper
+from .pipeline import PFilter
 
 if __name__ == '__main__':
     import doctest
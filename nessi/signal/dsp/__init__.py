@@ -8,7 +8,7 @@ from __future__ import (absolute_import,
                         print_function,
                         unicode_literals)
 
-from .dspwrap import maswfv, smooth
+from .dspwrap import dispfv, smooth
 
 if __name__ == '__main__':
     import doctest
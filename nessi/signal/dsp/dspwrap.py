@@ -1,46 +1,170 @@
-from numpy import loadtxt, zeros, float32
-from ctypes import CDLL, c_int, c_float
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -------------------------------------------------------------------
+# Filename: dspwrap.py
+#   Author: Damien Pageot
+#    Email: nessi.develop@protonmail.com
+#
+# Copyright (C) 2018 Damien Pageot
+# ------------------------------------------------------------------
+"""
+Wrappers of the libdsp C library, with NumPy fallbacks.
+
+:copyright:
+    Damien Pageot (nessi.develop@protonmail.com)
+:license:
+    GNU Lesser General Public License, Version 3
+    (https://www.gnu.org/copyleft/lesser.html)
+"""
+
+import os
+from numpy import zeros, float32, float64, complex64, asarray, arange
+from numpy import maximum, minimum, trunc, amin, amax, clip, where, exp, take
+from numpy import pi, newaxis
+from ctypes import c_int, c_float
 from numpy.ctypeslib import ndpointer, load_library
 
-def dispfv(nv, nw, n1c, ns, nr, iwmin, v, w, dist, dobsc):
-    
-    # load libdsp
-    clibdsp = load_library('libdsp', '/home/Work/pageotd/nessi/nessi/dsp/')
-    
-    # nessi_pso_init
+def _load_libdsp():
+    """
+    Load libdsp from the package directory (see src/Makefile install) and
+    set the prototypes of its functions. Returns None if the library is
+    not available.
+    """
+    try:
+        clibdsp = load_library('libdsp', os.path.dirname(os.path.abspath(__file__)))
+    except OSError:
+        return None
+
+    # nessi_dsp_masw
     clibdsp.nessi_dsp_masw.argtypes = [c_int, c_int, c_int, c_int,
-                                       c_int, c_int, 
+                                       c_int, c_int,
                                        ndpointer(dtype=float32, ndim=1, flags='C_CONTIGUOUS'),
                                        ndpointer(dtype=float32, ndim=1, flags='C_CONTIGUOUS'),
                                        ndpointer(dtype=float32, ndim=2, flags='C_CONTIGUOUS'),
                                        ndpointer(dtype=complex64, ndim=2, flags='C_CONTIGUOUS'),
-                                       ndpointer(dtype=float32, ndim=2, flags='C_CONTIGUOUS')]
+                                       ndpointer(dtype=float32, ndim=2, flags='C_CONTIGUOUS'),
+                                       c_int]
+    clibdsp.nessi_dsp_masw.restype = None
+
+    # nessi_dsp_gsmooth
+    clibdsp.nessi_dsp_gsmooth.argtypes = [c_int, c_int, c_float, c_float,
+                                          ndpointer(dtype=float32, ndim=1, flags='C_CONTIGUOUS'),
+                                          ndpointer(dtype=float32, ndim=1, flags='C_CONTIGUOUS'),
+                                          c_float, c_float,
+                                          ndpointer(dtype=float32, ndim=2, flags='C_CONTIGUOUS'),
+                                          ndpointer(dtype=float32, ndim=2, flags='C_CONTIGUOUS')]
+    clibdsp.nessi_dsp_gsmooth.restype = None
+
+    return clibdsp
+
+# libdsp is loaded once at import
+clibdsp = _load_libdsp()
+
+def _dispfv(nv, nw, ns, nr, iwmin, v, w, dist, dobsc):
+    """
+    NumPy version of nessi_dsp_masw (same indexing of the spectra).
+    """
+    # Phase-shift stacks are summed over sources before the modulus
+    stack = zeros((nv, nw), dtype=complex64)
+    iw = iwmin+arange(nw)
+    dobsc = asarray(dobsc)
+    gobs = dobsc[iw, 0:nr]
+    for i in range(0, ns):
+        # Phase without velocity and non-zero spectral values
+        phs0 = 2.*pi*w[:, newaxis]*asarray(dist)[i, newaxis, :]
+        nz = take(dobsc.ravel(), iw[:, newaxis]*nr+i*nr+arange(nr),
+                  mode='clip') != 0.
+        gnz = where(nz, gobs, 0.)
+        for iv in range(0, nv):
+            stack[iv, :] += (gnz*exp(1j*phs0/v[iv])).sum(axis=1)
+    return abs(stack).astype(float32)
+
+def dispfv(nv, nw, n1c, ns, nr, iwmin, v, w, dist, dobsc, workers=1):
+    """
+    Phase-shift dispersion diagram (MASW).
+
+    :param nv: number of velocities
+    :param nw: number of frequencies
+    :param n1c: number of frequencies of the spectra
+    :param ns: number of sources
+    :param nr: number of receivers
+    :param iwmin: index of the first frequency in the spectra
+    :param v: velocities (nv)
+    :param w: frequencies (nw)
+    :param dist: source-receiver distances (ns, nr)
+    :param dobsc: spectra (n1c, nr), complex64
+    :param workers: number of OpenMP threads of libdsp (=1)
+    """
+    if clibdsp is None:
+        # NumPy fallback
+        return _dispfv(nv, nw, ns, nr, iwmin, v, w, dist, dobsc)
 
     # allocate dispersion array
     disp = zeros((nv, nw), dtype=float32, order='C')
 
     # call nessi_dsp_masw function
-    clibdsp.nessi_dsp_masw(nv, nw, n1c, ns, nr, iwmin, v, w, dist, dobsc, disp)
+    clibdsp.nessi_dsp_masw(nv, nw, n1c, ns, nr, iwmin, v, w, dist, dobsc, disp,
+                           workers)
 
     return disp
 
+def _gsmooth_axis(x, d, sg, disp, axis):
+    """
+    Normalized Gaussian smoothing along one axis of a dispersion image,
+    with the windows of nessi_dsp_gsmooth (3 standard deviations).
+    """
+    n = len(x)
+    x = asarray(x, dtype=float32).astype(float64)
+    d = float(float32(d))
+    sg = float(float32(sg))
+    x1 = x[min(1, n-1)]
+
+    # Window bounds
+    lo = maximum(1, trunc(((x-3.*sg)-x1)/d).astype(int)+1)-1
+    hi = minimum(n, trunc(((x+3.*sg)-x1)/d).astype(int)+1)-1
+
+    # Weighted sum over the window offsets
+    i = arange(n)
+    num = zeros(disp.shape, dtype=float64)
+    den = zeros(n, dtype=float64)
+    shape = [1, 1]
+    shape[axis] = n
+    for k in range(int(amin(lo-i)), int(amax(hi-i))):
+        j = clip(i+k, 0, n-1)
+        wgt = where((i+k >= lo) & (i+k < hi),
+                    exp(-0.5*(x[j]-x)**2/(sg*sg)), 0.)
+        num += wgt.reshape(shape)*take(disp, j, axis=axis)
+        den += wgt
+
+    return num/den.reshape(shape)
+
 def smooth(nv, nw, dv, dw, v, w, sgv, sgw, disp):
-    
-    # load libdsp
-    clibdsp = load_library('libdsp', '/home/Work/pageotd/nessi/nessi/dsp/')
-    
-    # nessi_pso_init
-    clibdsp.nessi_dsp_gsmooth.argtypes = [c_int, c_int, c_float, c_float,
-                                          ndpointer(dtype=float32, ndim=1, flags='C_CONTIGUOUS'),
-                                          ndpointer(dtype=float32, ndim=1, flags='C_CONTIGUOUS'),
-                                          c_float, c_float,
-                                          ndpointer(dtype=float32, ndim=2, flags='C_CONTIGUOUS'),
-                                          ndpointer(dtype=float32, ndim=2, flags='C_CONTIGUOUS')]
+    """
+    Gaussian smoothing of the absolute value of a dispersion image, as two
+    1D passes along frequencies and velocities. The first velocity is set
+    to zero.
+
+    :param nv: number of velocities
+    :param nw: number of frequencies
+    :param dv: velocity sampling
+    :param dw: frequency sampling
+    :param v: velocities (nv)
+    :param w: frequencies (nw)
+    :param sgv: standard deviation in velocity
+    :param sgw: standard deviation in frequency
+    :param disp: dispersion image (nv, nw)
+    """
+    if clibdsp is None:
+        # NumPy fallback
+        dispg = _gsmooth_axis(w, dw, sgw, abs(asarray(disp, dtype=float32)), 1)
+        dispg = _gsmooth_axis(v, dv, sgv, dispg, 0).astype(float32)
+        dispg[0, :] = 0.
+        return dispg
 
     # allocate smooth dispersion array
     dispg = zeros((nv, nw), dtype=float32, order='C')
 
-    # call nessi_dsp_masw function
+    # call nessi_dsp_gsmooth function
     clibdsp.nessi_dsp_gsmooth(nv, nw, dv, dw, v, w, sgv, sgw, disp, dispg)
 
     return dispg
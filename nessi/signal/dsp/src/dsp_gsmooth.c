@@ -18,48 +18,97 @@
 
 #include <nessi_dsp.h>
 
+// * Normalized Gaussian weights along one axis of the dispersion image.
+// * The window of sample i is [lo[i], hi[i][ (3 standard deviations) and
+// * its weights are stored from wgt[off[i]].
+static float *
+gsmooth_weights( int n, float d, float x[n], float sg,
+		 int lo[n], int hi[n], int off[n+1] )
+{
+  int i, j, iloc ;
+  float den ;
+  float *wgt ;
+
+  off[0] = 0 ;
+  for( i=0; i<n; i++ )
+    {
+      iloc = (int)( ( ( x[i] - 3. * sg ) - x[1] ) / d ) + 1 ;
+      lo[i] = imax( 1, iloc ) - 1 ;
+      iloc = (int)( ( ( x[i] + 3. * sg ) - x[1] ) / d ) + 1 ;
+      hi[i] = imin( n, iloc ) - 1 ;
+      off[i+1] = off[i] + imax( 0, hi[i]-lo[i] ) ;
+    }
+
+  wgt = malloc( imax( 1, off[n] )*sizeof(float) ) ;
+  for( i=0; i<n; i++ )
+    {
+      den = 0. ;
+      for( j=lo[i]; j<hi[i]; j++ )
+	{
+	  wgt[off[i]+j-lo[i]] = exp( -0.5 * pow( ( x[j] - x[i] ), 2 ) / ( sg * sg ) ) ;
+	  den += wgt[off[i]+j-lo[i]] ;
+	}
+      for( j=lo[i]; j<hi[i]; j++ ){wgt[off[i]+j-lo[i]] /= den ;}
+    }
+
+  return wgt ;
+}
+
 void
 nessi_dsp_gsmooth( int nv, int nw, float dv, float dw,
 	 float v[nv], float w[nw], float sgv, float sgw,
 	 float disp[nv][nw], float dispg[nv][nw])
 {
 
-  int iv, iw ;
-  int iloc ;
-  int igwmin, igwmax, igvmin, igvmax;
-  float gw[nv][nw], gv[nv][nw] ;
-  float G[nv][nw], aswap[nv][nw] ;
-  float e1, e2 ;
-  
-  
+  int iv, iw, igv, igw ;
+  int *lov, *hiv, *offv, *low, *hiw, *offw ;
+  float *gv, *gw, *tmp ;
+  float sum ;
+
+  // Gaussian weights in frequency and velocity (the 2D Gaussian window
+  // is separable)
+  lov = malloc( nv*sizeof(int) ) ;
+  hiv = malloc( nv*sizeof(int) ) ;
+  offv = malloc( (nv+1)*sizeof(int) ) ;
+  low = malloc( nw*sizeof(int) ) ;
+  hiw = malloc( nw*sizeof(int) ) ;
+  offw = malloc( (nw+1)*sizeof(int) ) ;
+  gv = gsmooth_weights( nv, dv, v, sgv, lov, hiv, offv ) ;
+  gw = gsmooth_weights( nw, dw, w, sgw, low, hiw, offw ) ;
+
+  // Smoothing along frequencies
+  tmp = malloc( nv*nw*sizeof(float) ) ;
   for( iv=0; iv<nv; iv++ )
     {
-      for( iw=0; iw<nw; iw++ ){gw[iv][iw]=w[iw];gv[iv][iw]=v[iv];}
+      for( iw=0; iw<nw; iw++ )
+	{
+	  sum = 0. ;
+	  for( igw=low[iw]; igw<hiw[iw]; igw++ )
+	    {
+	      sum += fabs( disp[iv][igw] ) * gw[offw[iw]+igw-low[iw]] ;
+	    }
+	  tmp[iv*nw+iw] = sum ;
+	}
     }
-  
-  for( iw=0; iw<nw; iw++ )
+
+  // Smoothing along velocities
+  for( iv=0; iv<nv; iv++ )
     {
-      iloc = (int)( ( ( gw[1][iw] - 3. * sgw ) - gw[1][1] ) / dw ) + 1 ;
-      igwmin = imax( 1, iloc ) ;
-      iloc = (int)( ( ( gw[1][iw] + 3. * sgw ) - gw[1][1] ) / dw ) + 1 ;
-      igwmax = imin( nw, iloc ) ;
-      
-      for( iv=0; iv<nv; iv++ )
-        {
-	  iloc = (int)( ( ( gv[iv][1] - 3. * sgv ) - gv[1][1] ) / dv ) + 1 ;
-	  igvmin = imax( 1, iloc ) ;
-	  iloc = (int)( ( ( gv[iv][1] + 3. * sgv ) - gv[1][1] ) / dv ) + 1 ;
-	  igvmax = imin( nv, iloc ) ;
-	  
-	  dispg[iv][iw] = nessi_dsp_gauss( iv, iw, nv, nw, igvmin, igvmax, igwmin, igwmax, gv, gw, sgv, sgw, disp ) ;
-	  if(iv == 0){
-	    dispg[iv][iw] = 0.;
-	  }
-        }
-      //for(iw=0; iw<nw; iw++){
-      //    dispg[0][iw] = dispg[1][iw];
-      //}
+      for( iw=0; iw<nw; iw++ ){dispg[iv][iw] = 0. ;}
+      if( iv == 0 ){continue ;}
+      for( igv=lov[iv]; igv<hiv[iv]; igv++ )
+	{
+	  for( iw=0; iw<nw; iw++ )
+	    {
+	      dispg[iv][iw] += tmp[igv*nw+iw] * gv[offv[iv]+igv-lov[iv]] ;
+	    }
+	}
     }
+
+  free(lov) ; free(hiv) ; free(offv) ;
+  free(low) ; free(hiw) ; free(offw) ;
+  free(gv) ; free(gw) ; free(tmp) ;
+
   return;
   
 }
@@ -22,28 +22,47 @@ void
 nessi_dsp_masw(int nv, int nw, int n1c, int ns,
 	       int nr, int iwmin, float v[nv], float w[nw],
 	       float dist[ns][nr], float complex dobsc[n1c][nr],
-	       float disp[nv][nw])
+	       float disp[nv][nw], int nthreads)
 {
 
-  unsigned int iv, iw, is, ir ;
-  float phs ;
+  int iv, iw, is, ir ;
   float complex ci = 0. + 1.0 * _Complex_I ;
-  float complex tmp[nw] ;
-  
+  float *phs0 ;
+  char *nz ;
+
+  // Velocity independent terms: phase without velocity and non-zero
+  // spectral values
+  phs0 = malloc(ns*nr*nw*sizeof(float)) ;
+  nz = malloc(ns*nr*nw*sizeof(char)) ;
+  for(is=0; is<ns; is++){for(ir=0; ir<nr; ir++){for(iw=0; iw<nw; iw++)
+	{
+	  phs0[(is*nr+ir)*nw+iw] = nessi_dsp_phase(w[iw], dist[is][ir], 1.) ;
+	  nz[(is*nr+ir)*nw+iw] = (cabs(dobsc[iwmin+iw][(is)*nr+ir]) != 0.) ;
+	}
+    }
+  }
+
+  // Velocities are shared between threads
+#pragma omp parallel for private(is, ir, iw) num_threads(nthreads) schedule(dynamic)
   for(iv=0; iv<nv; iv++)
     {
+      float complex tmp[nw] ;
       init1d_c(nw, tmp) ;
       for(is=0; is<ns; is++){for(ir=0; ir<nr; ir++){for(iw=0; iw<nw; iw++)
 	    {
-	      if(cabs(dobsc[iwmin+iw][(is)*nr+ir]) != 0.)
-		{phs=nessi_dsp_phase(w[iw],dist[is][ir],v[iv]);
-		  tmp[iw]+=dobsc[iwmin+iw][ir]*cexp(ci*phs);
+	      if(nz[(is*nr+ir)*nw+iw])
+		{
+		  tmp[iw]+=dobsc[iwmin+iw][ir]*cexp(ci*phs0[(is*nr+ir)*nw+iw]/v[iv]);
 		};
 	    }
 	}
       }
       for(iw=0;iw<nw;iw++){disp[iv][iw]+=cabs(tmp[iw]);}
     }
+
+  free(phs0) ;
+  free(nz) ;
+
   return;
   
 }
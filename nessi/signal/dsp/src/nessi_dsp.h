@@ -43,7 +43,7 @@ void
 nessi_dsp_masw (int nv, int nw, int n1c, int ns,
 	       int nr, int iwmin, float v[nv], float w[nw],
 	       float dist[ns][nr], float complex dobsc[n1c][nr],
-	       float disp[nv][nw]);
+	       float disp[nv][nw], int nthreads);
 
 float
 nessi_dsp_gauss (int iv, int iw, int nv, int nw,
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -------------------------------------------------------------------
+# Filename: fftplan.py
+#   Author: Damien Pageot
+#    Email: nessi.develop@protonmail.com
+#
+# Copyright (C) 2018 Damien Pageot
+# ------------------------------------------------------------------
+"""
+Real FFT planning: padding to fast lengths.
+
+:copyright:
+    Damien Pageot (nessi.develop@protonmail.com)
+:license:
+    GNU Lesser General Public License, Version 3
+    (https://www.gnu.org/copyleft/lesser.html)
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+from functools import lru_cache
+
+def fast_length(n):
+    """
+    Smallest 5-smooth length (2^p*3^q*5^r) greater or equal to n.
+
+    :param n: minimum length
+    """
+    n = int(n)
+    if n <= 6:
+        return max(n, 1)
+
+    best = 2**int(np.ceil(np.log2(n)))
+    p5 = 1
+    while p5 < best:
+        p35 = p5
+        while p35 < best:
+            # Smallest power of 2 such as p35*2^p >= n
+            m = p35
+            while m < n:
+                m *= 2
+            if m < best:
+                best = m
+            p35 *= 3
+        p5 *= 5
+
+    return best
+
+class FFTPlan():
+    """
+    Real FFT of signals of ns samples zero-padded to a fast length.
+
+    A plan only holds lengths and types: rfft and irfft allocate their
+    output arrays at each call, so that plans can be shared between threads
+    and do not keep data alive.
+    """
+
+    def __init__(self, ns, dtype=np.float32, nfft=None):
+        """
+        :param ns: number of time samples
+        :param dtype: real data type (=np.float32)
+        :param nfft: length of the transforms (=None, fast_length(ns))
+        """
+        self.ns = int(ns)
+        self.dtype = np.dtype(dtype)
+        if nfft is None:
+            nfft = fast_length(self.ns)
+        self.nfft = int(nfft)
+        self.nw = self.nfft//2+1
+        if self.dtype == np.float32:
+            self.ctype = np.dtype(np.complex64)
+        else:
+            self.ctype = np.dtype(np.complex128)
+
+    def rfftfreq(self, dt):
+        """
+        Frequencies of the padded spectrum.
+
+        :param dt: time sampling
+        """
+        return np.fft.rfftfreq(self.nfft, d=dt)
+
+    def rfft(self, dobs, axis=-1):
+        """
+        Real FFT of the zero-padded input array.
+
+        :param dobs: input data of ns samples along axis
+        :param axis: time axis (=-1)
+        :returns: spectrum of nw frequencies along axis
+        """
+        return np.fft.rfft(np.asarray(dobs, dtype=self.dtype), n=self.nfft,
+                           axis=axis)
+
+    def irfft(self, gobs, axis=-1):
+        """
+        Inverse real FFT, cropped to the original length.
+
+        :param gobs: spectrum of nw frequencies along axis
+        :param axis: frequency axis (=-1)
+        :returns: signal of ns samples along axis (view of the padded signal
+            if nfft > ns)
+        """
+        dobs = np.fft.irfft(gobs, n=self.nfft, axis=axis)
+        if self.nfft == self.ns:
+            return dobs
+        signal = [slice(None)]*dobs.ndim
+        signal[axis] = slice(0, self.ns)
+        return dobs[tuple(signal)]
+
+@lru_cache(maxsize=64)
+def _fftplan(ns, dtype, nfft):
+    return FFTPlan(ns, dtype, nfft)
+
+def get_fftplan(ns, dtype=np.float32, nfft=None):
+    """
+    Get a cached FFTPlan for signals of ns samples. Plans are small and
+    thread-safe, they are only cached to avoid recomputing fast lengths.
+
+    :param ns: number of time samples
+    :param dtype: real data type (=np.float32)
+    :param nfft: length of the transforms (=None, fast_length(ns))
+    """
+    dtype = np.dtype(dtype)
+    if dtype != np.float32:
+        dtype = np.dtype(np.float64)
+    if nfft is None:
+        nfft = fast_length(ns)
+    return _fftplan(int(ns), dtype, int(nfft))
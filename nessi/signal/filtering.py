@@ -22,104 +22,95 @@ from __future__ import division
 from __future__ import print_function
 
 import numpy as np
+from functools import lru_cache
+from .fftplan import get_fftplan
 
-def sin2filter(dobs, freq, amps, dt, axis=0):
+@lru_cache(maxsize=32)
+def _sin2response(nfft, dt, freq, amps):
     """
-    Applies a zero-phase, sine-squared tapered filter (adapted from the
-    sufilter command - Seismic Unix 44R1).
+    Polygonal filter response with sine-squared tapering. Responses are
+    cached since the same filter is often applied to many gathers.
 
-    :param dobs: --
-    :param freq: array of filter frequencies (Hz)
-    :param amps: array of filter amplitudes
+    :param nfft: number of frequencies
     :param dt: time sampling
-    :param axis: time axis if dobs is a 2D array
+    :param freq: tuple of filter frequencies (Hz)
+    :param amps: tuple of filter amplitudes
     """
-
-
-    # Get number of time samples and numner of traces
-    if np.ndim(dobs) == 1:
-        ns = np.size(dobs)
-        ntrac = 1
-    else:
-        if axis == 0:
-            ns = np.size(dobs, axis=0)
-            ntrac = np.size(dobs, axis=1)
-        if axis == 1:
-            ns = np.size(dobs, axis=1)
-            ntrac = np.size(dobs, axis=0)
-
-    # Calculate the Nyquist frequency
-    fnyq = 0.5/dt
-
-    # Fast Fourier transform
-    gobs = np.fft.rfft(dobs, axis=axis)
-    nfft = np.size(gobs, axis=axis)
     ftmp = np.fft.rfftfreq(nfft, dt)
-    df = ftmp[1]
-
-
-    # Create a gobs filter array
-    if np.ndim(dobs) == 1:
-        gobsfilter = np.zeros(nfft, dtype=np.complex64)
-    else:
-        if axis == 0:
-            gobsfilter = np.zeros((nfft, ntrac), dtype=np.complex64)
-        if axis == 1:
-            gobsfilter = np.zeros((ntrac, nfft), dtype=np.complex64)
 
     # Get the number of filter frequencies
     npoly = len(freq)
 
     # Integer filter frequencies
-    intfreq = np.zeros(npoly, dtype=np.int)
-    for ipoly in range(0, npoly):
-        intfreq[ipoly] = np.argmin(np.abs(ftmp-freq[ipoly]))
+    intfreq = np.argmin(np.abs(ftmp[np.newaxis, :]-np.array(freq)[:, np.newaxis]),
+                        axis=1)
 
     # Initialize the polygonal filter with sin^2 tapering
     pfilt = np.zeros(nfft, dtype=np.complex64)
 
     # From 0 to first filter frequency
-    for ifreq in range(0, intfreq[0]):
-        pfilt[ifreq] = amps[0]
+    pfilt[0:intfreq[0]] = amps[0]
 
     # Middle frequencies
     for ipoly in range(0, npoly-1):
+        ifreq = np.arange(intfreq[ipoly], intfreq[ipoly+1])
+        c = 0.5*np.pi/float(intfreq[ipoly+1]-intfreq[ipoly]+2)
 
         if amps[ipoly] < amps[ipoly+1]:
-            for ifreq in range(intfreq[ipoly], intfreq[ipoly+1]):
-                c = 0.5*np.pi/float(intfreq[ipoly+1]-intfreq[ipoly]+2)
-                s = np.sin(c*float(ifreq-intfreq[ipoly]+1))
-                a = amps[ipoly+1]-amps[ipoly]
-                pfilt[ifreq] = amps[ipoly]+a*s*s
+            s = np.sin(c*(ifreq-intfreq[ipoly]+1))
+            a = amps[ipoly+1]-amps[ipoly]
+            pfilt[ifreq] = amps[ipoly]+a*s*s
 
         if amps[ipoly] > amps[ipoly+1]:
-            for ifreq in range(intfreq[ipoly], intfreq[ipoly+1]):
-                c = 0.5*np.pi/float(intfreq[ipoly+1]-intfreq[ipoly]+2)
-                s = np.sin(c*float(intfreq[ipoly]-ifreq+1))
-                a = amps[ipoly]-amps[ipoly+1]
-                pfilt[ifreq] = amps[ipoly+1]+a*s*s
+            s = np.sin(c*(intfreq[ipoly]-ifreq+1))
+            a = amps[ipoly]-amps[ipoly+1]
+            pfilt[ifreq] = amps[ipoly+1]+a*s*s
 
         if amps[ipoly] == amps[ipoly+1]:
-            for ifreq in range(intfreq[ipoly], intfreq[ipoly+1]):
-                pfilt[ifreq] = amps[ipoly]
+            pfilt[ifreq] = amps[ipoly]
 
     # From the last filter frequency to the last frequency
-    for ifreq in range(intfreq[-1], nfft):
-        pfilt[ifreq] = amps[-1]
+    pfilt[intfreq[-1]:nfft] = amps[-1]
 
-    # Apply filter
+    # Cached response must not be modified
+    pfilt.setflags(write=False)
+
+    return pfilt
+
+def sin2filter(dobs, freq, amps, dt, axis=0):
+    """
+    Applies a zero-phase, sine-squared tapered filter (adapted from the
+    sufilter command - Seismic Unix 44R1).
+
+    :param dobs: input data, 1D or 2D array
+    :param freq: array of filter frequencies (Hz)
+    :param amps: array of filter amplitudes
+    :param dt: time sampling
+    :param axis: time axis if dobs is a 2D array
+
+    The data are zero-padded to a fast FFT length (see fftplan).
+    """
+    # Get number of time samples
     if np.ndim(dobs) == 1:
-        gobsfilter[:] = gobs[:]*pfilt[:]
-        dobsfilter = np.fft.irfft(gobsfilter, n=ns)
+        axis = 0
+    ns = np.size(dobs, axis=axis)
+
+    # Fast Fourier transform (zero-padded to a fast length)
+    if np.asarray(dobs).dtype == np.float64:
+        plan = get_fftplan(ns, np.float64)
     else:
-        if axis == 0:
-            for itrac in range(0, ntrac):
-                gobsfilter[:, itrac] = gobs[:, itrac]*pfilt[:]
-            dobsfilter = np.fft.irfft(gobsfilter, n=ns, axis=0)
-
-        if axis == 1:
-            for itrac in range(0, ntrac):
-                gobsfilter[itrac, :] = gobs[itrac,:]*pfilt[:]
-            dobsfilter = np.fft.irfft(gobsfilter, n=ns, axis=1)
+        plan = get_fftplan(ns, np.float32)
+    gobs = plan.rfft(dobs, axis=axis)
+    nfft = plan.nw
+
+    # Get the filter response
+    pfilt = _sin2response(nfft, float(dt), tuple(float(f) for f in freq),
+                          tuple(float(a) for a in amps))
+
+    # Apply filter
+    shape = [1]*np.ndim(dobs)
+    shape[axis] = nfft
+    gobsfilter = (gobs*pfilt.reshape(shape)).astype(np.complex64, copy=False)
+    dobsfilter = np.ascontiguousarray(plan.irfft(gobsfilter, axis=axis))
 
     return dobsfilter
@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -------------------------------------------------------------------
+# Filename: pipeline.py
+#   Author: Damien Pageot
+#    Email: nessi.develop@protonmail.com
+#
+# Copyright (C) 2018 Damien Pageot
+# ------------------------------------------------------------------
+"""
+Fused processing pipeline for SU gathers.
+
+:copyright:
+    Damien Pageot (nessi.develop@protonmail.com)
+:license:
+    GNU Lesser General Public License, Version 3
+    (https://www.gnu.org/copyleft/lesser.html)
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import copy
+import numpy as np
+
+from .tapering import taper_window
+from .filtering import _sin2response
+from .fftplan import get_fftplan
+
+class Wind():
+    """
+    Window traces in time or space (see SUdata.wind).
+    """
+
+    def __init__(self, key=' ', min=0, max=0, tmin=0., tmax=0.):
+        """
+        :param key: SU header key
+        :param min: minimum value of key to pass (=0)
+        :param max: maximum value of key to pass (=0)
+        :param tmin: minimum time to pass (=0)
+        :param tmax: maximum time to pass (=0)
+        """
+        self.key = key
+        self.min = min
+        self.max = max
+        self.tmin = tmin
+        self.tmax = tmax
+
+class Taper():
+    """
+    Taper the edge traces and samples of a gather (see SUdata.taper).
+    """
+
+    def __init__(self, tr1=0, tr2=0, tbeg=0., tend=0., type='linear'):
+        """
+        :param tr1: number of traces to be tapered at beginning (=0)
+        :param tr2: number of traces to be tapered at end (=0)
+        :param tbeg: length of taper (ms) at trace start (=0.)
+        :param tend: length of taper (ms) at trace end (=0.)
+        :param type: taper type: 'linear'(default), 'sine', 'cosine'
+        """
+        self.tr1 = tr1
+        self.tr2 = tr2
+        self.tbeg = tbeg
+        self.tend = tend
+        self.type = type
+
+class PFilter():
+    """
+    Zero-phase, sine-squared tapered filter (see SUdata.pfilter).
+    """
+
+    def __init__(self, freq, amps):
+        """
+        :param freq: array of filter frequencies (Hz)
+        :param amps: array of filter amplitudes
+        """
+        self.freq = tuple(float(f) for f in freq)
+        self.amps = tuple(float(a) for a in amps)
+
+class Pipeline():
+    """
+    Chain of Wind, Taper and PFilter stages applied to SU gathers in one
+    pass over blocks of traces.
+
+    Trace selections are applied first and time windows located before
+    any other stage are applied to the input traces, so that excluded
+    traces and samples are never read. Each block of traces is then copied
+    once into a work buffer where the tapers are applied in place, and
+    consecutive filters are fused into one forward and inverse FFT. Only
+    the output traces and the headers of the selected traces are
+    allocated.
+
+    Example::
+
+        pipeline = Pipeline([Wind(tmin=0., tmax=0.5), Taper(tr1=5, tr2=5),
+                             PFilter([5., 10., 80., 100.], [0., 1., 1., 0.])])
+        dobsp = pipeline.run(dobs)
+    """
+
+    def __init__(self, stages, block=64):
+        """
+        :param stages: list of Wind, Taper and PFilter stages
+        :param block: number of traces processed at once (=64)
+        """
+        self.stages = list(stages)
+        self.block = block
+
+        # Space windows change the trace positions used by space tapers
+        tapered = False
+        for stage in self.stages:
+            if not isinstance(stage, (Wind, Taper, PFilter)):
+                raise ValueError('unknown pipeline stage: '+str(stage))
+            if isinstance(stage, Taper) and (stage.tr1 != 0 or stage.tr2 != 0):
+                tapered = True
+            if isinstance(stage, Wind) and stage.key != ' ' \
+               and stage.min != stage.max and tapered:
+                raise ValueError('space windows must precede space tapers')
+
+    def _compile(self, ntrac, ns, dt, delrt):
+        """
+        Convert the stages to operations on blocks of traces.
+
+        :returns: list of operations, number of time samples and delay
+            recording time (ms) of the output traces
+        """
+        ops = []
+        for stage in self.stages:
+            if isinstance(stage, Wind):
+                if stage.tmax != stage.tmin:
+                    itmin = int((stage.tmin-delrt)/dt)
+                    itmax = int((stage.tmax-delrt)/dt)
+                    ops.append(('slice', slice(itmin, itmax+1)))
+                    ns = len(range(ns)[itmin:itmax+1])
+                    delrt = stage.tmin
+            if isinstance(stage, Taper):
+                if stage.tr1 != 0 or stage.tr2 != 0:
+                    ftap = taper_window(ntrac, stage.tr1, stage.tr2, stage.type)
+                    ops.append(('space', ftap[:, np.newaxis]))
+                if stage.tbeg != 0. or stage.tend != 0.:
+                    ntap1 = int(stage.tbeg/1000./dt)
+                    ntap2 = int(stage.tend/1000./dt)
+                    ftap = taper_window(ns, ntap1, ntap2, stage.type)
+                    ops.append(('time', ftap))
+            if isinstance(stage, PFilter):
+                if ops and ops[-1][0] == 'filter':
+                    ops[-1][1].append(stage)
+                else:
+                    ops.append(('filter', [stage]))
+
+        return ops, ns, delrt
+
+    def run(self, dobs):
+        """
+        Process a gather.
+
+        :param dobs: SUdata object
+        :returns: new SUdata object with the processed traces
+        :raises ValueError: if no trace passes a key window
+        """
+        header = dobs.header
+        trace = dobs.trace
+
+        # Trace selection
+        for stage in self.stages:
+            if isinstance(stage, Wind) and stage.key != ' ' \
+               and stage.min != stage.max:
+                if header is dobs.header:
+                    itrac = dobs.select(stage.key, min=stage.min,
+                                        max=stage.max)
+                else:
+                    values = header[stage.key]
+                    itrac = np.nonzero((values >= stage.min) &
+                                       (values <= stage.max))[0]
+                if len(itrac) == 0:
+                    raise ValueError('no trace with %s in [%s, %s]'
+                                     % (stage.key, stage.min, stage.max))
+                if itrac[-1]-itrac[0]+1 == len(itrac):
+                    header = header[itrac[0]:itrac[-1]+1]
+                    trace = trace[itrac[0]:itrac[-1]+1, :]
+                else:
+                    header = header[itrac]
+                    trace = trace[itrac, :]
+
+        # Get parameters from SU header
+        ntrac = len(header)
+        dt = header[0]['dt']/1000000.
+        delrt = float(header[0]['delrt'])/1000.
+        ops, ns, delrt = self._compile(ntrac, np.size(trace, axis=1), dt, delrt)
+
+        # Leading time windows are applied to the input traces
+        while ops and ops[0][0] == 'slice':
+            trace = trace[:, ops.pop(0)[1]]
+
+        # Process by blocks of traces
+        dobsp = np.zeros((ntrac, ns), dtype=np.float32)
+        work = np.zeros((min(self.block, ntrac), np.size(trace, axis=1)),
+                        dtype=np.float32)
+        for i1 in range(0, ntrac, self.block):
+            i2 = min(i1+self.block, ntrac)
+            block = work[0:i2-i1, :]
+            block[:] = trace[i1:i2, :]
+            for op in ops:
+                if op[0] == 'slice':
+                    block = block[:, op[1]]
+                if op[0] == 'space':
+                    block *= op[1][i1:i2]
+                if op[0] == 'time':
+                    block *= op[1]
+                if op[0] == 'filter':
+                    plan = get_fftplan(block.shape[1])
+                    gobs = plan.rfft(block, axis=1)
+                    for stage in op[1]:
+                        gobs *= _sin2response(plan.nw, float(dt), stage.freq,
+                                              stage.amps)
+                    block[:] = plan.irfft(gobs, axis=1)
+            dobsp[i1:i2, :] = block
+
+        # Output SU data
+        dobsout = copy.copy(dobs)
+        dobsout.trace = dobsp
+        header = header.copy()
+        for stage in self.stages:
+            if isinstance(stage, Wind) and stage.key != ' ' \
+               and stage.min != stage.max:
+                header['cdpt'] = np.arange(1, ntrac+1)
+            if isinstance(stage, Wind) and stage.tmax != stage.tmin:
+                header['ns'] = ns
+                header['delrt'] = int(delrt*1000)
+        dobsout.header = header
+        if hasattr(dobsout, '_hindex'):
+            dobsout._hindex = {}
+
+        return dobsout
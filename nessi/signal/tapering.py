@@ -23,105 +23,81 @@ from __future__ import print_function
 
 import numpy as np
 
-def _linear(n, ntap1, ntap2):
+from functools import lru_cache
+
+def _linear(ntap):
     """
     Linear taper type.
     """
-    # Initialize taper function
-    ftap = np.zeros(n, dtype=np.float32)
-    ftap[:] = 1
-
-    # Create the taper function
-    for i in range(0, ntap1):
-        if i == 0:
-            ftap[i] = 0.
-        else:
-            ftap[i] = float(i)/float(ntap1)
-    for i in range(0, ntap2):
-        if i == 0:
-            ftap[n-i-1] = 0.
-        else:
-            ftap[n-i-1] = float(i)/float(ntap2)
-
-    return ftap
+    return np.arange(0, ntap)/float(ntap)
 
-def _sine(n, ntap1, ntap2):
+def _sine(ntap):
     """
     Sine taper type.
     """
-    # Initialize taper function
-    ftap = np.zeros(n, dtype=np.float32)
-    ftap[:] = 1
+    return np.sin(np.pi*np.arange(0, ntap)/float(ntap)/2.)
 
-    # Create the taper function
-    for i in range(0, ntap1):
-        if i == 0:
-            ftap[i] = 0.
-        else:
-            ftap[i] = np.sin(np.pi*float(i)/float(ntap1)/2.)
-    for i in range(0, ntap2):
-        if i == 0:
-            ftap[n-i-1] = 0.
-        else:
-            ftap[n-i-1] = np.sin(np.pi*float(i)/float(ntap2)/2.)
+def _cosine(ntap):
+    """
+    Cosine taper type.
+    """
+    return 0.5*(1.0-np.cos(np.pi*np.arange(0, ntap)/float(ntap)))
 
-    return ftap
+_TAPERS = {'linear': _linear, 'sine': _sine, 'cosine': _cosine}
 
-def _cosine(n, ntap1, ntap2):
+@lru_cache(maxsize=32)
+def taper_window(n, ntap1, ntap2, type='linear'):
     """
-    Cosine taper type.
+    Taper function. Taper functions are cached since the same taper is
+    often applied to many gathers and must not be modified.
+
+    :param n: number of samples
+    :param ntap1: number of samples tapered at beginning
+    :param ntap2: number of samples tapered at end
+    :param type: taper type: 'linear'(default), 'sine', 'cosine'
     """
+    if type not in _TAPERS:
+        raise ValueError('unknown taper type: '+str(type))
+
     # Initialize taper function
-    ftap = np.zeros(n, dtype=np.float32)
-    ftap[:] = 1
+    ftap = np.ones(n, dtype=np.float32)
 
     # Create the taper function
-    for i in range(0, ntap1):
-        if i == 0:
-            ftap[i] = 0.
-        else:
-            ftap[i] = 0.5*(1.0-np.cos(np.pi*float(i)/float(ntap1)))
-    for i in range(0, ntap2):
-        if i == 0:
-            ftap[n-i-1] = 0.
-        else:
-            ftap[n-i-1] = 0.5*(1.0-np.cos(np.pi*float(i)/float(ntap2)))
+    if ntap1 > 0:
+        ftap[0:ntap1] = _TAPERS[type](ntap1)[0:n]
+    if ntap2 > 0:
+        ftap[max(n-ntap2, 0):n] = _TAPERS[type](ntap2)[::-1][-n:]
+
+    ftap.setflags(write=False)
 
     return ftap
 
-def taper1d(dobs, ntap1, ntap2, min=1.0, type='linear', axis=0):
+def taper1d(dobs, ntap1, ntap2, min=1.0, type='linear', axis=0, out=None):
     """
-    Taper data.
+    Taper data along one axis.
+
+    :param dobs: input data, N-D array
+    :param ntap1: number of samples tapered at beginning
+    :param ntap2: number of samples tapered at end
+    :param min: not used
+    :param type: taper type: 'linear'(default), 'sine', 'cosine'
+    :param axis: tapered axis (=0)
+    :param out: output float32 array of the same shape, can be dobs
+        (=None, a new array is allocated)
     """
-
-    dobstaper = np.zeros(np.shape(dobs), dtype=np.float32)
-
-    # Get the number of dimensions of dobs
+    dobs = np.asarray(dobs)
     if dobs.ndim == 1:
-        n = len(dobs)
-    if dobs.ndim == 2:
-        if axis == 0:
-            n = np.size(dobs, axis=0)
-        else:
-            n = np.size(dobs, axis=1)
+        axis = 0
+    n = np.size(dobs, axis=axis)
 
     # Calculate the taper function
-    if type == 'linear':
-        ftap = _linear(n, ntap1, ntap2)
-    if type == 'sine':
-        ftap = _sine(n, ntap1, ntap2)
-    if type == 'cosine':
-        ftap = _cosine(n, ntap1, ntap2)
+    ftap = taper_window(int(n), int(ntap1), int(ntap2), type)
 
     # Apply the taper function
-    if dobs.ndim == 1:
-        dobstaper[:] = dobs[:]*ftap[:]
-    else:
-        if axis == 0:
-            for i in range(0, np.size(dobs, axis=1)):
-                dobstaper[:, i] = dobs[:, i]*ftap[:]
-        if axis == 1:
-            for i in range(0, np.size(dobs, axis=0)):
-                dobstaper[i, :] = dobs[i, :]*ftap[:]
-
-    return dobstaper
+    shape = [1]*dobs.ndim
+    shape[axis] = n
+    if out is None:
+        out = np.empty(dobs.shape, dtype=np.float32)
+    np.multiply(dobs, ftap.reshape(shape), out=out)
+
+    return out
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -------------------------------------------------------------------
+# Filename: test_dsp.py
+#   Author: Damien Pageot
+#    Email: nessi.develop@protonmail.com
+#
+# Copyright (C) 2018 Damien Pageot
+# ------------------------------------------------------------------
+"""
+Test suite for the dsp wrappers (nessi.signal.dsp)
+
+:copyright:
+    Damien Pageot (nessi.develop@protonmail.com)
+:license:
+    GNU Lesser General Public License, Version 3
+    (https://www.gnu.org/copyleft/lesser.html)
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+from nessi.signal.dsp import smooth
+from nessi.signal.dsp import dispfv
+
+def test_smooth():
+    """
+    signal.dsp.smooth against the 2D Gaussian window of nessi_dsp_gauss.
+    """
+    # Dispersion image
+    nv = 24
+    nw = 18
+    dv = 10.
+    dw = 0.5
+    v = np.arange(0, nv, dtype=np.float32)*dv+100.
+    w = np.arange(0, nw, dtype=np.float32)*dw+5.
+    sgv = 25.
+    sgw = 1.3
+    disp = np.random.RandomState(0).randn(nv, nw).astype(np.float32)
+
+    dispg = smooth(nv, nw, dv, dw, v, w, sgv, sgw, disp)
+
+    # Pixel by pixel Gaussian smoothing
+    output = np.zeros((nv, nw), dtype=np.float32)
+    for iv in range(1, nv):
+        igvmin = max(1, int(((v[iv]-3.*sgv)-v[1])/dv)+1)
+        igvmax = min(nv, int(((v[iv]+3.*sgv)-v[1])/dv)+1)
+        for iw in range(0, nw):
+            igwmin = max(1, int(((w[iw]-3.*sgw)-w[1])/dw)+1)
+            igwmax = min(nw, int(((w[iw]+3.*sgw)-w[1])/dw)+1)
+            gv = v[igvmin-1:igvmax-1]
+            gw = w[igwmin-1:igwmax-1]
+            G = np.outer(np.exp(-0.5*(gv-v[iv])**2/(sgv*sgv)),
+                         np.exp(-0.5*(gw-w[iw])**2/(sgw*sgw)))
+            num = np.sum(np.abs(disp[igvmin-1:igvmax-1, igwmin-1:igwmax-1])*G)
+            output[iv, iw] = num/np.sum(G)
+
+    np.testing.assert_allclose(dispg, output, rtol=1.e-5, atol=1.e-6)
+
+def test_dispfv():
+    """
+    signal.dsp.dispfv against the phase-shift stack computed velocity by
+    velocity, for one and two sources.
+    """
+    # Spectra of 12 receivers
+    nv = 30
+    nw = 20
+    nr = 12
+    n1c = 80
+    iwmin = 5
+    v = np.linspace(100., 500., nv).astype(np.float32)
+    w = np.linspace(5., 50., nw).astype(np.float32)
+    rand = np.random.RandomState(0)
+    dobsc = (rand.randn(n1c, nr)+1j*rand.randn(n1c, nr)).astype(np.complex64)
+
+    for ns in [1, 2]:
+        dist = (np.arange(0, ns*nr)*2.+5.).astype(np.float32).reshape(ns, nr)
+
+        disp = dispfv(nv, nw, n1c, ns, nr, iwmin, v, w, dist, dobsc)
+
+        # The stacks of all sources are summed before the modulus
+        output = np.zeros((nv, nw), dtype=np.float32)
+        for iv in range(0, nv):
+            stack = np.zeros(nw, dtype=np.complex128)
+            for i in range(0, ns):
+                phase = 2.*np.pi*np.outer(w, dist[i])/v[iv]
+                stack += np.sum(dobsc[iwmin:iwmin+nw]*np.exp(1j*phase), axis=1)
+            output[iv] = np.abs(stack)
+
+        np.testing.assert_allclose(disp, output, rtol=1.e-4,
+                                   atol=1.e-5*np.amax(output))
+
+if __name__ == "__main__" :
+    np.testing.run_module_suite()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -------------------------------------------------------------------
+# Filename: test_fftplan.py
+#   Author: Damien Pageot
+#    Email: nessi.develop@protonmail.com
+#
+# Copyright (C) 2018 Damien Pageot
+# ------------------------------------------------------------------
+"""
+Test suite for the FFT planning functions (nessi.signal.fftplan)
+
+:copyright:
+    Damien Pageot (nessi.develop@protonmail.com)
+:license:
+    GNU Lesser General Public License, Version 3
+    (https://www.gnu.org/copyleft/lesser.html)
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+from nessi.signal.fftplan import fast_length
+from nessi.signal.fftplan import get_fftplan
+
+def test_fast_length():
+    """
+    signal.fftplan.fast_length testing.
+    """
+    # Lengths to test
+    lengths = [1, 7, 11, 97, 128, 301, 4999, 7919]
+    output = [fast_length(n) for n in lengths]
+
+    # Expected 5-smooth lengths
+    expected = [1, 8, 12, 100, 128, 320, 5000, 8000]
+
+    np.testing.assert_equal(output, expected)
+
+def test_fftplan_roundtrip():
+    """
+    signal.fftplan.FFTPlan forward and inverse FFT along both axes.
+    """
+    # Random data with an odd number of samples
+    np.random.seed(0)
+    dobs = np.random.randn(5, 301).astype(np.float32)
+
+    plan = get_fftplan(301)
+    for axis in [1, 0]:
+        data = dobs if axis == 1 else dobs.T.copy()
+        gobs = plan.rfft(data, axis=axis)
+
+        # Padded spectrum against NumPy
+        expected = np.fft.rfft(data, n=plan.nfft, axis=axis)
+        np.testing.assert_allclose(gobs, expected, rtol=1.e-4, atol=1.e-4)
+
+        # Inverse transform is cropped to the input length
+        output = plan.irfft(gobs, axis=axis)
+        np.testing.assert_allclose(output, data, atol=1.e-5)
+
+    # Plans are cached by length and type, and hold no data
+    assert get_fftplan(301) is plan
+    assert get_fftplan(301, np.float64) is not plan
+    assert get_fftplan(301, nfft=301).nfft == 301
+    assert not any(isinstance(value, np.ndarray)
+                   for value in vars(plan).values())
+
+if __name__ == "__main__" :
+    np.testing.run_module_suite()
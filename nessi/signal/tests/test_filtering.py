@@ -22,6 +22,7 @@ from __future__ import division
 from __future__ import print_function
 
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from nessi.signal.filtering import sin2filter
 
 def test_sin2filter_one_trac():
@@ -78,5 +79,54 @@ def test_sin2filter_one_trac():
     # Testing
     np.testing.assert_allclose(dobsf, output, atol=1.e-7)
 
+def test_sin2filter_multi_trac():
+    """
+    signal.filtering.sin2filter testing for multi-trace signal.
+    """
+
+    # Create initial data traces (random)
+    ns = 301   # number of time sample
+    ntrac = 12 # number of traces
+    dt = 0.002 # time sampling
+    dobs = np.random.RandomState(0).randn(ntrac, ns).astype(np.float32)
+
+    # Filter parameters
+    freq = np.array([5., 10., 40., 60.], dtype=np.float32)
+    amps = np.array([0., 1., 1., 0.], dtype=np.float32)
+
+    # Filtering along both axis
+    dobsf1 = sin2filter(dobs, freq, amps, dt, axis=1)
+    dobsf0 = sin2filter(dobs.swapaxes(1, 0), freq, amps, dt, axis=0)
+
+    # Testing against one trace filtering
+    for itrac in range(0, ntrac):
+        output = sin2filter(dobs[itrac, :], freq, amps, dt)
+        np.testing.assert_allclose(dobsf1[itrac, :], output, atol=1.e-7)
+        np.testing.assert_allclose(dobsf0[:, itrac], output, atol=1.e-7)
+
+def test_sin2filter_threads():
+    """
+    signal.filtering.sin2filter output type and calls from several threads.
+    """
+    dt = 0.002
+    freq = np.array([5., 10., 40., 60.], dtype=np.float32)
+    amps = np.array([0., 1., 1., 0.], dtype=np.float32)
+    rand = np.random.RandomState(0)
+    dobs = [rand.randn(12, 301).astype(np.float32) for i in range(0, 8)]
+
+    # Same output type as the inverse FFT of complex64 spectra
+    dtype = np.fft.irfft(np.zeros(3, dtype=np.complex64)).dtype
+    for data in [dobs[0], dobs[0].astype(np.float64)]:
+        np.testing.assert_equal(sin2filter(data, freq, amps, dt, axis=1).dtype,
+                                dtype)
+
+    # Gathers of the same shape filtered at the same time
+    expected = [sin2filter(data, freq, amps, dt, axis=1) for data in dobs]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        output = list(executor.map(
+            lambda data: sin2filter(data, freq, amps, dt, axis=1), dobs*4))
+    for i in range(0, len(output)):
+        np.testing.assert_equal(output[i], expected[i % len(dobs)])
+
 if __name__ == "__main__" :
     np.testing.run_module_suite()
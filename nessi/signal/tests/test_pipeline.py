@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -------------------------------------------------------------------
+# Filename: test_pipeline.py
+#   Author: Damien Pageot
+#    Email: nessi.develop@protonmail.com
+#
+# Copyright (C) 2018 Damien Pageot
+# ------------------------------------------------------------------
+"""
+Test suite for the processing pipeline (nessi.signal.pipeline)
+
+:copyright:
+    Damien Pageot (nessi.develop@protonmail.com)
+:license:
+    GNU Lesser General Public License, Version 3
+    (https://www.gnu.org/copyleft/lesser.html)
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+from nessi.io import SUdata
+from nessi.signal.pipeline import Pipeline
+from nessi.signal.pipeline import Wind
+from nessi.signal.pipeline import Taper
+from nessi.signal.pipeline import PFilter
+from nessi.signal.fftplan import fast_length
+from nessi.signal.filtering import _sin2response
+
+def _gather():
+    """
+    Random SU gather of 150 traces and 301 time samples.
+    """
+    np.random.seed(0)
+    dobs = SUdata()
+    dobs.create(np.random.randn(150, 301).astype(np.float32), 0.001)
+    dobs.header['fldr'] = np.repeat(np.arange(1, 16), 10)
+    return dobs
+
+def test_pipeline():
+    """
+    signal.pipeline.Pipeline against the SUdata processing methods.
+    """
+    dobs = _gather()
+    trace = dobs.trace.copy()
+
+    # Pipeline processed by blocks of 17 traces
+    pipeline = Pipeline([Wind(key='fldr', min=2, max=13),
+                         Wind(tmin=0.01, tmax=0.25),
+                         Taper(tr1=5, tr2=7, tbeg=10., tend=20., type='cosine'),
+                         PFilter([5., 10., 80., 100.], [0., 1., 1., 0.]),
+                         Wind(tmin=0.02, tmax=0.2),
+                         Taper(tbeg=5., tend=5.)], block=17)
+    output = pipeline.run(dobs)
+
+    # Same processing with the SUdata methods
+    expected = dobs.wind(key='fldr', min=2, max=13)
+    expected = expected.wind(tmin=0.01, tmax=0.25)
+    expected = expected.taper(tr1=5, tr2=7, tbeg=10., tend=20., type='cosine')
+    expected = expected.pfilter([5., 10., 80., 100.], [0., 1., 1., 0.])
+    expected = expected.wind(tmin=0.02, tmax=0.2)
+    expected = expected.taper(tbeg=5., tend=5.)
+
+    np.testing.assert_allclose(output.trace, expected.trace, atol=1.e-6)
+    np.testing.assert_equal(output.header, expected.header)
+
+    # Input data untouched
+    np.testing.assert_equal(dobs.trace, trace)
+    np.testing.assert_equal(dobs.header['ns'], 301)
+
+def test_pipeline_fused_filters():
+    """
+    signal.pipeline.Pipeline with consecutive filters.
+    """
+    dobs = _gather()
+
+    # Two band-pass filters are applied with one FFT
+    pipeline = Pipeline([PFilter([5., 10., 80., 100.], [0., 1., 1., 0.]),
+                         PFilter([5., 10., 80., 100.], [0., 1., 1., 0.])])
+    output = pipeline.run(dobs)
+
+    # Same as the squared filter response
+    np.testing.assert_equal(len(pipeline._compile(150, 301, 0.001, 0.)[0]), 1)
+    gobs = np.fft.rfft(dobs.trace, n=fast_length(301), axis=1)
+    pfilt = _sin2response(np.size(gobs, axis=1), 0.001, (5., 10., 80., 100.),
+                          (0., 1., 1., 0.))
+    expected = np.fft.irfft(gobs*pfilt*pfilt, axis=1)[:, :301]
+    np.testing.assert_allclose(output.trace, expected, atol=1.e-5)
+
+def test_pipeline_empty():
+    """
+    signal.pipeline.Pipeline raises ValueError when no trace passes a key
+    window, as SUdata.wind does.
+    """
+    dobs = _gather()
+
+    pipeline = Pipeline([Wind(key='fldr', min=1000, max=2000)])
+    np.testing.assert_raises(ValueError, pipeline.run, dobs)
+    pipeline = Pipeline([Wind(key='fldr', min=2, max=3),
+                         Wind(key='fldr', min=5, max=6)])
+    np.testing.assert_raises(ValueError, pipeline.run, dobs)
+
+if __name__ == "__main__" :
+    np.testing.run_module_suite()
@@ -23,6 +23,7 @@ from __future__ import print_function
 
 import numpy as np
 from nessi.signal.tapering import taper1d
+from nessi.signal.tapering import taper_window
 
 def test_taper1d_linear():
     """
@@ -159,5 +160,32 @@ def test_taper1d_cosine():
     # Testing
     np.testing.assert_allclose(dobst, output, atol=1.e-4)
 
+def test_taper1d_nd():
+    """
+    signal.tapering.taper1d testing for N-D data and output buffer.
+    """
+
+    # Create initial data
+    dobs = np.ones((3, 4, 64), dtype=np.float32)
+
+    # Define the taper
+    ntap1 = 8
+    ntap2 = 4
+    ftap = taper_window(64, ntap1, ntap2, 'sine')
+
+    # Tapering along the last axis
+    dobst = taper1d(dobs, ntap1, ntap2, type='sine', axis=2)
+    np.testing.assert_allclose(dobst, np.broadcast_to(ftap, dobs.shape))
+
+    # Tapering in place along the first axis
+    output = taper1d(dobs, 1, 1, type='linear', axis=0, out=dobs)
+    assert output is dobs
+    np.testing.assert_allclose(dobs[1], 1.)
+    np.testing.assert_allclose(dobs[0], 0.)
+
+    # Cached taper functions are read-only
+    assert taper_window(64, ntap1, ntap2, 'sine') is ftap
+    assert not ftap.flags.writeable
+
 if __name__ == "__main__" :
     np.testing.run_module_suite()